@@ -7,15 +7,36 @@ from dotenv import load_dotenv
 
 from config.database import Base, engine
 from middlewares.error_handler import ErrorHandler
+from middlewares.upload_limit import UploadSizeLimit
+from utils.files import MAX_CV_MB, CV_FORM_OVERHEAD_BYTES
 from routers.usuarios import router as usuarios_router
 from routers.puestos import router as puestos_router
 from routers.unidades_negocio import router as unidades_router
 from routers.postulaciones import router as postulaciones_router
 from routers.websockets import router as websockets_router
+from services.mail_outbox import mail_workers
+from services.admin_digest import digest_flusher
+from services.cv_previews import previews
+from services.cv_text import cv_text
+from utils.cv_preview import load_pymupdf
+from services.passwords import passwords
+from utils.websocket_manager import manager
+from services.realtime import postulacion_events
+from services.ws_replay import DBReplayStore, WS_REPLAY_PERSIST
+from utils.event_bus import WS_BUS
 
 load_dotenv()
 app = FastAPI(title="API CVs", version="1.1.0")
 
+# Corta el upload del CV apenas supera MAX_CV_MB (sin esperar a bufferear todo el body).
+# Va primero = queda más adentro: si no, BaseHTTPMiddleware envuelve el 413 en un ExceptionGroup.
+app.add_middleware(
+    UploadSizeLimit,
+    max_bytes=MAX_CV_MB * 1024 * 1024 + CV_FORM_OVERHEAD_BYTES,
+    paths={"/postulaciones"},
+    detail=f"El archivo supera el límite de {MAX_CV_MB}MB",
+)
+
 # ⛑️ CORS PRIMERO y con orígenes explícitos (no "*")
 # ⛑️ CORS PRIMERO y con orígenes explícitos (no "*")
 # ALLOWED_ORIGINS = [ ... ]
@@ -26,7 +47,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition", "Content-Type", "Cache-Control"],
+    expose_headers=[
+        "Content-Disposition", "Content-Type", "Cache-Control", "ETag",
+        "Last-Modified", "Accept-Ranges", "Content-Range", "Content-Length", "X-CV-Pages",
+    ],
 )
 
 # luego tus middlewares propios
@@ -42,6 +66,37 @@ app.include_router(websockets_router)
 # Solo dev; en prod usar Alembic
 Base.metadata.create_all(bind=engine)
 
+# Workers en segundo plano
+@app.on_event("startup")
+def start_background_workers():
+    mail_workers.start()
+    digest_flusher.start()
+    if load_pymupdf() is None:
+        print("[CV_PREVIEW] PyMuPDF no está instalado (requirements.txt): los CV en PDF quedan sin vista previa ni búsqueda por contenido")
+
+@app.on_event("startup")
+async def start_ws_bus():
+    if WS_REPLAY_PERSIST:
+        if WS_BUS == "postgres":
+            manager.replay_store = DBReplayStore()
+        else:
+            # el seq del bus en memoria vuelve a 1 al reiniciar: no sirve para persistir
+            print("[WS_REPLAY] WS_REPLAY_PERSIST requiere WS_BUS=postgres; se usa solo el buffer en memoria")
+    await manager.start()
+
+@app.on_event("shutdown")
+async def stop_ws_bus():
+    await postulacion_events.flush()
+    await manager.stop()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    digest_flusher.stop()
+    mail_workers.stop()
+    previews.shutdown()
+    cv_text.shutdown()
+    passwords.shutdown()
+
 @app.get("/", tags=["home"])
 def home():
     return {"ok": True}
@@ -1,6 +1,8 @@
 from fastapi.security import HTTPBearer
 from fastapi import Request, HTTPException
-from utils.jwt_manager import validate_token
+from fastapi.concurrency import run_in_threadpool
+from utils.jwt_manager import validate_token, token_hash
+from services.token_revocation import revocations
 
 class JWTBearer(HTTPBearer):
     async def __call__(self, request: Request):
@@ -9,5 +11,12 @@ class JWTBearer(HTTPBearer):
             payload = validate_token(auth.credentials)
         except Exception:
             raise HTTPException(status_code=401, detail="Token inválido o expirado")
+        if revocations.needs_refresh():
+            try:
+                await run_in_threadpool(revocations.refresh)
+            except Exception as e:  # sin DB seguimos con la última copia
+                print(f"[JWT_REVOCATION_ERROR] {e}")
+        if revocations.is_revoked(token_hash(auth.credentials), payload):
+            raise HTTPException(status_code=401, detail="Sesión revocada")
         request.state.jwt_payload = payload
         return payload
@@ -0,0 +1,48 @@
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+class UploadSizeLimit:
+    """
+    Corta uploads demasiado grandes mientras llegan, antes de que el parser
+    multipart los termine de bufferear: primero por Content-Length y, si no
+    viene (chunked), contando bytes del body.
+    Middleware ASGI puro: BaseHTTPMiddleware no deja envolver el receive.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int, paths: set[str], detail: str) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = paths
+        self.detail = detail
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"].rstrip("/") not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > self.max_bytes:
+                    # FastAPI re-lanza las HTTPException que salen del receive → 413 normal
+                    async def reject() -> dict:
+                        raise HTTPException(status_code=413, detail=self.detail)
+                    await self.app(scope, reject, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive() -> dict:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=self.detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
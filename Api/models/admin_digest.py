@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from config.database import Base
+
+class AdminDigestItem(Base):
+    """
+    CV nuevo pendiente de informar en el próximo resumen a ADMIN_EMAILS
+    (ADMIN_MAIL_MODE=digest). La fila se borra en la misma transacción en que
+    su resumen entra a mail_outbox; 'lote' solo marca la reserva dentro de ella.
+    """
+    __tablename__ = "admin_digest_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    postulacion_id = Column(Integer, nullable=False)   # sin FK: la postulación puede borrarse antes del envío
+
+    nombre = Column(String(60), nullable=False)
+    apellido = Column(String(60), nullable=False)
+    correo = Column(String(120), nullable=False)
+    telefono = Column(String(40), nullable=True)
+    unidad = Column(String(80), nullable=True)
+    puesto = Column(String(80), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    lote = Column(String(32), nullable=True, index=True)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from config.database import Base
+
+class CVBlob(Base):
+    """
+    Un archivo único del almacenamiento por contenido (STORAGE_DIR/cas).
+    refs = cuántas postulaciones lo usan; con 0 se borra el archivo.
+    """
+    __tablename__ = "cv_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False, default=0)
+    refs = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
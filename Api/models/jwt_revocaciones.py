@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from config.database import Base
+
+class JWTRevocacion(Base):
+    """
+    Tokens que dejan de valer antes de su exp.
+      tipo="token":   clave = sha256 del token (logout)
+      tipo="usuario": clave = id del usuario; vale para todo token emitido antes de desde
+    hasta = cuándo ya no hace falta guardarla (el último token afectado venció).
+    """
+    __tablename__ = "jwt_revocaciones"
+    __table_args__ = (
+        Index("ix_jwt_revocaciones_hasta", "hasta"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String(10), nullable=False)
+    clave = Column(String(64), nullable=False)
+    desde = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    hasta = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.sql import func
+from config.database import Base
+
+class MailOutbox(Base):
+    """
+    Cola persistente de correos salientes. Los requests solo insertan acá;
+    los workers de services.mail_outbox los envían con reintentos.
+    """
+    __tablename__ = "mail_outbox"
+    __table_args__ = (
+        Index("ix_mail_outbox_estado_proximo", "estado", "proximo_intento"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    subject = Column(String(255), nullable=False)
+    destinatarios = Column(Text, nullable=False)       # separados por coma
+    html = Column(Text, nullable=False)
+    text = Column(Text, nullable=True)
+
+    # pendiente | enviando | enviado | fallido
+    estado = Column(String(16), nullable=False, server_default="pendiente")
+    intentos = Column(Integer, nullable=False, default=0)
+    # próximo intento (en "enviando" es el vencimiento del lease del worker)
+    proximo_intento = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    ultimo_error = Column(String(500), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    enviado_en = Column(DateTime(timezone=True), nullable=True)
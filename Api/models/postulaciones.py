@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Boolean, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from config.database import Base
@@ -55,3 +55,20 @@ class Postulacion(Base):
     puesto_original = relationship("Puesto", foreign_keys=[puesto_original_id])
     unidad_original = relationship("UnidadNegocio", foreign_keys=[unidad_original_id])
     decidido_por = relationship("Usuarios")  # opcional: usuario revisor
+
+    # El INSERT trae created_at (server_default) con RETURNING: sin refresh después del alta
+    __mapper_args__ = {"eager_defaults": True}
+
+    # Índices compuestos (clave de orden, id) para la paginación por cursor
+    __table_args__ = (
+        Index("ix_postulaciones_created_at_id", created_at, id),
+        Index("ix_postulaciones_nombre_lower_id", func.lower(nombre), id),
+        Index("ix_postulaciones_decidido_en_id", decidido_en, id),
+        # Filtros del listado: el OR actual/original de unidad y puesto se resuelve
+        # como unión de índices (BitmapOr en Postgres, MULTI-INDEX OR en SQLite)
+        Index("ix_postulaciones_unidad_id", unidad_id),
+        Index("ix_postulaciones_unidad_original_id", unidad_original_id),
+        Index("ix_postulaciones_puesto_id", puesto_id),
+        Index("ix_postulaciones_puesto_original_id", puesto_original_id),
+        Index("ix_postulaciones_estado_created_at_id", estado, created_at, id),
+    )
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, SmallInteger, ForeignKey, Index
+from config.database import Base
+
+class PostulacionToken(Base):
+    """
+    Índice invertido de búsqueda: un token normalizado (sin acentos, minúsculas)
+    por cada palabra de nombre/apellido/correo y del texto del CV de una postulación.
+    """
+    __tablename__ = "postulaciones_tokens"
+    __table_args__ = (
+        # varchar_pattern_ops permite usar el índice en LIKE 'abc%' (Postgres)
+        Index(
+            "ix_postulaciones_tokens_token_pid", "token", "postulacion_id",
+            postgresql_ops={"token": "varchar_pattern_ops"},
+        ),
+    )
+
+    postulacion_id = Column(
+        Integer,
+        ForeignKey("postulaciones.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+    token = Column(String(60), primary_key=True)
+    campo = Column(String(16), primary_key=True)   # nombre | apellido | correo | contenido
+    peso = Column(SmallInteger, nullable=False, default=1)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, BigInteger, Text, DateTime
+from sqlalchemy.sql import func
+from config.database import Base
+
+class WSEvent(Base):
+    """
+    Copia persistente (opcional, WS_REPLAY_PERSIST) de los eventos secuenciados
+    del websocket, para reponerlos con /ws?since=<seq> aunque el worker se haya
+    reiniciado. data = el mensaje JSON tal como se envió al cliente.
+    """
+    __tablename__ = "ws_events"
+
+    seq = Column(BigInteger, primary_key=True, autoincrement=False)
+    data = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -2,76 +2,165 @@
 from fastapi import (
     APIRouter, Depends, HTTPException,
     UploadFile, File, Form, Query, status,
-    BackgroundTasks
+    BackgroundTasks, Request, Response
 )
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func as sa_func
-from config.database import get_db
+from config.database import get_db, SessionLocal
 from services.postulaciones import PostulacionesService
-from schemas.postulaciones import PostulacionOut, PostulacionUpdate, PostulacionDecisionIn
-from utils.files import save_upload_file_cv, cv_disk_path
+from services.counters import counters
+from schemas.postulaciones import (
+    PostulacionOut, PostulacionUpdate, PostulacionDecisionIn,
+    PostulacionDecisionLoteIn, PostulacionDecisionLoteOut,
+    PostulacionListPage, PostulacionListCursorPage,
+)
+from pydantic import TypeAdapter
+from typing import Union
+from fastapi.concurrency import run_in_threadpool
+from utils.files import save_upload_file_cv_async, place_cv_blob, discard_tmp, cv_disk_path, blob_sha
 from utils.authz import admin_required
 from utils.api_key import require_public_api_key
-from utils.mailer import send_mail
+from utils.http_cache import etag_matches, not_modified_since, http_date
+from utils.export import csv_chunks, xlsx_chunks, EXPORT_CHUNK_ROWS
+from utils.cv_zip import zip_chunks, zip_entry_name, CV_ZIP_MAX_FILES
+from services.mail_outbox import MailOutboxService, mail_workers
+from services.admin_digest import AdminDigestService, digest_enabled, digest_flusher, ADMIN_EMAILS
+from services.catalog import catalog
+from services.cv_previews import previews
+from services.cv_text import cv_text
+from utils.cv_preview import preview_paths, read_preview_meta
 from utils.email_templates import candidate_confirmation, admin_new_cv
-from models.unidades_negocio import UnidadNegocio
-from models.puestos import Puesto
 from models.postulaciones import Postulacion
 import os
-from datetime import date
+import stat
+from datetime import date, datetime
 from urllib.parse import quote
-from utils.websocket_manager import manager
+from services.realtime import postulacion_events, row_summary, with_nombres
 
 router = APIRouter(prefix="/postulaciones", tags=["Postulaciones"])
 
-ADMIN_EMAILS = [e.strip() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()]
-
 
 @router.get("/counts", dependencies=[Depends(admin_required)])
-def counts_por_estado(db: Session = Depends(get_db)):
+def counts_por_estado(request: Request, db: Session = Depends(get_db)):
     """
-    Devuelve conteos por estado (case-insensitive) + total.
-    Keys normalizadas en minúscula: nueva, destacada, posible, descartada, total.
+    Devuelve conteos por estado (case-insensitive) + total, más el desglose
+    por_unidad / por_puesto. Keys normalizadas en minúscula: nueva, destacada,
+    posible, descartada, total.
+    Sale de contadores en memoria; con If-None-Match responde 304 si no cambió.
     """
-    rows = (
-        db.query(Postulacion.estado, sa_func.count(Postulacion.id))
-          .group_by(Postulacion.estado)
-          .all()
-    )
+    counters.ensure_fresh(db)
+    payload, etag = counters.counts_payload()
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(payload, headers=headers)
 
-    res = {
-        "nueva": 0,
-        "destacada": 0,
-        "posible": 0,
-        "descartada": 0,
-    }
 
-    total = 0
-    for estado, cnt in rows:
-        total += int(cnt)
-        key = (estado or "").strip().lower()
-        if key in res:
-            res[key] += int(cnt)
-        # Otros estados no mapeados se ignoran en detalle, pero suman al total.
+_list_page_json = TypeAdapter(PostulacionListPage)
+_cursor_page_json = TypeAdapter(PostulacionListCursorPage)
+
 
-    res["total"] = total
-    return res
+def _json_page(adapter: TypeAdapter, page: dict) -> Response:
+    # Filas proyectadas -> JSON directo con pydantic-core (sin jsonable_encoder)
+    body = adapter.dump_json(adapter.validate_python(page, from_attributes=True))
+    return Response(content=body, media_type="application/json")
 
 
-@router.get("", dependencies=[Depends(admin_required)])
+@router.get("", response_model=Union[PostulacionListPage, PostulacionListCursorPage],
+            dependencies=[Depends(admin_required)])
 def list_postulaciones(
     q: str | None = Query(default=None),
+    contenido: str | None = Query(default=None, description="Buscar en el texto de los CV"),
     estado: str | None = Query(default=None),
     puesto_id: int | None = Query(default=None),
     unidad_id: int | None = Query(default=None),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
     sort: str = Query(default="reciente", pattern="^(reciente|antiguo|nombre_az|nombre_za|procesado)$"),
+    paginacion: str = Query(default="offset", pattern="^(offset|cursor)$"),
+    cursor: str | None = Query(default=None),
+    db: Session = Depends(get_db),
+):
+    svc = PostulacionesService(db)
+    # Modo cursor (keyset): sin total, devuelve next_cursor para la página siguiente
+    if paginacion == "cursor" or cursor:
+        try:
+            items, next_cursor = svc.list_keyset(q, estado, puesto_id, unidad_id, limit, cursor, sort, contenido)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        page = {"items": items, "next_cursor": next_cursor, "limit": limit}
+        return _json_page(_cursor_page_json, page)
+
+    items, total = svc.list(q, estado, puesto_id, unidad_id, limit, offset, sort, contenido)
+    page = {"items": items, "total": total, "limit": limit, "offset": offset}
+    return _json_page(_list_page_json, page)
+
+
+@router.get("/export", dependencies=[Depends(admin_required)])
+def export_postulaciones(
+    formato: str = Query(default="csv", pattern="^(csv|xlsx)$"),
+    q: str | None = Query(default=None),
+    contenido: str | None = Query(default=None),
+    estado: str | None = Query(default=None),
+    puesto_id: int | None = Query(default=None),
+    unidad_id: int | None = Query(default=None),
+    sort: str = Query(default="reciente", pattern="^(reciente|antiguo|nombre_az|nombre_za|procesado)$"),
+):
+    """
+    Todas las postulaciones que cumplen los filtros de GET /postulaciones, en
+    CSV o XLSX, sin paginar. Se genera mientras se envía, con sesión propia
+    (la de get_db se cierra antes de que termine el streaming).
+    """
+    def rows():
+        db = SessionLocal()
+        try:
+            yield from PostulacionesService(db).export_rows(
+                q, estado, puesto_id, unidad_id, sort, contenido, chunk=EXPORT_CHUNK_ROWS
+            )
+        finally:
+            db.close()
+
+    stamp = datetime.now().strftime("%Y%m%d_%H%M")
+    if formato == "xlsx":
+        body = xlsx_chunks(rows())
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        body = csv_chunks(rows())
+        media_type = "text/csv; charset=utf-8"
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="postulaciones_{stamp}.{formato}"',
+        "Cache-Control": "private, no-store",
+    })
+
+
+@router.get("/cvs/zip", dependencies=[Depends(admin_required)])
+def download_cvs_zip(
+    ids: list[int] | None = Query(default=None, description="Repetible: ?ids=1&ids=2"),
+    q: str | None = Query(default=None),
+    contenido: str | None = Query(default=None),
+    estado: str | None = Query(default=None),
+    puesto_id: int | None = Query(default=None),
+    unidad_id: int | None = Query(default=None),
     db: Session = Depends(get_db),
 ):
-    items, total = PostulacionesService(db).list(q, estado, puesto_id, unidad_id, limit, offset, sort)
-    return {"items": items, "total": total, "limit": limit, "offset": offset}
+    """
+    ZIP con los CV de las postulaciones filtradas (mismos filtros que el
+    listado) o de los ids indicados. Se arma mientras se envía, sin temporal.
+    """
+    rows = PostulacionesService(db).cv_files(
+        q, estado, puesto_id, unidad_id, contenido, ids, limit=CV_ZIP_MAX_FILES + 1
+    )
+    if not rows:
+        raise HTTPException(status_code=404, detail="No hay CVs para descargar")
+    if len(rows) > CV_ZIP_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Son más de {CV_ZIP_MAX_FILES} CVs: acotá los filtros")
+
+    entries = [(zip_entry_name(pid, original), cv_disk_path(stored)) for pid, stored, original in rows]
+    filename = f"cvs_{datetime.now().strftime('%Y%m%d_%H%M')}.zip"
+    return StreamingResponse(zip_chunks(entries), media_type="application/zip", headers={
+        "Content-Disposition": f"attachment; filename=\"{filename}\"; filename*=UTF-8''{quote(filename, safe='')}",
+        "Cache-Control": "private, no-store",
+    })
 
 
 @router.get("/{pid}", response_model=PostulacionOut, dependencies=[Depends(admin_required)])
@@ -82,9 +171,49 @@ def get_postulacion(pid: int, db: Session = Depends(get_db)):
     return obj
 
 
+def _registrar_postulacion(db: Session, data: dict) -> PostulacionOut:
+    """
+    Parte sincrónica del alta (DB + cola de correos). Se ejecuta en el threadpool
+    y devuelve el schema ya armado, así el event loop no toca la sesión.
+    Todo va en una sola transacción y sin lecturas: el INSERT vuelve con
+    id/created_at y los nombres de unidad/puesto salen del cache de catálogo.
+    """
+    svc = PostulacionesService(db)
+    obj = svc.create_from_upload(**data, commit=False)
+    out = PostulacionOut.model_validate(obj)
+
+    # Datos amigables para el mail del admin
+    unidad_nombre, puesto_nombre = catalog.nombres(obj.unidad_id, obj.puesto_id)
+
+    # Envío de correos: solo se encolan (en la misma transacción), los manda el pool de services.mail_outbox
+    try:
+        subj_c, html_c, text_c = candidate_confirmation(out.nombre, out.apellido, out.created_at)
+        mails = [(subj_c, [out.correo], html_c, text_c)]
+
+        if ADMIN_EMAILS and not digest_enabled():
+            subj_a, html_a, text_a = admin_new_cv(
+                out.id, out.nombre, out.apellido, out.correo, out.telefono,
+                unidad_nombre, puesto_nombre, out.created_at
+            )
+            mails.append((subj_a, ADMIN_EMAILS, html_a, text_a))
+
+        MailOutboxService(db).enqueue_many(mails, commit=False)
+        if digest_enabled():
+            # ADMIN_MAIL_MODE=digest: va al próximo resumen en vez de un correo por CV
+            AdminDigestService(db).add(obj, unidad_nombre, puesto_nombre, commit=False)
+    except Exception as e:
+        print(f"[MAIL_ENQUEUE_ERROR] id={out.id} {e}")
+
+    svc.commit_created(obj)
+    mail_workers.wake()
+    if digest_enabled():
+        digest_flusher.wake()
+    return out
+
+
 # Crear (público): SIEMPRE estado="nueva"
 @router.post("", response_model=PostulacionOut, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_public_api_key)])
-def create_postulacion(
+async def create_postulacion(
     nombre: str = Form(...),
     apellido: str = Form(...),
     correo: str = Form(...),
@@ -105,9 +234,9 @@ def create_postulacion(
     db: Session = Depends(get_db),
     background_tasks: BackgroundTasks = BackgroundTasks(),
 ):
-    stored, size, mime = save_upload_file_cv(cv, nombre, apellido)
-    svc = PostulacionesService(db)
-    obj = svc.create_from_upload(
+    # El CV se copia en async (el límite de MAX_CV_MB ya lo aplica UploadSizeLimit al recibir)
+    stored, size, mime, tmp_path = await save_upload_file_cv_async(cv)
+    data = dict(
         nombre=nombre, apellido=apellido, correo=correo, telefono=telefono,
         puesto_id=puesto_id, unidad_id=unidad_id, nota=nota,
         cv_filename=stored, cv_original=cv.filename or "cv", cv_mime=mime, cv_size=size,
@@ -119,41 +248,56 @@ def create_postulacion(
         domicilio_residencia=domicilio_residencia,
         localidad=localidad,
     )
-
-    # Datos amigables para el mail del admin
-    unidad_nombre = None
-    puesto_nombre = None
-    if unidad_id:
-        un = db.query(UnidadNegocio).filter(UnidadNegocio.id == unidad_id).first()
-        unidad_nombre = un.nombre if un else None
-    if puesto_id:
-        pu = db.query(Puesto).filter(Puesto.id == puesto_id).first()
-        puesto_nombre = pu.nombre if pu else None
-
-    # Envío de correos
-    subj_c, html_c, text_c = candidate_confirmation(obj.nombre, obj.apellido, obj.created_at)
     try:
-        send_mail(subj_c, [obj.correo], html_c, text_c)
-    except Exception as e:
-        print(f"[MAIL_POSTULANTE_ERROR] id={obj.id} {e}")
+        out = await run_in_threadpool(_registrar_postulacion, db, data)
+    except BaseException:
+        discard_tmp(tmp_path)
+        raise
+    # El blob se coloca después del commit de su referencia (ver CVStorageService.purge_if_unreferenced)
+    await run_in_threadpool(place_cv_blob, tmp_path, stored)
+    previews.schedule(stored)
+    cv_text.schedule(stored)
 
-    if ADMIN_EMAILS:
-        subj_a, html_a, text_a = admin_new_cv(
-            obj.id, obj.nombre, obj.apellido, obj.correo, obj.telefono,
-            unidad_nombre, puesto_nombre, obj.created_at
-        )
-        try:
-            send_mail(subj_a, ADMIN_EMAILS, html_a, text_a)
-        except Exception as e:
-            print(f"[MAIL_ADMIN_ERROR] id={obj.id} {e}")
+    # Aviso en tiempo real (agrupado con otros cambios cercanos, ver services.realtime)
+    background_tasks.add_task(postulacion_events.publish, "created", row_summary(out))
 
-    # BROADCAST create
-    # Opcional: enviar el objeto completo o solo una señal para refetch
-    # BROADCAST create
-    # Opcional: enviar el objeto completo o solo una señal para refetch
-    background_tasks.add_task(manager.broadcast, "POSTULACION_CREATED", {"id": obj.id, "estado": "nueva"})
+    return out
 
-    return obj
+
+# DECIDIR EN LOTE (solo admin): misma decisión para varios ids, un UPDATE y un solo aviso WS
+@router.post("/decidir", response_model=PostulacionDecisionLoteOut)
+def decidir_postulaciones(
+    payload: PostulacionDecisionLoteIn,
+    db: Session = Depends(get_db),
+    jwt: dict = Depends(admin_required),
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+):
+    reviewer_id = int(jwt.get("uid", 0) or 0)
+    if not reviewer_id:
+        raise HTTPException(status_code=401, detail="No autenticado")
+    try:
+        found, cambios = PostulacionesService(db).decide_many(
+            payload.ids, new_estado=payload.estado, motivo=payload.motivo, reviewer_user_id=reviewer_id,
+            new_unidad_id=payload.unidad_id, new_puesto_id=payload.puesto_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if found:
+        # Aviso en tiempo real: un mensaje con los ids y los campos nuevos (el motivo no viaja)
+        resumen = {k: cambios[k] for k in ("estado", "unidad_id", "puesto_id", "decidido_en") if k in cambios}
+        resumen["decidido_en"] = resumen["decidido_en"].isoformat()
+        resumen = with_nombres(resumen)
+        background_tasks.add_task(postulacion_events.publish_decided, found, resumen)
+
+    ok = set(found)
+    return {
+        "actualizadas": len(found),
+        "resultados": [
+            {"id": pid, "ok": pid in ok, "error": None if pid in ok else "No encontrado"}
+            for pid in dict.fromkeys(payload.ids)
+        ],
+    }
 
 
 # DECIDIR (solo admin): estado libre (str), con motivo obligatorio
@@ -173,9 +317,9 @@ def decidir_postulacion(
             pid, new_estado=payload.estado, motivo=payload.motivo, reviewer_user_id=reviewer_id,
             new_unidad_id=payload.unidad_id, new_puesto_id=payload.puesto_id
         )
-        # BROADCAST update
-        background_tasks.add_task(manager.broadcast, "POSTULACION_UPDATED", {"id": obj.id, "estado": obj.estado})
-        
+        # Aviso en tiempo real
+        background_tasks.add_task(postulacion_events.publish, "updated", row_summary(obj))
+
         return obj
     except ValueError as e:
         msg = str(e)
@@ -192,12 +336,11 @@ def update_postulacion(pid: int, payload: PostulacionUpdate, db: Session = Depen
         obj = PostulacionesService(db).update(pid, payload)
         if not obj:
             raise HTTPException(status_code=404, detail="No encontrado")
-        return obj
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    # BROADCAST update
-    background_tasks.add_task(manager.broadcast, "POSTULACION_UPDATED", {"id": obj.id, "estado": obj.estado})
+    # Aviso en tiempo real
+    background_tasks.add_task(postulacion_events.publish, "updated", row_summary(obj))
 
     return obj
 
@@ -208,41 +351,96 @@ def delete_postulacion(pid: int, db: Session = Depends(get_db), background_tasks
     if not ok:
         raise HTTPException(status_code=404, detail="No encontrado")
     
-    # BROADCAST delete
-    background_tasks.add_task(manager.broadcast, "POSTULACION_DELETED", {"id": pid})
+    # Aviso en tiempo real
+    background_tasks.add_task(postulacion_events.publish, "deleted", {"id": pid})
 
     return
 
 
-@router.get("/{pid}/cv/inline", dependencies=[Depends(admin_required)])
-def view_cv_inline(pid: int, db: Session = Depends(get_db)):
+# Los CV no cambian una vez guardados: el navegador los puede guardar, pero
+# siempre revalida (así cada uso pasa por admin_required) y nunca en caches compartidos.
+CV_CACHE_CONTROL = "private, no-cache"
+
+
+def _cv_file_response(request: Request, pid: int, db: Session, disposition: str) -> Response:
+    """
+    FileResponse con ETag fuerte (sha256 en CAS; tamaño+mtime en el layout viejo),
+    Last-Modified, 304 para If-None-Match / If-Modified-Since y Range/If-Range
+    (206, lo maneja FileResponse) para la carga progresiva de pdf.js.
+    """
     obj = PostulacionesService(db).get(pid)
     if not obj:
         raise HTTPException(status_code=404, detail="No encontrado")
     path = cv_disk_path(obj.cv_filename)
-    if not os.path.isfile(path):
+    try:
+        st = os.stat(path)
+    except OSError:
         raise HTTPException(status_code=404, detail="Archivo CV no encontrado en el servidor")
+    if not stat.S_ISREG(st.st_mode):
+        raise HTTPException(status_code=404, detail="Archivo CV no encontrado en el servidor")
+
+    sha = blob_sha(obj.cv_filename)
+    etag = f'"{sha}"' if sha else f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(st.st_mtime),
+        "Cache-Control": CV_CACHE_CONTROL,
+        "Vary": "Authorization",
+    }
+
+    inm = request.headers.get("if-none-match")
+    if etag_matches(inm, etag) or (inm is None and not_modified_since(request.headers.get("if-modified-since"), st.st_mtime)):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
     encoded_name = quote(obj.cv_original or "cv", safe="")
-    resp = FileResponse(path, media_type=obj.cv_mime)
     # RFC 5987: soporta tildes, ñ y cualquier carácter Unicode
-    resp.headers["Content-Disposition"] = f"inline; filename*=UTF-8''{encoded_name}"
-    resp.headers["Cache-Control"] = "no-store"
-    return resp
+    headers["Content-Disposition"] = f"{disposition}; filename*=UTF-8''{encoded_name}"
+    return FileResponse(path, media_type=obj.cv_mime, headers=headers, stat_result=st)
+
+
+@router.get("/{pid}/cv/inline", dependencies=[Depends(admin_required)])
+def view_cv_inline(pid: int, request: Request, db: Session = Depends(get_db)):
+    return _cv_file_response(request, pid, db, "inline")
 
 
 @router.get("/{pid}/cv/download", dependencies=[Depends(admin_required)])
-def download_cv(pid: int, db: Session = Depends(get_db)):
+def download_cv(pid: int, request: Request, db: Session = Depends(get_db)):
+    return _cv_file_response(request, pid, db, "attachment")
+
+
+@router.get("/{pid}/cv/preview", dependencies=[Depends(admin_required)])
+def preview_cv(pid: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Imagen (jpeg) de la primera página, generada en segundo plano al subir el CV.
+    La cantidad de páginas va en X-CV-Pages. Si todavía no existe se encola y
+    responde 404 (el front muestra el ícono genérico).
+    """
     obj = PostulacionesService(db).get(pid)
     if not obj:
         raise HTTPException(status_code=404, detail="No encontrado")
-    path = cv_disk_path(obj.cv_filename)
-    if not os.path.isfile(path):
-        raise HTTPException(status_code=404, detail="Archivo CV no encontrado en el servidor")
-
-    encoded_name = quote(obj.cv_original or "cv", safe="")
-    resp = FileResponse(path, media_type=obj.cv_mime)
-    # RFC 5987: soporta tildes, ñ y cualquier carácter Unicode
-    resp.headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{encoded_name}"
-    resp.headers["Cache-Control"] = "no-store"
-    return resp
+    cv_path = cv_disk_path(obj.cv_filename)
+    meta = read_preview_meta(cv_path)
+    if meta is None:
+        if os.path.isfile(cv_path):
+            previews.schedule(obj.cv_filename)
+        raise HTTPException(status_code=404, detail="Vista previa en preparación")
+    img_path, _ = preview_paths(cv_path)
+    try:
+        st = os.stat(img_path) if meta.get("image") else None
+    except OSError:
+        st = None
+    if st is None:
+        raise HTTPException(status_code=404, detail="Vista previa no disponible para este CV")
+
+    etag = f'"p-{st.st_size:x}-{st.st_mtime_ns:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(st.st_mtime),
+        "Cache-Control": CV_CACHE_CONTROL,
+        "Vary": "Authorization",
+    }
+    if meta.get("pages") is not None:
+        headers["X-CV-Pages"] = str(meta["pages"])
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return FileResponse(img_path, media_type="image/jpeg", headers=headers, stat_result=st)
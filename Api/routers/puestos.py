@@ -1,16 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 from config.database import get_db
 from services.puestos import PuestosService
 from schemas.puestos import PuestoCreate, PuestoUpdate, PuestoOut
 from utils.authz import admin_required
 from utils.api_key import require_public_api_key
+from utils.http_cache import cached_json_response
+from services.catalog import catalog, CATALOG_CACHE_CONTROL
 
 router = APIRouter(prefix="/puestos", tags=["Puestos"])
 
 @router.get("", response_model=list[PuestoOut], dependencies=[Depends(require_public_api_key)])  # público
-def list_puestos(include_inactive: bool = Query(default=False), db: Session = Depends(get_db)):
-    return PuestosService(db).list(include_inactive=include_inactive)
+def list_puestos(request: Request, include_inactive: bool = Query(default=False)):
+    # Cache de catálogo (services.catalog): sin DB mientras no cambie
+    body, etag = catalog.get(("puestos", include_inactive))
+    return cached_json_response(request, body, etag, CATALOG_CACHE_CONTROL)
 
 @router.post("", response_model=PuestoOut, status_code=status.HTTP_201_CREATED, dependencies=[Depends(admin_required)])
 def create_puesto(payload: PuestoCreate, db: Session = Depends(get_db)):
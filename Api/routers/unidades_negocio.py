@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 from config.database import get_db
 from services.unidades_negocio import UnidadesNegocioService
@@ -8,21 +8,24 @@ from schemas.unidades_negocio import (
 )
 from utils.authz import admin_required
 from utils.api_key import require_public_api_key
+from utils.http_cache import cached_json_response
+from services.catalog import catalog, CATALOG_CACHE_CONTROL
 
 router = APIRouter(prefix="/unidades-negocio", tags=["Unidades de negocio"])
 
-# LISTA con puestos embebidos (público)
+# LISTA con puestos embebidos (público). Sale del cache de catálogo (services.catalog), sin DB.
 @router.get("", response_model=list[UnidadNegocioOutFull], dependencies=[Depends(require_public_api_key)])
-def list_unidades(include_inactive: bool = Query(default=False), db: Session = Depends(get_db)):
-    return UnidadesNegocioService(db).list_full(include_inactive=include_inactive)
+def list_unidades(request: Request, include_inactive: bool = Query(default=False)):
+    body, etag = catalog.get(("unidades", include_inactive))
+    return cached_json_response(request, body, etag, CATALOG_CACHE_CONTROL)
 
 # GET por id con puestos embebidos (público)
 @router.get("/{uid}", response_model=UnidadNegocioOutFull, dependencies=[Depends(require_public_api_key)])
-def get_unidad(uid: int, db: Session = Depends(get_db)):
-    obj = UnidadesNegocioService(db).get_full(uid)
-    if not obj:
+def get_unidad(uid: int, request: Request):
+    entry = catalog.get(("unidad", uid))
+    if not entry:
         raise HTTPException(status_code=404, detail="No encontrado")
-    return obj
+    return cached_json_response(request, *entry, CATALOG_CACHE_CONTROL)
 
 # Admin CRUD
 @router.post("", response_model=UnidadNegocioOutFull, status_code=status.HTTP_201_CREATED, dependencies=[Depends(admin_required)])
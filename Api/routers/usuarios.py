@@ -1,31 +1,42 @@
 # routers/usuarios.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 
 from config.database import get_db
 from middlewares.jwt_bearer import JWTBearer
 from services.usuarios import UsuariosService
+from services.passwords import passwords, PasswordPoolBusy
+from services.login_throttle import login_throttle
 from schemas.usuarios import UsuarioCreate, UsuarioOut, UsuarioUpdate, UserLogin, AuthResponse
-from utils.jwt_manager import create_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from utils.jwt_manager import create_token, token_hash, ACCESS_TOKEN_EXPIRE_MINUTES
+from services.token_revocation import revocations
 from utils.api_key import require_basic_or_api_key
+from utils.client_ip import client_ip
 
 router = APIRouter(prefix="/usuarios", tags=["Usuarios"])  # deja tu prefix como lo tengasfrom utils.api_key import require_basic_or_api_key
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# bcrypt corre en el pool de procesos (services.passwords); lleno -> 503 en vez de encolar sin límite
+async def _hash(password: str) -> str:
+    try:
+        return await passwords.hash(password)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, reintentá en unos segundos", headers={"Retry-After": "2"})
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+async def _verify(plain: str, hashed: str) -> tuple[bool, str | None]:
+    try:
+        return await passwords.verify_and_update(plain, hashed)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, reintentá en unos segundos", headers={"Retry-After": "2"})
 
 @router.post("", response_model=UsuarioOut, dependencies=[Depends(JWTBearer())])
-def create_usuario(payload: UsuarioCreate, db: Session = Depends(get_db)):
+async def create_usuario(payload: UsuarioCreate, db: Session = Depends(get_db)):
     svc = UsuariosService(db)
-    if svc.get_by_email(payload.correo):
+    if await run_in_threadpool(svc.get_by_email, payload.correo):
         raise HTTPException(status_code=409, detail="El correo ya existe")
-    user = svc.create(payload, hash_password(payload.password))
+    password_hash = await _hash(payload.password)
+    user = await run_in_threadpool(svc.create, payload, password_hash)
     return user
 
 @router.get("", response_model=list[UsuarioOut], dependencies=[Depends(JWTBearer())])
@@ -40,14 +51,23 @@ def get_usuario(user_id: int, db: Session = Depends(get_db)):
     return user
 
 @router.patch("/{user_id}", response_model=UsuarioOut, dependencies=[Depends(JWTBearer())])
-def update_usuario(user_id: int, payload: UsuarioUpdate, db: Session = Depends(get_db)):
+async def update_usuario(user_id: int, payload: UsuarioUpdate, db: Session = Depends(get_db)):
     # 👇 FIX: Hash password if it is being updated
     if payload.password:
-        payload.password = hash_password(payload.password)
-        
-    user = UsuariosService(db).update(user_id, payload)
+        payload.password = await _hash(payload.password)
+
+    svc = UsuariosService(db)
+    user = await run_in_threadpool(svc.get, user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="No encontrado")
+    role_before = user.role
+    user = await run_in_threadpool(svc.update, user_id, payload)
     if not user:
         raise HTTPException(status_code=404, detail="No encontrado")
+    # Cambio de rol o contraseña: las sesiones abiertas del usuario dejan de valer
+    # (un PATCH que reenvía el mismo rol no cierra nada)
+    if payload.password or user.role != role_before:
+        await run_in_threadpool(revocations.revoke_user, db, user_id)
     return user
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(JWTBearer())])
@@ -55,15 +75,30 @@ def delete_usuario(user_id: int, db: Session = Depends(get_db)):
     ok = UsuariosService(db).delete(user_id)
     if not ok:
         raise HTTPException(status_code=404, detail="No encontrado")
+    revocations.revoke_user(db, user_id)
     return
 
 # 👇 LOGIN: ahora devuelve token + user + expires
 @router.post("/login", response_model=AuthResponse)
-def login(data: UserLogin, db: Session = Depends(get_db)):
+async def login(data: UserLogin, request: Request, db: Session = Depends(get_db)):
+    # Cuenta con fallos recientes (demora creciente) o IP bloqueada: se corta antes de gastar bcrypt
+    account = data.email.lower()
+    ip = client_ip(request)
+    wait = login_throttle.retry_after(account, ip)
+    if wait:
+        raise HTTPException(status_code=429, detail="Demasiados intentos, probá de nuevo más tarde",
+                            headers={"Retry-After": str(wait)})
+
     svc = UsuariosService(db)
-    user = svc.get_by_email(data.email)
-    if not user or not verify_password(data.password, user.password):
+    user = await run_in_threadpool(svc.get_by_email, data.email)
+    ok, new_hash = await _verify(data.password, user.password) if user else (False, None)
+    if not ok:
+        login_throttle.failure(account, ip)
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
+    login_throttle.success(account)
+    if new_hash:
+        # El hash guardado usa otro costo (BCRYPT_ROUNDS cambió): se reemplaza sin que el usuario lo note
+        await run_in_threadpool(svc.set_password_hash, user, new_hash)
 
     token = create_token(sub=user.correo, extra={"uid": user.id, "role": user.role})
     expires_at = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -75,6 +110,13 @@ def login(data: UserLogin, db: Session = Depends(get_db)):
         "expires_in": int(ACCESS_TOKEN_EXPIRE_MINUTES * 60),
     }
 
+# Logout: el token deja de valer aunque no haya expirado
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(request: Request, jwt: dict = Depends(JWTBearer()), db: Session = Depends(get_db)):
+    token = request.headers.get("Authorization", "").partition(" ")[2]
+    revocations.revoke_token(db, token_hash(token), jwt["exp"])
+    return
+
 # (Opcional) /me para obtener el usuario actual desde el token
 @router.get("/me", response_model=UsuarioOut)
 def me(jwt: dict = Depends(JWTBearer()), db: Session = Depends(get_db)):
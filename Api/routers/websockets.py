@@ -1,15 +1,17 @@
+from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from utils.websocket_manager import manager
 
 router = APIRouter(tags=["WebSockets"])
 
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket, id: int = 0, nombre: str = "Anonimo"):
+async def websocket_endpoint(websocket: WebSocket, id: int = 0, nombre: str = "Anonimo", since: Optional[int] = None):
     # Simplificación: pasar usuario por query params ?id=1&nombre=Juan
     # En prod idealmente validaríamos token.
+    # since=<seq>: último evento visto antes de reconectar (se reponen los siguientes)
     user_info = {"id": id, "nombre": nombre}
     
-    await manager.connect(websocket, user_info)
+    await manager.connect(websocket, user_info, since)
     try:
         while True:
             data_text = await websocket.receive_text()
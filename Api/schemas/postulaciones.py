@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime, date
 
 # -------------------------------------------------------------------
@@ -65,6 +65,50 @@ class PostulacionOut(BaseModel):
         return v
 
 
+class PostulacionListItem(BaseModel):
+    """
+    Fila del listado del admin: solo lo que muestra la tarjeta, con los
+    nombres de unidad/puesto ya resueltos. Sale de una query proyectada
+    (services.postulaciones._with_nombres), sin validar correo ni estado:
+    los datos ya pasaron por PostulacionOut/Update al guardarse.
+    """
+    id: int
+    nombre: str
+    apellido: str
+    correo: str
+    telefono: Optional[str] = None
+    estado: str
+    nota: Optional[str] = None
+    unidad_id: Optional[int] = None
+    puesto_id: Optional[int] = None
+    unidad_original_id: Optional[int] = None
+    puesto_original_id: Optional[int] = None
+    unidad_nombre: Optional[str] = None
+    puesto_nombre: Optional[str] = None
+    unidad_original_nombre: Optional[str] = None
+    puesto_original_nombre: Optional[str] = None
+    decidido_motivo: Optional[str] = None
+    decidido_por_user_id: Optional[int] = None
+    decidido_en: Optional[datetime] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class PostulacionListPage(BaseModel):
+    items: List[PostulacionListItem]
+    total: int
+    limit: int
+    offset: int
+
+
+class PostulacionListCursorPage(BaseModel):
+    items: List[PostulacionListItem]
+    next_cursor: Optional[str] = None
+    limit: int
+
+
 class PostulacionUpdate(BaseModel):
     # OJO: NO expongas 'estado' acá, se decide por endpoint aparte
     nombre: Optional[str] = Field(default=None, min_length=2, max_length=60)
@@ -101,3 +145,21 @@ class PostulacionDecisionIn(BaseModel):
         if not v:
             raise ValueError("estado no puede estar vacío")
         return v
+
+
+# Decisión en lote: la misma decisión para varios ids
+DECISION_LOTE_MAX = 500
+
+class PostulacionDecisionLoteIn(PostulacionDecisionIn):
+    ids: List[int] = Field(..., min_length=1, max_length=DECISION_LOTE_MAX)
+
+
+class DecisionResultado(BaseModel):
+    id: int
+    ok: bool
+    error: Optional[str] = None
+
+
+class PostulacionDecisionLoteOut(BaseModel):
+    actualizadas: int
+    resultados: List[DecisionResultado]
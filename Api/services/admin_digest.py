@@ -0,0 +1,157 @@
+import os
+import uuid
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import delete, func as sa_func, update
+from sqlalchemy.orm import Session
+
+from config.database import SessionLocal
+from models.admin_digest import AdminDigestItem
+from models.postulaciones import Postulacion
+from services.mail_outbox import MailOutboxService, mail_workers
+from utils.email_templates import admin_new_cv_digest
+
+ADMIN_EMAILS = [e.strip() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()]
+# "por_cv": un correo por cada CV (comportamiento original) | "digest": resumen agrupado
+ADMIN_MAIL_MODE = os.getenv("ADMIN_MAIL_MODE", "por_cv").strip().lower()
+DIGEST_WINDOW_SECONDS = int(os.getenv("DIGEST_WINDOW_SECONDS", "900"))
+DIGEST_MAX_ITEMS = int(os.getenv("DIGEST_MAX_ITEMS", "50"))
+DIGEST_POLL_SECONDS = float(os.getenv("DIGEST_POLL_SECONDS", "30"))
+
+
+def digest_enabled() -> bool:
+    return ADMIN_MAIL_MODE == "digest" and bool(ADMIN_EMAILS)
+
+
+class AdminDigestService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    # === REGISTRAR UN CV NUEVO PARA EL PRÓXIMO RESUMEN ===
+    def add(self, obj: Postulacion, unidad_nombre: Optional[str], puesto_nombre: Optional[str],
+            commit: bool = True) -> None:
+        self.db.add(AdminDigestItem(
+            postulacion_id=obj.id,
+            nombre=obj.nombre, apellido=obj.apellido, correo=obj.correo, telefono=obj.telefono,
+            unidad=unidad_nombre, puesto=puesto_nombre,
+            created_at=obj.created_at or datetime.now(timezone.utc),
+        ))
+        if commit:
+            self.db.commit()
+            digest_flusher.wake()
+
+    # === ENVIAR LOS RESÚMENES QUE CORRESPONDAN ===
+    def flush(self, force: bool = False) -> int:
+        """
+        Arma un resumen cuando hay DIGEST_MAX_ITEMS pendientes o el más viejo
+        supera DIGEST_WINDOW_SECONDS (o siempre, con force). Devuelve cuántos
+        CVs se informaron. Cada resumen es un único mensaje en mail_outbox y sus
+        ítems se borran en la misma transacción en que se encola.
+        """
+        sent = 0
+        while True:
+            count, oldest = (
+                self.db.query(sa_func.count(AdminDigestItem.id), sa_func.min(AdminDigestItem.created_at))
+                       .filter(AdminDigestItem.lote.is_(None))
+                       .one()
+            )
+            if not count:
+                break
+            if not force and count < DIGEST_MAX_ITEMS:
+                if oldest.tzinfo is None:
+                    oldest = oldest.replace(tzinfo=timezone.utc)
+                if datetime.now(timezone.utc) - oldest < timedelta(seconds=DIGEST_WINDOW_SECONDS):
+                    break
+
+            # Reservar, armar, encolar y borrar el lote en una sola transacción: si algo
+            # falla antes del commit los ítems vuelven a quedar pendientes (nada se pierde),
+            # y el update condicional bloquea las filas frente a otro proceso hasta el commit.
+            ids = [
+                i for (i,) in self.db.query(AdminDigestItem.id)
+                                     .filter(AdminDigestItem.lote.is_(None))
+                                     .order_by(AdminDigestItem.id.asc())
+                                     .limit(DIGEST_MAX_ITEMS)
+                                     .all()
+            ]
+            lote = uuid.uuid4().hex
+            try:
+                self.db.execute(
+                    update(AdminDigestItem)
+                    .where(AdminDigestItem.id.in_(ids), AdminDigestItem.lote.is_(None))
+                    .values(lote=lote)
+                )
+                items = (
+                    self.db.query(AdminDigestItem)
+                           .filter(AdminDigestItem.lote == lote)
+                           .order_by(AdminDigestItem.id.asc())
+                           .all()
+                )
+                if not items:
+                    self.db.rollback()
+                    continue  # otro proceso se llevó ese lote
+
+                rows = [
+                    {"id": it.postulacion_id, "nombre": it.nombre, "apellido": it.apellido, "correo": it.correo,
+                     "telefono": it.telefono, "unidad": it.unidad, "puesto": it.puesto, "created_at": it.created_at}
+                    for it in items
+                ]
+                subj, html, text = admin_new_cv_digest(rows, items[0].created_at, items[-1].created_at)
+                queued = MailOutboxService(self.db).enqueue_many([(subj, ADMIN_EMAILS, html, text)], commit=False)
+                # Ya están en mail_outbox: la tabla solo guarda lo que falta informar
+                self.db.execute(delete(AdminDigestItem).where(AdminDigestItem.lote == lote))
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+            if queued:
+                mail_workers.wake()
+            sent += len(items)
+        return sent
+
+
+class DigestFlusher:
+    """Thread que revisa periódicamente si hay que mandar un resumen."""
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def start(self) -> None:
+        if self._thread or not digest_enabled():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="admin-digest", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        if not self._thread:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        # lo que quedó pendiente sale ahora (no esperar a la próxima ventana)
+        self._flush(force=True)
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _flush(self, force: bool = False) -> None:
+        db = SessionLocal()
+        try:
+            AdminDigestService(db).flush(force=force)
+        except Exception as e:
+            print(f"[MAIL_DIGEST_ERROR] {e}")
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._flush()
+            self._wake.wait(DIGEST_POLL_SECONDS)
+            self._wake.clear()
+
+
+digest_flusher = DigestFlusher()
@@ -0,0 +1,108 @@
+"""
+Benchmark del chequeo de autenticación de cada request (JWTBearer).
+
+Mide por separado el decode del JWT (sin cache y con el LRU de
+utils.jwt_manager), el chequeo de revocación en memoria, la relectura de
+jwt_revocaciones y JWTBearer completo con un token válido.
+
+    python -m services.auth_benchmark [--iteraciones 20000] [--revocaciones 100]
+
+Usa la base configurada (DATABASE_URL) solo para leer jwt_revocaciones; con
+--revocaciones N agrega N revocaciones de usuario de prueba (ids negativos) y
+las borra al terminar.
+"""
+import time
+import asyncio
+import statistics
+from datetime import datetime, timedelta, timezone
+
+from starlette.requests import Request
+
+from config.database import SessionLocal
+from middlewares.jwt_bearer import JWTBearer
+from models.jwt_revocaciones import JWTRevocacion
+from services.token_revocation import TIPO_USUARIO, revocations
+from utils.jwt_manager import create_token, token_hash, validate_token, _token_cache
+
+
+def _us(fn, iteraciones: int) -> float:
+    """Microsegundos por llamada (mediana de 5 tandas)."""
+    tandas = []
+    n = max(iteraciones // 5, 1)
+    for _ in range(5):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        tandas.append((time.perf_counter() - t0) * 1e6 / n)
+    return statistics.median(tandas)
+
+
+def _request(token: str) -> Request:
+    return Request({
+        "type": "http", "method": "GET", "path": "/usuarios/me", "query_string": b"",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    })
+
+
+def run(iteraciones: int = 20000) -> dict[str, float]:
+    token = create_token("bench@ejemplo.com", {"uid": 1, "role": "Admin"})
+    payload = validate_token(token)
+    key = token_hash(token)
+
+    def _uncached():
+        _token_cache.clear()
+        validate_token(token)
+
+    resultados = {
+        "validate_token sin cache": _us(_uncached, iteraciones),
+        "validate_token con cache": _us(lambda: validate_token(token), iteraciones),
+        "is_revoked": _us(lambda: revocations.is_revoked(key, payload), iteraciones),
+        "refresh (SELECT jwt_revocaciones)": _us(revocations.refresh, max(iteraciones // 100, 5)),
+    }
+
+    bearer = JWTBearer()
+    loop = asyncio.new_event_loop()
+    try:
+        revocations.refresh()
+        resultados["JWTBearer completo"] = _us(
+            lambda: loop.run_until_complete(bearer(_request(token))), iteraciones // 4,
+        )
+    finally:
+        loop.close()
+    return resultados
+
+
+if __name__ == "__main__":
+    import argparse
+    import models.puestos, models.unidades_negocio, models.usuarios  # noqa: F401 (mappers de las relaciones)
+    from config.database import engine, Base
+
+    parser = argparse.ArgumentParser(description="Costo del chequeo de autenticación por request")
+    parser.add_argument("--iteraciones", type=int, default=20000)
+    parser.add_argument("--revocaciones", type=int, default=0, help="revocaciones de prueba a cargar durante la medición")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine, tables=[JWTRevocacion.__table__])
+    db = SessionLocal()
+    try:
+        if args.revocaciones:
+            now = datetime.now(timezone.utc)
+            db.add_all([
+                JWTRevocacion(tipo=TIPO_USUARIO, clave=str(-i), desde=now, hasta=now + timedelta(hours=1))
+                for i in range(1, args.revocaciones + 1)
+            ])
+            db.commit()
+        try:
+            resultados = run(args.iteraciones)
+        finally:
+            if args.revocaciones:
+                db.query(JWTRevocacion).filter(
+                    JWTRevocacion.tipo == TIPO_USUARIO,
+                    JWTRevocacion.clave.in_([str(-i) for i in range(1, args.revocaciones + 1)]),
+                ).delete(synchronize_session=False)
+                db.commit()
+    finally:
+        db.close()
+
+    for nombre, us in resultados.items():
+        print(f"[AUTH_BENCH] {nombre:34} {us:9.1f}us")
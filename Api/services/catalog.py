@@ -0,0 +1,110 @@
+import os
+import time
+import hashlib
+import threading
+from typing import Optional
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session, selectinload
+
+from config.database import SessionLocal
+from models.unidades_negocio import UnidadNegocio
+from models.puestos import Puesto
+from schemas.unidades_negocio import UnidadNegocioOutFull
+from schemas.puestos import PuestoOut
+
+# Tope de vida del snapshot: los cambios hechos en otro worker se ven a lo sumo con este retraso
+CATALOG_CACHE_SECONDS = int(os.getenv("CATALOG_CACHE_SECONDS", "60"))
+# no-cache: el navegador/CDN guarda la respuesta pero revalida siempre (304 sin body)
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "public, no-cache")
+
+_unidades_json = TypeAdapter(list[UnidadNegocioOutFull])
+_puestos_json = TypeAdapter(list[PuestoOut])
+
+# (body JSON, ETag)
+Entry = tuple[bytes, str]
+_NOMBRES = ("nombres",)
+
+
+def _entry(body: bytes) -> Entry:
+    # ETag por contenido: todos los workers dan el mismo para el mismo catálogo
+    return body, f'"c-{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+class CatalogCache:
+    """
+    Unidades de negocio y puestos ya serializados, para los GET públicos del
+    formulario. Se arma entero con dos queries y queda en memoria hasta que
+    un create/update/delete de UnidadesNegocioService o PuestosService lo
+    invalida (o vence CATALOG_CACHE_SECONDS). La versión evita guardar un
+    snapshot que se armó mientras alguien lo invalidaba.
+
+    Keys: ("unidades", include_inactive), ("unidad", id), ("puestos", include_inactive)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._version = 0
+        self._snapshot: Optional[dict] = None
+        self._loaded_at = 0.0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+    def get(self, key: tuple) -> Optional[Entry]:
+        return self._current().get(key)
+
+    def nombres(self, unidad_id: Optional[int], puesto_id: Optional[int]) -> tuple[Optional[str], Optional[str]]:
+        """Nombres de unidad y puesto por id (para los correos), sin ir a la DB."""
+        unidades, puestos = self._current()[_NOMBRES]
+        return unidades.get(unidad_id), puestos.get(puesto_id)
+
+    def _current(self) -> dict:
+        with self._lock:
+            snap = self._snapshot
+            if snap is not None and time.monotonic() - self._loaded_at <= CATALOG_CACHE_SECONDS:
+                return snap
+        # Una sola reconstrucción a la vez: el resto espera y usa el resultado
+        with self._build_lock:
+            with self._lock:
+                if self._snapshot is not None and time.monotonic() - self._loaded_at <= CATALOG_CACHE_SECONDS:
+                    return self._snapshot
+                version = self._version
+            db = SessionLocal()
+            try:
+                snap = self._build(db)
+            finally:
+                db.close()
+            with self._lock:
+                if version == self._version:
+                    self._snapshot, self._loaded_at = snap, time.monotonic()
+            return snap
+
+    @staticmethod
+    def _build(db: Session) -> dict:
+        unidades = _unidades_json.validate_python(
+            db.query(UnidadNegocio)
+              .options(selectinload(UnidadNegocio.puestos))
+              .order_by(UnidadNegocio.nombre.asc())
+              .all(),
+            from_attributes=True,
+        )
+        puestos = _puestos_json.validate_python(
+            db.query(Puesto).order_by(Puesto.nombre.asc()).all(),
+            from_attributes=True,
+        )
+        snap: dict = {
+            ("unidades", True): _entry(_unidades_json.dump_json(unidades)),
+            ("unidades", False): _entry(_unidades_json.dump_json([u for u in unidades if u.activo])),
+            ("puestos", True): _entry(_puestos_json.dump_json(puestos)),
+            ("puestos", False): _entry(_puestos_json.dump_json([p for p in puestos if p.activo])),
+        }
+        for u in unidades:
+            snap[("unidad", u.id)] = _entry(u.model_dump_json().encode("utf-8"))
+        snap[_NOMBRES] = ({u.id: u.nombre for u in unidades}, {p.id: p.nombre for p in puestos})
+        return snap
+
+
+catalog = CatalogCache()
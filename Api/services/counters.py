@@ -0,0 +1,147 @@
+import os
+import time
+import uuid
+import threading
+from collections import Counter
+from typing import Optional
+from sqlalchemy import func as sa_func
+from sqlalchemy.orm import Session
+
+from models.postulaciones import Postulacion
+
+# Cada cuánto se recalculan los contadores contra la DB (corrige derivas,
+# cambios hechos por otros workers o directamente en la DB)
+COUNTERS_RECONCILE_SECONDS = int(os.getenv("COUNTERS_RECONCILE_SECONDS", "60"))
+
+# Estados que el dashboard muestra siempre (aunque estén en 0)
+ESTADOS_DASHBOARD = ("nueva", "destacada", "posible", "descartada")
+
+
+class PostulacionesCounters:
+    """
+    Contadores en memoria por estado, unidad y puesto. Se actualizan en cada
+    create/decide/update/delete y se reconcilian periódicamente con la DB,
+    así /postulaciones/counts no hace GROUP BY en cada request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._boot = uuid.uuid4().hex[:8]
+        self._estado: Counter = Counter()
+        self._unidad: Counter = Counter()
+        self._puesto: Counter = Counter()
+        self._total = 0
+        self._version = 0
+        self._loaded_at: Optional[float] = None
+        self._payload_cache: Optional[tuple[int, dict]] = None
+
+    # --- carga / reconciliación ---
+    def is_stale(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at > COUNTERS_RECONCILE_SECONDS
+
+    def ensure_fresh(self, db: Session) -> None:
+        if self.is_stale():
+            self.reconcile(db)
+
+    def reconcile(self, db: Session) -> None:
+        estado = Counter({
+            (e or ""): int(c) for e, c in
+            db.query(Postulacion.estado, sa_func.count(Postulacion.id)).group_by(Postulacion.estado).all()
+        })
+        unidad = Counter({
+            u: int(c) for u, c in
+            db.query(Postulacion.unidad_id, sa_func.count(Postulacion.id)).group_by(Postulacion.unidad_id).all()
+            if u is not None
+        })
+        puesto = Counter({
+            p: int(c) for p, c in
+            db.query(Postulacion.puesto_id, sa_func.count(Postulacion.id)).group_by(Postulacion.puesto_id).all()
+            if p is not None
+        })
+        with self._lock:
+            changed = (estado, unidad, puesto) != (self._estado, self._unidad, self._puesto)
+            self._estado, self._unidad, self._puesto = estado, unidad, puesto
+            self._total = sum(estado.values())
+            if changed or self._loaded_at is None:
+                self._version += 1
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Fuerza recálculo en la próxima lectura."""
+        with self._lock:
+            self._loaded_at = None
+
+    # --- actualizaciones incrementales ---
+    def _apply(self, estado: Optional[str], unidad_id: Optional[int], puesto_id: Optional[int], delta: int) -> None:
+        for c, key in ((self._estado, estado or ""), (self._unidad, unidad_id), (self._puesto, puesto_id)):
+            if key is None:
+                continue
+            c[key] += delta
+            if c[key] <= 0:
+                del c[key]  # sin claves en 0: la comparación con la DB es exacta
+        self._total += delta
+
+    def on_create(self, estado: Optional[str], unidad_id: Optional[int], puesto_id: Optional[int]) -> None:
+        with self._lock:
+            if self._loaded_at is None:
+                return  # se cargará completo en la próxima lectura
+            self._apply(estado, unidad_id, puesto_id, +1)
+            self._version += 1
+
+    def on_delete(self, estado: Optional[str], unidad_id: Optional[int], puesto_id: Optional[int]) -> None:
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._apply(estado, unidad_id, puesto_id, -1)
+            self._version += 1
+
+    def on_change(self, before: tuple, after: tuple) -> None:
+        """before/after = (estado, unidad_id, puesto_id)"""
+        if before == after:
+            return
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._apply(*before, -1)
+            self._apply(*after, +1)
+            self._version += 1
+
+    # --- lecturas O(1) ---
+    @property
+    def etag(self) -> str:
+        return f'W/"counts-{self._boot}-{self._version}"'
+
+    def counts_payload(self) -> tuple[dict, str]:
+        """
+        Payload de /postulaciones/counts (keys de estado en minúscula + total,
+        más desglose por unidad y puesto). Se arma una vez por versión.
+        """
+        with self._lock:
+            cached = self._payload_cache
+            if cached and cached[0] == self._version:
+                return cached[1], self.etag
+            res = {k: 0 for k in ESTADOS_DASHBOARD}
+            for estado, cnt in self._estado.items():
+                key = estado.strip().lower()
+                if key in res:
+                    res[key] += cnt
+                # Otros estados no mapeados se ignoran en detalle, pero suman al total.
+            res["total"] = self._total
+            res["por_unidad"] = {str(k): v for k, v in self._unidad.items()}
+            res["por_puesto"] = {str(k): v for k, v in self._puesto.items()}
+            self._payload_cache = (self._version, res)
+            return res, self.etag
+
+    def por_estado(self) -> dict[str, int]:
+        with self._lock:
+            out = dict(self._estado)
+            out["total"] = self._total
+            return out
+
+    def count(self, estado: str) -> int:
+        with self._lock:
+            return self._estado.get(estado, 0)
+
+
+counters = PostulacionesCounters()
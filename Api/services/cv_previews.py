@@ -0,0 +1,101 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Optional
+
+from utils.files import cv_disk_path
+from utils.cv_preview import render_preview, preview_paths
+
+CV_PREVIEW_ENABLED = os.getenv("CV_PREVIEW_ENABLED", "true").lower() == "true"
+CV_PREVIEW_WORKERS = int(os.getenv("CV_PREVIEW_WORKERS", "2"))
+
+
+class PreviewPool:
+    """
+    Pool de procesos para generar vistas previas fuera del request (el render
+    es CPU puro). Se crea en el primer uso; 'spawn' para no heredar threads
+    ni conexiones del proceso de la API.
+    """
+
+    def __init__(self, workers: int = CV_PREVIEW_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending: set[str] = set()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=max(1, self.workers),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def schedule(self, stored_name: str, force: bool = False) -> Optional[Future]:
+        """Encola la vista previa de un CV (no bloquea). None si ya existe o está en curso."""
+        if not CV_PREVIEW_ENABLED:
+            return None
+        path = cv_disk_path(stored_name)
+        if not force and os.path.exists(preview_paths(path)[1]):
+            return None  # mismo blob (CAS) ya procesado
+        with self._lock:
+            if path in self._pending:
+                return None
+            self._pending.add(path)
+        try:
+            fut = self._get_executor().submit(render_preview, path)
+        except Exception as e:
+            self._pending.discard(path)
+            print(f"[CV_PREVIEW_ERROR] {stored_name} {e}")
+            return None
+        fut.add_done_callback(lambda f, p=path, n=stored_name: self._done(p, n, f))
+        return fut
+
+    def _done(self, path: str, stored_name: str, fut: Future) -> None:
+        with self._lock:
+            self._pending.discard(path)
+        exc = fut.exception()
+        if exc:
+            print(f"[CV_PREVIEW_ERROR] {stored_name} {exc}")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            ex, self._executor = self._executor, None
+        if ex:
+            ex.shutdown(wait=False, cancel_futures=True)
+
+
+previews = PreviewPool()
+
+
+if __name__ == "__main__":
+    # python -m services.cv_previews [--force] [--workers N]
+    # Genera las vistas previas que falten para todas las postulaciones.
+    import argparse
+    from concurrent.futures import as_completed
+    from config.database import SessionLocal
+    import models.puestos, models.unidades_negocio, models.usuarios  # noqa: F401 (mappers de las relaciones)
+    from models.postulaciones import Postulacion
+
+    parser = argparse.ArgumentParser(description="Backfill de vistas previas de CV")
+    parser.add_argument("--force", action="store_true", help="regenerar aunque ya existan")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        names = [n for (n,) in db.query(Postulacion.cv_filename).distinct().all()]
+    finally:
+        db.close()
+
+    pool = PreviewPool(args.workers)
+    futures = [f for f in (pool.schedule(n, force=args.force) for n in names
+                           if os.path.isfile(cv_disk_path(n))) if f]
+    ok = 0
+    for fut in as_completed(futures):
+        if not fut.exception():
+            ok += 1
+    pool.shutdown()
+    print(f"[CV_PREVIEW] {ok}/{len(futures)} vistas previas generadas ({len(names)} CVs en total)")
@@ -0,0 +1,211 @@
+import os
+import time
+import uuid
+import hashlib
+from typing import Optional
+from sqlalchemy import update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models.cv_blobs import CVBlob
+from models.postulaciones import Postulacion
+from utils.cv_preview import preview_paths
+from utils.files import (
+    STORAGE_DIR, CAS_PREFIX, UPLOAD_CHUNK_BYTES,
+    blob_sha, blob_disk_path, cv_disk_path, ensure_dir, place_cv_blob, discard_tmp,
+)
+
+_UPSERT = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+class CVStorageService:
+    """Contador de referencias de los blobs CAS (ver utils.files.CAS_PREFIX)."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    # === +1 referencia (dentro de la transacción del llamador, sin commit) ===
+    def acquire(self, stored_name: str, size: int) -> None:
+        sha = blob_sha(stored_name)
+        if not sha:
+            return  # layout viejo: sin conteo
+        dialect = self.db.get_bind().dialect.name
+        if dialect in _UPSERT:
+            # Un solo statement (INSERT ... ON CONFLICT DO UPDATE), también seguro en paralelo
+            stmt = _UPSERT[dialect](CVBlob).values(sha256=sha, size=size, refs=1)
+            self.db.execute(stmt.on_conflict_do_update(
+                index_elements=[CVBlob.sha256], set_={"refs": CVBlob.refs + 1},
+            ))
+            return
+        if self._incr(sha, +1):
+            return
+        try:
+            with self.db.begin_nested():
+                self.db.add(CVBlob(sha256=sha, size=size, refs=1))
+        except IntegrityError:
+            # otro request lo insertó en paralelo
+            self._incr(sha, +1)
+
+    # === -1 referencia (sin commit). Devuelve el sha para purge_if_unreferenced ===
+    def release(self, stored_name: str) -> Optional[str]:
+        sha = blob_sha(stored_name)
+        if not sha:
+            return None
+        self._incr(sha, -1)
+        return sha
+
+    def _incr(self, sha: str, delta: int) -> bool:
+        res = self.db.execute(
+            update(CVBlob).where(CVBlob.sha256 == sha).values(refs=CVBlob.refs + delta)
+        )
+        return res.rowcount == 1
+
+    # === BORRAR EL ARCHIVO SI YA NADIE LO USA (después del commit) ===
+    def purge_if_unreferenced(self, sha: str) -> bool:
+        """
+        Primero aparta el archivo (rename) y recién después borra la fila con
+        refs <= 0. Si en el medio alguien volvió a referenciarlo, se restaura.
+        Un upload concurrente del mismo contenido siempre vuelve a colocar el
+        blob después de su commit (place_cv_blob), así que no queda colgado.
+        """
+        path = blob_disk_path(sha)
+        trash = f"{path}.del-{uuid.uuid4().hex[:8]}"
+        try:
+            os.replace(path, trash)
+        except FileNotFoundError:
+            trash = None
+
+        self.db.execute(delete(CVBlob).where(CVBlob.sha256 == sha, CVBlob.refs <= 0))
+        self.db.commit()
+        still_used = self.db.query(CVBlob.refs).filter(CVBlob.sha256 == sha, CVBlob.refs > 0).first()
+
+        if trash is None:
+            return not still_used
+        if still_used:
+            if not os.path.exists(path):
+                os.replace(trash, path)
+            else:
+                os.remove(trash)
+            return False
+        os.remove(trash)
+        for side in preview_paths(path):  # vista previa generada al lado del blob
+            try:
+                os.remove(side)
+            except FileNotFoundError:
+                pass
+        return True
+
+    # === MIGRAR ARCHIVOS DEL LAYOUT PLANO (STORAGE_DIR/cv) A CAS ===
+    def migrate_legacy_batch(self, after_id: int = 0, batch_size: int = 200,
+                             keep_old: bool = False) -> tuple[int, int, int]:
+        """
+        Migra hasta batch_size postulaciones con id > after_id que todavía usan
+        un nombre plano. Por cada una: copia+hash a un temporal, actualiza
+        cv_filename y la referencia (commit), coloca el blob y recién ahí borra
+        el archivo viejo. Es reanudable: lo ya migrado no se vuelve a tocar.
+        Devuelve (último id visto, migradas, faltantes).
+        """
+        rows = (
+            self.db.query(Postulacion.id, Postulacion.cv_filename)
+                   .filter(Postulacion.id > after_id, ~Postulacion.cv_filename.like(f"{CAS_PREFIX}%"))
+                   .order_by(Postulacion.id.asc())
+                   .limit(batch_size)
+                   .all()
+        )
+        last_id, migrated, missing = after_id, 0, 0
+        for pid, old_name in rows:
+            last_id = pid
+            old_path = cv_disk_path(old_name)
+            if not os.path.isfile(old_path):
+                missing += 1
+                print(f"[CV_MIGRATE] id={pid} archivo no encontrado: {old_name}")
+                continue
+
+            tmp_path, sha, size = _copy_and_hash(old_path)
+            new_name = CAS_PREFIX + sha
+            try:
+                # update condicional: si la fila cambió mientras tanto, no pisarla
+                res = self.db.execute(
+                    update(Postulacion)
+                    .where(Postulacion.id == pid, Postulacion.cv_filename == old_name)
+                    .values(cv_filename=new_name)
+                )
+                if res.rowcount != 1:
+                    self.db.rollback()
+                    discard_tmp(tmp_path)
+                    continue
+                self.acquire(new_name, size)
+                self.db.commit()
+            except BaseException:
+                self.db.rollback()
+                discard_tmp(tmp_path)
+                raise
+            place_cv_blob(tmp_path, new_name)
+            migrated += 1
+
+            if not keep_old:
+                still_used = self.db.query(Postulacion.id).filter(Postulacion.cv_filename == old_name).first()
+                if not still_used:
+                    # junto con la vista previa que se haya generado al lado del archivo viejo
+                    for path in (old_path, *preview_paths(old_path)):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+        return last_id, migrated, missing
+
+
+def _copy_and_hash(src: str) -> tuple[str, str, int]:
+    tmp_dir = os.path.join(STORAGE_DIR, "cas", ".tmp")
+    ensure_dir(tmp_dir)
+    tmp_path = os.path.join(tmp_dir, f"{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(src, "rb") as inp, open(tmp_path, "wb") as out:
+            while True:
+                chunk = inp.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                out.write(chunk)
+    except BaseException:
+        discard_tmp(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), size
+
+
+if __name__ == "__main__":
+    # python -m services.cv_storage [--batch 200] [--sleep 0.5] [--desde-id 0] [--keep-old]
+    # Migra los CVs del directorio plano STORAGE_DIR/cv al layout CAS particionado,
+    # por lotes y sin cortar el servicio. Se puede interrumpir y volver a correr.
+    import argparse
+    from config.database import SessionLocal
+    import models.puestos, models.unidades_negocio, models.usuarios  # noqa: F401 (mappers de las relaciones)
+
+    parser = argparse.ArgumentParser(description="Migra CVs de STORAGE_DIR/cv a STORAGE_DIR/cas")
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--sleep", type=float, default=0.5, help="pausa entre lotes (seg.)")
+    parser.add_argument("--desde-id", type=int, default=0)
+    parser.add_argument("--keep-old", action="store_true", help="no borrar los archivos viejos")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        svc = CVStorageService(db)
+        last_id, total, faltantes = args.desde_id, 0, 0
+        while True:
+            new_last, n, miss = svc.migrate_legacy_batch(last_id, args.batch, args.keep_old)
+            if new_last == last_id:
+                break
+            last_id = new_last
+            total += n
+            faltantes += miss
+            print(f"[CV_MIGRATE] hasta id={last_id}: {total} migradas, {faltantes} sin archivo")
+            time.sleep(args.sleep)
+        print(f"[CV_MIGRATE] listo: {total} migradas, {faltantes} sin archivo")
+    finally:
+        db.close()
@@ -0,0 +1,193 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
+from typing import Optional
+from sqlalchemy import insert, literal, select
+from sqlalchemy.orm import Session
+
+from config.database import SessionLocal
+from models.postulaciones import Postulacion
+from models.postulaciones_tokens import PostulacionToken
+from services.search import SearchService, CAMPO_CONTENIDO
+from utils.files import cv_disk_path
+from utils.cv_text import extract_tokens
+
+CV_TEXT_ENABLED = os.getenv("CV_TEXT_ENABLED", "true").lower() == "true"
+CV_TEXT_WORKERS = int(os.getenv("CV_TEXT_WORKERS", "2"))
+
+
+class CVTextService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    # === GUARDAR LOS TOKENS DE UN CV EN EL ÍNDICE ===
+    def apply(self, stored_name: str, tokens: list[str]) -> int:
+        """
+        Indexa el contenido en todas las postulaciones que usan ese archivo
+        (con CAS, el mismo CV subido dos veces comparte cv_filename).
+        """
+        pids = [pid for (pid,) in self.db.query(Postulacion.id)
+                                         .filter(Postulacion.cv_filename == stored_name).all()]
+        search = SearchService(self.db)
+        for pid in pids:
+            search.index_contenido(pid, tokens)
+        self.db.commit()
+        return len(pids)
+
+    # === REUSAR LO YA EXTRAÍDO PARA EL MISMO BLOB ===
+    def copy_existing(self, stored_name: str) -> bool:
+        """
+        Si alguna postulación con ese archivo ya tiene el contenido indexado,
+        lo copia (INSERT ... SELECT) a las que todavía no lo tienen y devuelve
+        True: no hace falta volver a extraer el texto.
+        """
+        con_contenido = (
+            select(PostulacionToken.postulacion_id)
+            .where(PostulacionToken.campo == CAMPO_CONTENIDO)
+        )
+        pids = self.db.query(Postulacion.id).filter(Postulacion.cv_filename == stored_name)
+        donor = pids.filter(Postulacion.id.in_(con_contenido)).order_by(Postulacion.id).limit(1).scalar()
+        if donor is None:
+            return False
+        for (pid,) in pids.filter(Postulacion.id.notin_(con_contenido)).all():
+            self.db.execute(insert(PostulacionToken).from_select(
+                ["postulacion_id", "token", "campo", "peso"],
+                select(literal(pid), PostulacionToken.token, PostulacionToken.campo, PostulacionToken.peso)
+                .where(PostulacionToken.postulacion_id == donor, PostulacionToken.campo == CAMPO_CONTENIDO),
+            ))
+        self.db.commit()
+        return True
+
+
+class CVTextIndexer:
+    """
+    Extrae el texto de los CV en un pool de procesos (parseo de PDF/DOCX es CPU
+    puro) y guarda los tokens desde el proceso de la API. 'spawn' para no
+    heredar threads ni conexiones.
+
+    Lo que toca la DB (ver si el blob ya está indexado, guardar los tokens)
+    corre en un único hilo propio: ni en el event loop ni en el hilo interno
+    del ProcessPoolExecutor que entrega los resultados, que quedaría frenado
+    (o muerto por una excepción) para el resto de las extracciones.
+    """
+
+    def __init__(self, workers: int = CV_TEXT_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=max(1, self.workers),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _get_writer(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cv-text")
+            return self._writer
+
+    def schedule(self, stored_name: str) -> Optional[Future]:
+        """Encola el indexado de un CV recién guardado (no bloquea ni toca la DB)."""
+        if not CV_TEXT_ENABLED:
+            return None
+        try:
+            return self._get_writer().submit(self._start, stored_name)
+        except Exception as e:
+            print(f"[CV_TEXT_ERROR] {stored_name} {e}")
+            return None
+
+    def _start(self, stored_name: str) -> None:
+        # Hilo del indexador. Con CAS el mismo archivo puede volver a subirse:
+        # si ya hay contenido para ese blob se copia en vez de extraer otra vez.
+        try:
+            db = SessionLocal()
+            try:
+                if CVTextService(db).copy_existing(stored_name):
+                    return
+            finally:
+                db.close()
+            fut = self._get_executor().submit(extract_tokens, cv_disk_path(stored_name))
+            fut.add_done_callback(lambda f, n=stored_name: self._done(n, f))
+        except Exception as e:
+            print(f"[CV_TEXT_ERROR] {stored_name} {e}")
+
+    def _done(self, stored_name: str, fut: Future) -> None:
+        # Hilo de resultados del pool de procesos: solo pasa el trabajo al hilo del indexador
+        try:
+            self._get_writer().submit(self._apply, stored_name, fut)
+        except Exception as e:
+            print(f"[CV_TEXT_ERROR] {stored_name} {e}")
+
+    def _apply(self, stored_name: str, fut: Future) -> None:
+        if fut.cancelled():
+            return
+        exc = fut.exception()
+        if exc:
+            print(f"[CV_TEXT_ERROR] {stored_name} {exc}")
+            return
+        tokens = fut.result()
+        if tokens is None:
+            print(f"[CV_TEXT] {stored_name}: formato sin extractor disponible")
+            return
+        db = SessionLocal()
+        try:
+            CVTextService(db).apply(stored_name, tokens)
+        except Exception as e:
+            db.rollback()
+            print(f"[CV_TEXT_ERROR] {stored_name} {e}")
+        finally:
+            db.close()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            ex, self._executor = self._executor, None
+            writer, self._writer = self._writer, None
+        if ex:
+            ex.shutdown(wait=False, cancel_futures=True)
+        if writer:
+            writer.shutdown(wait=False, cancel_futures=True)
+
+
+cv_text = CVTextIndexer()
+
+
+if __name__ == "__main__":
+    # python -m services.cv_text [--workers N]
+    # Reindexa el contenido de todos los CV de STORAGE_DIR usando todos los núcleos.
+    import argparse
+    import time
+    import models.puestos, models.unidades_negocio, models.usuarios  # noqa: F401 (mappers de las relaciones)
+
+    parser = argparse.ArgumentParser(description="Reindexado del contenido de los CV")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        names = [n for (n,) in db.query(Postulacion.cv_filename).distinct().all()
+                 if os.path.isfile(cv_disk_path(n))]
+        t0 = time.monotonic()
+        indexed = sin_texto = 0
+        with ProcessPoolExecutor(max_workers=max(1, args.workers),
+                                 mp_context=multiprocessing.get_context("spawn")) as ex:
+            paths = [cv_disk_path(n) for n in names]
+            # chunksize amortiza el ida y vuelta entre procesos con muchos CV chicos
+            chunk = max(1, len(paths) // (args.workers * 8))
+            svc = CVTextService(db)
+            for name, tokens in zip(names, ex.map(extract_tokens, paths, chunksize=chunk)):
+                if tokens is None:
+                    sin_texto += 1
+                    continue
+                svc.apply(name, tokens)
+                indexed += 1
+        print(f"[CV_TEXT_REBUILD] {indexed} CV indexados, {sin_texto} sin texto "
+              f"({args.workers} procesos, {time.monotonic() - t0:.1f}s)")
+    finally:
+        db.close()
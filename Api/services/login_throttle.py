@@ -0,0 +1,74 @@
+import os
+import math
+import time
+import threading
+from collections import deque
+from typing import Optional
+
+# Fallos que cuentan dentro de la ventana (por cuenta y por IP)
+LOGIN_WINDOW_SECONDS = int(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+# Cuenta: fallos sin demora; después cada intento espera el doble desde el último fallo
+# (LOGIN_DELAY_BASE_SECONDS, 2x, 4x... hasta LOGIN_DELAY_MAX_SECONDS). Nunca bloquea la
+# cuenta toda la ventana: alguien que prueba contraseñas ajenas no deja afuera al dueño.
+LOGIN_MAX_FAILS_ACCOUNT = int(os.getenv("LOGIN_MAX_FAILS_ACCOUNT", "5"))
+LOGIN_DELAY_BASE_SECONDS = float(os.getenv("LOGIN_DELAY_BASE_SECONDS", "1"))
+LOGIN_DELAY_MAX_SECONDS = float(os.getenv("LOGIN_DELAY_MAX_SECONDS", "60"))
+# IP: bloqueo hasta que los fallos salen de la ventana
+LOGIN_MAX_FAILS_IP = int(os.getenv("LOGIN_MAX_FAILS_IP", "20"))
+_MAX_KEYS = 10000
+
+
+class LoginThrottle:
+    """
+    Ventana deslizante de logins fallidos por cuenta y por IP, en memoria
+    (cada worker lleva la suya). Se consulta antes de verificar la
+    contraseña: un intento demorado o bloqueado no gasta bcrypt.
+    Por cuenta la demora crece con cada fallo; por IP es un bloqueo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fails: dict[str, deque] = {}
+
+    def _window(self, key: str, now: float) -> Optional[deque]:
+        q = self._fails.get(key)
+        if q is None:
+            return None
+        while q and q[0] <= now - LOGIN_WINDOW_SECONDS:
+            q.popleft()
+        if not q:
+            del self._fails[key]
+            return None
+        return q
+
+    def retry_after(self, account: str, ip: str) -> Optional[int]:
+        """Segundos a esperar (demora de la cuenta o bloqueo de la IP), None si puede intentar."""
+        now = time.time()
+        wait = 0.0
+        with self._lock:
+            q = self._window(f"a:{account}", now)
+            if q is not None and len(q) >= LOGIN_MAX_FAILS_ACCOUNT:
+                excess = len(q) - LOGIN_MAX_FAILS_ACCOUNT
+                delay = min(LOGIN_DELAY_BASE_SECONDS * 2 ** min(excess, 32), LOGIN_DELAY_MAX_SECONDS)
+                wait = q[-1] + delay - now
+            q = self._window(f"i:{ip}", now)
+            if q is not None and len(q) >= LOGIN_MAX_FAILS_IP:
+                # se libera cuando el fallo más viejo que cuenta sale de la ventana
+                wait = max(wait, q[len(q) - LOGIN_MAX_FAILS_IP] + LOGIN_WINDOW_SECONDS - now)
+        return math.ceil(wait) if wait > 0 else None
+
+    def failure(self, account: str, ip: str) -> None:
+        now = time.time()
+        with self._lock:
+            if len(self._fails) >= _MAX_KEYS:
+                for key in list(self._fails):
+                    self._window(key, now)
+            for key in (f"a:{account}", f"i:{ip}"):
+                self._fails.setdefault(key, deque()).append(now)
+
+    def success(self, account: str) -> None:
+        with self._lock:
+            self._fails.pop(f"a:{account}", None)
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,194 @@
+"""
+Chequeo de punta a punta de mail_outbox contra un servidor SMTP local (aiosmtpd).
+
+Encola correos, arranca los workers y espera a que la cola se vacíe. Verifica:
+  - reutilización: cada worker abre una sola sesión SMTP para toda la tanda
+  - reconexión: si el servidor cortó la sesión ociosa, el siguiente correo sale
+    por una conexión nueva sin duplicarse ni gastar un intento extra
+  - backoff: un corte o un 4xx durante DATA no se reintenta en el momento; el
+    correo vuelve a "pendiente" y sale una sola vez cuando vence el backoff
+
+aiosmtpd es solo para este chequeo (pip install aiosmtpd), no va en requirements.txt.
+Usa la base de DATABASE_URL y no corre si mail_outbox tiene correos sin enviar:
+
+    DATABASE_URL=sqlite:////tmp/mail_check.db python -m services.mail_check [--correos 20] [--workers 2]
+"""
+import sys
+import time
+import socket
+import threading
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+import services.mail_outbox as mail_outbox
+import utils.mailer as mailer
+from models.mail_outbox import MailOutbox
+from services.mail_outbox import MailOutboxService, MailWorkerPool
+
+_DEST = ["rrhh@ejemplo.com"]
+# Asunto -> qué hace el servidor con ese correo
+_CORTAR_DESPUES = "[mail_check] cortar-sesion-despues"   # acepta y cierra la sesión (queda ociosa y muerta)
+_CORTAR_EN_DATA = "[mail_check] cortar-en-data"          # cierra la conexión sin responder al DATA (1ra vez)
+_RECHAZAR_4XX = "[mail_check] 451"                       # 451 temporal al DATA (1ra vez)
+
+
+class _Handler:
+    """Handler de aiosmtpd: registra cada correo recibido y la sesión por la que llegó."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.recibidos: list[tuple[str, int]] = []      # (asunto, id de sesión)
+        self.sesiones: set[int] = set()
+        self._fallas: set[str] = set()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        with self.lock:
+            self.sesiones.add(id(session))
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        subject = ""
+        for line in envelope.content.decode("utf-8", "replace").splitlines():
+            if line.lower().startswith("subject:"):
+                subject = line.split(":", 1)[1].strip()
+                break
+        with self.lock:
+            primera = subject not in self._fallas
+            if subject in (_CORTAR_EN_DATA, _RECHAZAR_4XX) and primera:
+                self._fallas.add(subject)
+                if subject == _RECHAZAR_4XX:
+                    return "451 4.3.0 Falla temporal (mail_check)"
+                server.transport.close()
+                return "250 OK"   # no llega: la conexión ya está cerrada
+            self.recibidos.append((subject, id(session)))
+        if subject == _CORTAR_DESPUES:
+            server.loop.call_soon(server.transport.close)
+        return "250 OK"
+
+
+def _free_port() -> int:
+    # aiosmtpd no acepta port=0 (se conecta a sí mismo para confirmar que arrancó)
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait(db: Session, timeout: float) -> bool:
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        db.expire_all()
+        if not db.query(MailOutbox.id).filter(MailOutbox.estado.in_(("pendiente", "enviando"))).first():
+            db.rollback()
+            return True
+        db.rollback()
+        time.sleep(0.1)
+    return False
+
+
+def _job(db: Session, subject: str) -> Optional[MailOutbox]:
+    db.expire_all()
+    return db.query(MailOutbox).filter(MailOutbox.subject == subject).order_by(MailOutbox.id.desc()).first()
+
+
+def check(db: Session, correos: int = 20, workers: int = 2, timeout: float = 30) -> list[str]:
+    """Devuelve la lista de fallas (vacía = todo bien)."""
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        raise ValueError("Falta aiosmtpd (pip install aiosmtpd): solo hace falta para este chequeo")
+    if not mailer.MAIL_ENABLED:
+        raise ValueError("MAIL_ENABLED=false: los workers no envían nada")
+    if db.query(MailOutbox.id).filter(MailOutbox.estado.in_(("pendiente", "enviando"))).first():
+        raise ValueError("mail_outbox tiene correos sin enviar: correr sobre una base descartable")
+
+    handler = _Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    # Los workers leen la configuración del módulo en cada uso
+    mailer.SMTP_HOST, mailer.SMTP_PORT = "127.0.0.1", controller.port
+    mailer.SMTP_SECURITY, mailer.SMTP_USERNAME = "none", ""
+    mail_outbox.MAIL_POLL_SECONDS = 0.1
+    mail_outbox.MAIL_RETRY_BASE_SECONDS = 1
+    pool = MailWorkerPool(size=workers)
+    svc = MailOutboxService(db)
+    fallas = []
+    try:
+        # 1) una tanda: una sesión por worker, cada correo una vez
+        asuntos = [f"[mail_check] tanda {i}" for i in range(correos)]
+        svc.enqueue_many([(s, _DEST, "<p>mail_check</p>", "mail_check") for s in asuntos])
+        t0 = time.perf_counter()
+        pool.start()
+        if not _wait(db, timeout):
+            fallas.append(f"tanda: la cola no se vació en {timeout:.0f}s")
+        ms = (time.perf_counter() - t0) * 1000
+        sesiones = len(handler.sesiones)
+        print(f"[MAIL_CHECK] tanda: {correos} correos en {ms:.0f}ms, {sesiones} sesiones SMTP")
+        if sesiones > workers:
+            fallas.append(f"tanda: {sesiones} sesiones SMTP para {workers} workers (no se reutilizan)")
+
+        # 2) sesión cortada por el servidor entre correos: reconecta una vez, sin duplicar
+        pool.stop()
+        pool = MailWorkerPool(size=1)
+        svc.enqueue_many([(_CORTAR_DESPUES, _DEST, "<p>1</p>", None),
+                          ("[mail_check] despues-del-corte", _DEST, "<p>2</p>", None)])
+        antes = len(handler.sesiones)
+        pool.start()
+        if not _wait(db, timeout):
+            fallas.append("reconexión: la cola no se vació")
+        job = _job(db, "[mail_check] despues-del-corte")
+        print(f"[MAIL_CHECK] reconexión: {len(handler.sesiones) - antes} sesiones nuevas, intentos={job.intentos}")
+        if job.estado != "enviado" or job.intentos != 1:
+            fallas.append(f"reconexión: estado={job.estado} intentos={job.intentos} (esperado enviado/1)")
+
+        # 3) falla adentro de la transacción: sin reintento inmediato, sale tras el backoff
+        for subject in (_CORTAR_EN_DATA, _RECHAZAR_4XX):
+            svc.enqueue(subject, _DEST, "<p>x</p>")
+            t0 = time.perf_counter()
+            if not _wait(db, timeout):
+                fallas.append(f"{subject}: la cola no se vació")
+                continue
+            s = time.perf_counter() - t0
+            job = _job(db, subject)
+            print(f"[MAIL_CHECK] {subject}: enviado en {s:.1f}s, intentos={job.intentos}, error={job.ultimo_error!r}")
+            if job.estado != "enviado" or job.intentos != 2:
+                fallas.append(f"{subject}: estado={job.estado} intentos={job.intentos} (esperado enviado/2)")
+            if s < mail_outbox.MAIL_RETRY_BASE_SECONDS:
+                fallas.append(f"{subject}: reintentó a los {s:.2f}s, antes del backoff")
+
+        # cada correo llegó exactamente una vez
+        duplicados = [s for s, n in Counter(s for s, _ in handler.recibidos).items() if n > 1]
+        if duplicados:
+            fallas.append(f"duplicados: {', '.join(duplicados)}")
+        esperados = correos + 4
+        if len(handler.recibidos) != esperados:
+            fallas.append(f"recibidos {len(handler.recibidos)} correos, esperados {esperados}")
+    finally:
+        pool.stop()
+        controller.stop()
+    return fallas
+
+
+if __name__ == "__main__":
+    import argparse
+    from config.database import SessionLocal, engine, Base
+
+    parser = argparse.ArgumentParser(description="mail_outbox contra un SMTP local (aiosmtpd)")
+    parser.add_argument("--correos", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine, tables=[MailOutbox.__table__])
+    db = SessionLocal()
+    try:
+        fallas = check(db, args.correos, args.workers, args.timeout)
+    finally:
+        db.close()
+
+    for falla in fallas:
+        print(f"[MAIL_CHECK] FALLA {falla}")
+    print(f"[MAIL_CHECK] {'OK' if not fallas else f'{len(fallas)} fallas'}")
+    sys.exit(1 if fallas else 0)
@@ -0,0 +1,170 @@
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from config.database import SessionLocal
+from models.mail_outbox import MailOutbox
+from utils.mailer import SMTPConnection, build_message, MAIL_ENABLED
+
+MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", "2"))
+MAIL_POLL_SECONDS = float(os.getenv("MAIL_POLL_SECONDS", "5"))
+MAIL_MAX_INTENTOS = int(os.getenv("MAIL_MAX_INTENTOS", "6"))
+MAIL_RETRY_BASE_SECONDS = int(os.getenv("MAIL_RETRY_BASE_SECONDS", "30"))
+MAIL_RETRY_MAX_SECONDS = int(os.getenv("MAIL_RETRY_MAX_SECONDS", "3600"))
+MAIL_LEASE_SECONDS = int(os.getenv("MAIL_LEASE_SECONDS", "300"))  # si un worker muere enviando
+
+
+class MailOutboxService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    # === ENCOLAR (lo único que hace el request) ===
+    def enqueue_many(self, mails: Iterable[tuple[str, list[str], str, Optional[str]]], commit: bool = True) -> int:
+        """mails = [(subject, destinatarios, html, text), ...]"""
+        now = datetime.now(timezone.utc)
+        n = 0
+        for subject, to, html, text in mails:
+            to_list = [t.strip() for t in to if t and t.strip()]
+            if not to_list:
+                continue
+            if not MAIL_ENABLED:
+                print(f"[MAIL_DISABLED] {subject} -> {', '.join(to_list)}")
+                continue
+            self.db.add(MailOutbox(
+                subject=subject[:255], destinatarios=",".join(to_list), html=html, text=text,
+                estado="pendiente", intentos=0, proximo_intento=now,
+            ))
+            n += 1
+        if n and commit:
+            self.db.commit()
+            mail_workers.wake()
+        # commit=False: quien hace el commit llama a mail_workers.wake() (antes no hay nada que mandar)
+        return n
+
+    def enqueue(self, subject: str, to: list[str], html: str, text: Optional[str] = None) -> int:
+        return self.enqueue_many([(subject, to, html, text)])
+
+    # === TOMAR UN TRABAJO (claim atómico, seguro entre workers/procesos) ===
+    def claim(self) -> Optional[MailOutbox]:
+        now = datetime.now(timezone.utc)
+        for _ in range(5):
+            job = (
+                self.db.query(MailOutbox)
+                       .filter(
+                           MailOutbox.estado.in_(("pendiente", "enviando")),
+                           MailOutbox.proximo_intento <= now,
+                       )
+                       .order_by(MailOutbox.id.asc())
+                       .first()
+            )
+            if not job:
+                self.db.rollback()
+                return None
+            res = self.db.execute(
+                update(MailOutbox)
+                .where(
+                    MailOutbox.id == job.id,
+                    MailOutbox.estado == job.estado,
+                    MailOutbox.intentos == job.intentos,
+                )
+                .values(
+                    estado="enviando",
+                    intentos=MailOutbox.intentos + 1,
+                    proximo_intento=now + timedelta(seconds=MAIL_LEASE_SECONDS),
+                )
+            )
+            self.db.commit()
+            if res.rowcount == 1:
+                self.db.refresh(job)
+                return job
+            # otro worker lo tomó primero: probar con el siguiente
+        return None
+
+    def mark_sent(self, job: MailOutbox) -> None:
+        job.estado = "enviado"
+        job.enviado_en = datetime.now(timezone.utc)
+        job.ultimo_error = None
+        self.db.commit()
+
+    def mark_failed(self, job: MailOutbox, error: Exception) -> None:
+        job.ultimo_error = str(error)[:500]
+        if job.intentos >= MAIL_MAX_INTENTOS:
+            job.estado = "fallido"
+            print(f"[MAIL_ERROR] outbox id={job.id} descartado tras {job.intentos} intentos: {error}")
+        else:
+            # backoff exponencial: 30s, 60s, 120s, ... (tope MAIL_RETRY_MAX_SECONDS)
+            delay = min(MAIL_RETRY_BASE_SECONDS * (2 ** (job.intentos - 1)), MAIL_RETRY_MAX_SECONDS)
+            job.estado = "pendiente"
+            job.proximo_intento = datetime.now(timezone.utc) + timedelta(seconds=delay)
+            print(f"[MAIL_RETRY] outbox id={job.id} intento={job.intentos} en {delay}s: {error}")
+        self.db.commit()
+
+
+class MailWorkerPool:
+    """
+    Pool de threads que vacían mail_outbox. Cada worker mantiene su propia
+    sesión SMTP abierta y la reutiliza entre mensajes.
+    """
+
+    def __init__(self, size: int = MAIL_WORKERS):
+        self.size = size
+        self._threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def start(self) -> None:
+        if self._threads or not MAIL_ENABLED or self.size <= 0:
+            return
+        self._stop.clear()
+        for i in range(self.size):
+            t = threading.Thread(target=self._run, name=f"mail-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        conn = SMTPConnection()
+        try:
+            while not self._stop.is_set():
+                if not self._process_one(conn):
+                    self._wake.wait(MAIL_POLL_SECONDS)
+                    self._wake.clear()
+        finally:
+            conn.close()
+
+    def _process_one(self, conn: SMTPConnection) -> bool:
+        db = SessionLocal()
+        try:
+            svc = MailOutboxService(db)
+            job = svc.claim()
+            if not job:
+                return False
+            msg = build_message(job.subject, job.destinatarios.split(","), job.html, job.text)
+            try:
+                conn.send(msg)
+            except Exception as e:
+                conn.close()
+                svc.mark_failed(job, e)
+            else:
+                svc.mark_sent(job)
+            return True
+        except Exception as e:
+            print(f"[MAIL_WORKER_ERROR] {e}")
+            return False
+        finally:
+            db.close()
+
+
+mail_workers = MailWorkerPool()
@@ -0,0 +1,82 @@
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from utils.passwords import hash_password, verify_and_update
+
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+# Operaciones en curso + en cola; por encima se rechaza en vez de acumular espera
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", "32"))
+
+
+class PasswordPoolBusy(Exception):
+    pass
+
+
+class PasswordPool:
+    """
+    Pool de procesos para bcrypt (cada hash/verify son cientos de ms de CPU).
+    Así una ráfaga de logins no ocupa el threadpool de los endpoints sync ni
+    el GIL del proceso de la API. Acotado: con PASSWORD_MAX_PENDING
+    operaciones pendientes, las siguientes fallan con PasswordPoolBusy.
+    """
+
+    def __init__(self, workers: int = PASSWORD_WORKERS, max_pending: int = PASSWORD_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=max(1, self.workers),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _reset(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordPoolBusy()
+            self._pending += 1
+        try:
+            for attempt in range(2):
+                ex = self._get_executor()
+                try:
+                    return await asyncio.wrap_future(ex.submit(fn, *args))
+                except BrokenProcessPool:
+                    # Un worker murió (OOM, kill): se recrea el pool y se reintenta una vez
+                    self._reset(ex)
+                    if attempt:
+                        raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify_and_update(self, plain: str, hashed: str) -> tuple[bool, Optional[str]]:
+        return await self._run(verify_and_update, plain, hashed)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            ex, self._executor = self._executor, None
+        if ex:
+            ex.shutdown(wait=False, cancel_futures=True)
+
+
+passwords = PasswordPool()
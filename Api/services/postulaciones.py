@@ -1,31 +1,114 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func as sa_func
-from typing import Optional
+from sqlalchemy import func as sa_func, update, asc, desc
+from typing import List, Optional
 from datetime import datetime, timezone, date
 
 from models.postulaciones import Postulacion
 from schemas.postulaciones import PostulacionUpdate
+from services.search import SearchService, tokenize
+from services.counters import counters
+from services.cv_storage import CVStorageService
+from utils.cursor import encode_cursor, decode_cursor
+
+# Campos cubiertos por el índice de búsqueda
+_SEARCH_FIELDS = ("nombre", "apellido", "correo")
+
+# Columnas propias que salen en la exportación (ver utils.export.EXPORT_COLUMNS)
+_EXPORT_FIELDS = ("id", "nombre", "apellido", "correo", "telefono", "dni", "fecha_nacimiento",
+                  "estado_civil", "hijos", "domicilio_residencia", "localidad", "estado", "nota",
+                  "decidido_motivo", "decidido_en", "created_at", "cv_original")
+
+# Columnas de una fila del listado del admin (schemas.PostulacionListItem)
+_LIST_FIELDS = ("id", "nombre", "apellido", "correo", "telefono", "estado", "nota",
+                "unidad_id", "puesto_id", "unidad_original_id", "puesto_original_id",
+                "decidido_motivo", "decidido_por_user_id", "decidido_en", "created_at")
+
+# sort -> (descendente, nullable); cada uno usa su índice compuesto (clave, id)
+_KEYSET_SORTS = {
+    "reciente":  (True, False),
+    "antiguo":   (False, False),
+    "nombre_az": (False, False),
+    "nombre_za": (True, False),
+    "procesado": (True, True),
+}
+
+
+def _order_clause(sort: str):
+    sort_map = {
+        "reciente":  desc(Postulacion.created_at),
+        "antiguo":   asc(Postulacion.created_at),
+        "nombre_az": asc(sa_func.lower(Postulacion.nombre)),
+        "nombre_za": desc(sa_func.lower(Postulacion.nombre)),
+        "procesado": desc(Postulacion.decidido_en),   # los últimos procesados primero
+    }
+    return sort_map.get(sort, desc(Postulacion.created_at))
+
+
+def _keyset_key(sort: str):
+    descending, nullable = _KEYSET_SORTS[sort]
+    if sort in ("nombre_az", "nombre_za"):
+        expr = sa_func.lower(Postulacion.nombre)
+    elif sort == "procesado":
+        expr = Postulacion.decidido_en
+    else:
+        expr = Postulacion.created_at
+    return expr, descending, nullable
+
+
+def _keyset_value(sort: str, obj):
+    if sort in ("nombre_az", "nombre_za"):
+        return (obj.nombre or "").lower()
+    if sort == "procesado":
+        return obj.decidido_en
+    return obj.created_at
+
+
+def _with_nombres(query, fields):
+    """
+    Proyecta solo `fields` de Postulacion más los nombres de unidad/puesto
+    (actuales y originales) por LEFT JOIN: una sola query, sin cargar
+    relaciones ni instancias ORM.
+    """
+    from sqlalchemy.orm import aliased
+    from models.puestos import Puesto
+    from models.unidades_negocio import UnidadNegocio
+
+    unidad, unidad_orig = aliased(UnidadNegocio), aliased(UnidadNegocio)
+    puesto, puesto_orig = aliased(Puesto), aliased(Puesto)
+    return (
+        query.with_entities(
+            *(getattr(Postulacion, c) for c in fields),
+            unidad.nombre.label("unidad_nombre"), puesto.nombre.label("puesto_nombre"),
+            unidad_orig.nombre.label("unidad_original_nombre"), puesto_orig.nombre.label("puesto_original_nombre"),
+        )
+        .outerjoin(unidad, unidad.id == Postulacion.unidad_id)
+        .outerjoin(puesto, puesto.id == Postulacion.puesto_id)
+        .outerjoin(unidad_orig, unidad_orig.id == Postulacion.unidad_original_id)
+        .outerjoin(puesto_orig, puesto_orig.id == Postulacion.puesto_original_id)
+    )
 
 
 class PostulacionesService:
     def __init__(self, db: Session):
         self.db = db
 
-    # === LISTADO GENERAL CON FILTROS Y PAGINADO ===
-    def list(self, q: Optional[str], estado: Optional[str], puesto_id: Optional[int],
-             unidad_id: Optional[int], limit: int, offset: int, sort: str = "reciente"):
+    # === QUERY BASE CON FILTROS (compartida por list / list_keyset) ===
+    def _filtered_query(self, q: Optional[str], estado: Optional[str],
+                        puesto_id: Optional[int], unidad_id: Optional[int],
+                        contenido: Optional[str] = None):
+        """Query de Postulacion con los filtros del listado (búsqueda incluida, como subquery)."""
         from models.puestos import Puesto
-        from sqlalchemy import asc, desc, func as sa_func, or_
-        
+        from sqlalchemy import or_
+
         query = self.db.query(Postulacion)
 
-        if q:
-            like = f"%{q}%"
-            query = query.filter(
-                (Postulacion.nombre.ilike(like)) |
-                (Postulacion.apellido.ilike(like)) |
-                (Postulacion.correo.ilike(like))
-            )
+        if q and tokenize(q):
+            # Índice de tokens (prefijo, sin acentos) en vez de ILIKE '%q%'
+            query = query.filter(SearchService(self.db).match(q))
+
+        if contenido and tokenize(contenido):
+            # Texto de los CV (services.cv_text), ya indexado: no se abren archivos acá
+            query = query.filter(SearchService(self.db).match(contenido, contenido=True))
 
         if estado:
             query = query.filter(Postulacion.estado == estado)
@@ -56,26 +139,105 @@ class PostulacionesService:
             query = query.filter(
                 or_(Postulacion.puesto_id == puesto_id, Postulacion.puesto_original_id == puesto_id)
             )
+        return query
 
-        # Ordenamiento
-        _sort_map = {
-            "reciente":  desc(Postulacion.created_at),
-            "antiguo":   asc(Postulacion.created_at),
-            "nombre_az": asc(sa_func.lower(Postulacion.nombre)),
-            "nombre_za": desc(sa_func.lower(Postulacion.nombre)),
-            "procesado": desc(Postulacion.decidido_en),   # los últimos procesados primero
-        }
-        order_clause = _sort_map.get(sort, desc(Postulacion.created_at))
+    # === LISTADO GENERAL CON FILTROS Y PAGINADO ===
+    def list(self, q: Optional[str], estado: Optional[str], puesto_id: Optional[int],
+             unidad_id: Optional[int], limit: int, offset: int, sort: str = "reciente",
+             contenido: Optional[str] = None):
+        query = self._filtered_query(q, estado, puesto_id, unidad_id, contenido)
+
+        order_clause = _order_clause(sort)
 
         total = query.count()
         items = (
-            query.order_by(order_clause)
+            _with_nombres(query, _LIST_FIELDS)
+                 .order_by(order_clause)
                  .offset(offset)
                  .limit(limit)
                  .all()
         )
         return items, total
 
+    # === EXPORTAR (CSV/XLSX): mismas condiciones que list(), sin paginar ===
+    def export_rows(self, q: Optional[str], estado: Optional[str], puesto_id: Optional[int],
+                    unidad_id: Optional[int], sort: str = "reciente", contenido: Optional[str] = None,
+                    chunk: int = 1000):
+        """
+        Itera las filas a exportar con los nombres de unidad/puesto (actuales y
+        originales) resueltos por JOIN. yield_per lee por lotes con cursor del
+        lado del servidor (stream_results): la memoria no depende del total.
+        """
+        query = self._filtered_query(q, estado, puesto_id, unidad_id, contenido)
+        query = _with_nombres(query, _EXPORT_FIELDS).order_by(_order_clause(sort), Postulacion.id)
+        yield from query.yield_per(chunk)
+
+    # === ARCHIVOS DE CV (descarga en ZIP) ===
+    def cv_files(self, q: Optional[str], estado: Optional[str], puesto_id: Optional[int],
+                 unidad_id: Optional[int], contenido: Optional[str] = None,
+                 ids: Optional[List[int]] = None, limit: int = 500) -> list:
+        """(id, cv_filename, cv_original) de las postulaciones filtradas; ids acota a esos."""
+        query = self._filtered_query(q, estado, puesto_id, unidad_id, contenido)
+        if ids:
+            query = query.filter(Postulacion.id.in_(ids))
+        return (
+            query.with_entities(Postulacion.id, Postulacion.cv_filename, Postulacion.cv_original)
+                 .order_by(Postulacion.id.asc())
+                 .limit(limit)
+                 .all()
+        )
+
+    # === LISTADO POR CURSOR (keyset): sin COUNT ni OFFSET ===
+    def list_keyset(self, q: Optional[str], estado: Optional[str], puesto_id: Optional[int],
+                    unidad_id: Optional[int], limit: int, cursor: Optional[str] = None,
+                    sort: str = "reciente", contenido: Optional[str] = None):
+        """
+        Devuelve (items, next_cursor). El cursor codifica (clave de orden, id)
+        del último item; next_cursor es None cuando no hay más páginas.
+        En "procesado" las no decididas (decidido_en NULL) van al final.
+        """
+        from sqlalchemy import and_, or_
+
+        if sort not in _KEYSET_SORTS:
+            sort = "reciente"
+        key_expr, descending, nullable = _keyset_key(sort)
+
+        query = self._filtered_query(q, estado, puesto_id, unidad_id, contenido)
+        base = query
+
+        id_order = Postulacion.id.desc() if descending else Postulacion.id.asc()
+        en_nulls = False
+        if cursor:
+            key, last_id = decode_cursor(cursor, sort)
+            id_cmp = Postulacion.id < last_id if descending else Postulacion.id > last_id
+            if key is None:
+                # ya estamos en el tramo de NULLs (solo columnas nullable)
+                en_nulls = True
+                query = query.filter(key_expr.is_(None), id_cmp)
+            else:
+                key_cmp = key_expr < key if descending else key_expr > key
+                query = query.filter(or_(key_cmp, and_(key_expr == key, id_cmp)))
+
+        if en_nulls:
+            rows = _with_nombres(query, _LIST_FIELDS).order_by(id_order).limit(limit + 1).all()
+        else:
+            # NULLs al final, igual en Postgres y SQLite: primero el tramo con clave y, si
+            # no alcanza, el de NULLs. Cada tramo recorre el índice (clave, id) en orden;
+            # ordenar por "clave IS NULL" obligaba a ordenar todas las filas filtradas.
+            key_order = key_expr.desc() if descending else key_expr.asc()
+            head = query.filter(key_expr.isnot(None)) if nullable else query
+            rows = _with_nombres(head, _LIST_FIELDS).order_by(key_order, id_order).limit(limit + 1).all()
+            if nullable and len(rows) <= limit:
+                tail = base.filter(key_expr.is_(None))
+                rows += _with_nombres(tail, _LIST_FIELDS).order_by(id_order).limit(limit + 1 - len(rows)).all()
+
+        items = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit and items:
+            last = items[-1]
+            next_cursor = encode_cursor(sort, _keyset_value(sort, last), last.id)
+        return items, next_cursor
+
     # === OBTENER UNA POSTULACIÓN POR ID ===
     def get(self, id: int) -> Optional[Postulacion]:
         return self.db.query(Postulacion).filter(Postulacion.id == id).first()
@@ -90,7 +252,13 @@ class PostulacionesService:
                            estado_civil: Optional[str] = None,
                            hijos: Optional[bool] = None,
                            domicilio_residencia: Optional[str] = None,
-                           localidad: Optional[str] = None) -> Postulacion:
+                           localidad: Optional[str] = None,
+                           commit: bool = True) -> Postulacion:
+        """
+        Alta desde el formulario. El INSERT vuelve con id/created_at (RETURNING),
+        así que no hace falta refresh. Con commit=False el llamador agrega lo
+        suyo a la misma transacción y cierra con commit_created(obj).
+        """
         obj = Postulacion(
             nombre=nombre, apellido=apellido, correo=correo, telefono=telefono,
             puesto_id=puesto_id, unidad_id=unidad_id, estado="nueva", nota=nota,
@@ -107,16 +275,22 @@ class PostulacionesService:
             localidad=localidad,
         )
         self.db.add(obj)
-        self.db.commit()
-        self.db.refresh(obj)
+        self.db.flush()  # INSERT ... RETURNING: id para el índice y created_at
+        SearchService(self.db).index(obj, nuevo=True)
+        CVStorageService(self.db).acquire(cv_filename, cv_size)
+        if commit:
+            self.commit_created(obj)
         return obj
 
-    # === DECIDIR / CAMBIAR ESTADO ===
-    def decide(self, id: int, *, new_estado: str, motivo: str, reviewer_user_id: int, new_unidad_id: Optional[int] = None, new_puesto_id: Optional[int] = None) -> Postulacion:
-        obj = self.get(id)
-        if not obj:
-            raise ValueError("No encontrado")
+    def commit_created(self, obj: Postulacion) -> None:
+        # Los valores se leen antes del commit (después quedan expirados y leerlos sería otro SELECT)
+        key = (obj.estado, obj.unidad_id, obj.puesto_id)
+        self.db.commit()
+        counters.on_create(*key)
 
+    # === DECIDIR / CAMBIAR ESTADO ===
+    @staticmethod
+    def _validar_decision(new_estado: str, motivo: str) -> tuple[str, str]:
         new_estado = (new_estado or "").strip()
         if not new_estado:
             raise ValueError("Estado no puede estar vacío")
@@ -126,7 +300,16 @@ class PostulacionesService:
         motivo = (motivo or "").strip()
         if not motivo:
             raise ValueError("Motivo obligatorio")
+        return new_estado, motivo
+
+    def decide(self, id: int, *, new_estado: str, motivo: str, reviewer_user_id: int, new_unidad_id: Optional[int] = None, new_puesto_id: Optional[int] = None) -> Postulacion:
+        obj = self.get(id)
+        if not obj:
+            raise ValueError("No encontrado")
+
+        new_estado, motivo = self._validar_decision(new_estado, motivo)
 
+        before = (obj.estado, obj.unidad_id, obj.puesto_id)
         obj.estado = new_estado
         obj.decidido_motivo = motivo
         obj.decidido_por_user_id = reviewer_user_id
@@ -140,8 +323,52 @@ class PostulacionesService:
 
         self.db.commit()
         self.db.refresh(obj)
+        counters.on_change(before, (obj.estado, obj.unidad_id, obj.puesto_id))
         return obj
 
+    # === DECIDIR EN LOTE ===
+    def decide_many(self, ids: List[int], *, new_estado: str, motivo: str, reviewer_user_id: int,
+                    new_unidad_id: Optional[int] = None, new_puesto_id: Optional[int] = None) -> tuple[List[int], dict]:
+        """
+        Misma decisión para muchas postulaciones, en una transacción: un SELECT
+        (valores previos, para los contadores) y un UPDATE por conjunto,
+        sin importar cuántos ids. Devuelve (ids actualizados, cambios aplicados);
+        los ids que no existen simplemente no figuran.
+        """
+        new_estado, motivo = self._validar_decision(new_estado, motivo)
+        ids = list(dict.fromkeys(ids))
+
+        cambios = {
+            "estado": new_estado,
+            "decidido_motivo": motivo,
+            "decidido_por_user_id": reviewer_user_id,
+            "decidido_en": datetime.now(timezone.utc),
+        }
+        if new_unidad_id is not None:
+            cambios["unidad_id"] = new_unidad_id
+        if new_puesto_id is not None:
+            cambios["puesto_id"] = new_puesto_id
+
+        before = {
+            pid: (estado, unidad_id, puesto_id) for pid, estado, unidad_id, puesto_id in
+            self.db.query(Postulacion.id, Postulacion.estado, Postulacion.unidad_id, Postulacion.puesto_id)
+                   .filter(Postulacion.id.in_(ids))
+                   .with_for_update()
+                   .all()
+        }
+        found = [pid for pid in ids if pid in before]
+        if found:
+            self.db.execute(
+                update(Postulacion).where(Postulacion.id.in_(found)).values(**cambios),
+                execution_options={"synchronize_session": False},
+            )
+        self.db.commit()
+
+        for pid in found:
+            prev = before[pid]
+            counters.on_change(prev, (new_estado, cambios.get("unidad_id", prev[1]), cambios.get("puesto_id", prev[2])))
+        return found, cambios
+
     # === ACTUALIZAR POSTULACIÓN ===
     def update(self, id: int, data: PostulacionUpdate) -> Optional[Postulacion]:
         obj = self.get(id)
@@ -153,11 +380,16 @@ class PostulacionesService:
         payload.pop("unidad_original_id", None)  # nunca sobreescribir orig
         payload.pop("puesto_original_id", None)  # nunca sobreescribir orig
 
+        before = (obj.estado, obj.unidad_id, obj.puesto_id)
         for k, v in payload.items():
             setattr(obj, k, v)
 
+        if any(k in payload for k in _SEARCH_FIELDS):
+            SearchService(self.db).index(obj)
+
         self.db.commit()
         self.db.refresh(obj)
+        counters.on_change(before, (obj.estado, obj.unidad_id, obj.puesto_id))
         return obj
 
     # === ELIMINAR POSTULACIÓN ===
@@ -165,28 +397,33 @@ class PostulacionesService:
         obj = self.get(id)
         if not obj:
             return False
+        before = (obj.estado, obj.unidad_id, obj.puesto_id)
+        storage = CVStorageService(self.db)
+        sha = storage.release(obj.cv_filename)
+        SearchService(self.db).remove(obj.id)
         self.db.delete(obj)
         self.db.commit()
+        counters.on_delete(*before)
+        if sha:
+            # el archivo se borra solo cuando era la última referencia
+            try:
+                storage.purge_if_unreferenced(sha)
+            except Exception as e:
+                print(f"[CV_PURGE_ERROR] {sha} {e}")
         return True
 
     # === RESUMEN GENERAL POR ESTADO ===
     def resumen_por_estado(self) -> dict[str, int]:
-        rows = (
-            self.db.query(Postulacion.estado, sa_func.count(Postulacion.id))
-                   .group_by(Postulacion.estado)
-                   .all()
-        )
-        out = { (estado or ""): int(cnt) for estado, cnt in rows }
-        out["total"] = self.db.query(Postulacion).count()
-        return out
+        # Contadores en memoria (se reconcilian con la DB cada COUNTERS_RECONCILE_SECONDS)
+        counters.ensure_fresh(self.db)
+        return counters.por_estado()
 
     # === NUEVOS MÉTODOS ===
 
     # 1️⃣ Cantidad de nuevas
     def count_nuevas(self) -> int:
-        return self.db.query(sa_func.count(Postulacion.id))\
-                      .filter(Postulacion.estado == "nueva")\
-                      .scalar() or 0
+        counters.ensure_fresh(self.db)
+        return counters.count("nueva")
 
     # 2️⃣ Listar por estado (reutilizable)
     def list_by_estado(self, estado: str, limit: Optional[int] = None, offset: int = 0):
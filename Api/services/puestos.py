@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from models.puestos import Puesto
 from schemas.puestos import PuestoCreate, PuestoUpdate
+from services.catalog import catalog
 
 class PuestosService:
     def __init__(self, db: Session): self.db = db
@@ -15,15 +16,18 @@ class PuestosService:
 
     def create(self, data: PuestoCreate) -> Puesto:
         obj = Puesto(**data.model_dump())
-        self.db.add(obj); self.db.commit(); self.db.refresh(obj); return obj
+        self.db.add(obj); self.db.commit(); self.db.refresh(obj)
+        catalog.invalidate(); return obj
 
     def update(self, id: int, data: PuestoUpdate) -> Puesto | None:
         obj = self.get(id); 
         if not obj: return None
         for k, v in data.model_dump(exclude_unset=True).items(): setattr(obj, k, v)
-        self.db.commit(); self.db.refresh(obj); return obj
+        self.db.commit(); self.db.refresh(obj)
+        catalog.invalidate(); return obj
 
     def delete(self, id: int) -> bool:
         obj = self.get(id)
         if not obj: return False
-        self.db.delete(obj); self.db.commit(); return True
+        self.db.delete(obj); self.db.commit()
+        catalog.invalidate(); return True
@@ -0,0 +1,243 @@
+"""
+Chequeo de planes de consulta del listado de postulaciones.
+
+Corre GET /postulaciones (PostulacionesService.list y list_keyset) con cada
+combinación de filtros y orden, hace EXPLAIN de cada SQL que emite y falla si
+alguno recorre la tabla postulaciones entera o si la combinación supera el
+presupuesto de latencia.
+
+    # base descartable con datos sintéticos (solo siembra si la tabla está vacía)
+    DATABASE_URL=sqlite:////tmp/planes.db python -m services.query_plans --sembrar 100000
+
+    # contra la base configurada (los valores de filtro salen de los datos)
+    python -m services.query_plans [--presupuesto-ms 50] [--repeticiones 3]
+
+    # crea en una base existente los índices que create_all no agrega
+    python -m services.query_plans --crear-indices
+"""
+import os
+import re
+import sys
+import time
+import random
+import statistics
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import event, func, insert
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.orm import Session
+
+from models.postulaciones import Postulacion
+from models.puestos import Puesto
+from models.unidades_negocio import UnidadNegocio
+from services.counters import ESTADOS_DASHBOARD
+from services.postulaciones import PostulacionesService, _KEYSET_SORTS
+
+# Tope por combinación (COUNT + página, o página keyset), mediana de las repeticiones
+QUERY_PLAN_BUDGET_MS = float(os.getenv("QUERY_PLAN_BUDGET_MS", "50"))
+
+_TABLE = Postulacion.__tablename__
+# SQLite: "SCAN postulaciones" sin "USING ... INDEX"; Postgres: "Seq Scan on postulaciones"
+_FULL_SCAN = {
+    "sqlite": re.compile(rf"^SCAN {_TABLE}$"),
+    "postgresql": re.compile(rf"Seq Scan on {_TABLE}\b"),
+}
+_EXPLAIN = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+_PAGE = 50
+
+
+def ensure_indexes(engine) -> list[str]:
+    """
+    Crea los índices de postulaciones que falten (create_all no los agrega a
+    tablas existentes). IF NOT EXISTS y no reflexión: el inspector de SQLite
+    no ve los índices por expresión como lower(nombre).
+    """
+    nombres = []
+    with engine.begin() as conn:
+        for ix in sorted(Postulacion.__table__.indexes, key=lambda i: i.name):
+            conn.execute(CreateIndex(ix, if_not_exists=True))
+            nombres.append(ix.name)
+    return nombres
+
+
+def seed(db: Session, filas: int, unidades: int = 20, puestos_por_unidad: int = 10) -> None:
+    """
+    Datos sintéticos con la forma de los reales: ~5% por unidad, 10% reasignadas
+    (original != actual), un puesto "Disponibilidad General" por unidad y estados
+    sesgados a "nueva". Solo sobre una tabla vacía.
+    """
+    if db.query(Postulacion.id).first() is not None:
+        raise ValueError("La tabla postulaciones ya tiene datos: sembrar solo en una base descartable")
+    rnd = random.Random(2026)
+    puestos: dict[int, list[int]] = {}
+    for u in range(unidades):
+        unidad = UnidadNegocio(nombre=f"Unidad {u + 1}")
+        db.add(unidad)
+        db.flush()
+        nombres = ["Disponibilidad General"] + [f"Puesto {u + 1}.{p}" for p in range(1, puestos_por_unidad)]
+        objs = [Puesto(nombre=n, unidad_id=unidad.id) for n in nombres]
+        db.add_all(objs)
+        db.flush()
+        puestos[unidad.id] = [p.id for p in objs]
+    db.commit()
+
+    unidad_ids = list(puestos)
+    estados = ("nueva",) * 10 + ("posible",) * 5 + ("descartada",) * 4 + ("destacada",)
+    inicio = datetime.now(timezone.utc) - timedelta(days=730)
+    lote = []
+    for i in range(filas):
+        u = rnd.choice(unidad_ids)
+        p = rnd.choice(puestos[u])
+        uo, po = (u, p)
+        if rnd.random() < 0.1:
+            uo = rnd.choice(unidad_ids)
+            po = rnd.choice(puestos[uo])
+        estado = rnd.choice(estados)
+        creada = inicio + timedelta(seconds=i * 600 + rnd.randint(0, 599))
+        lote.append(dict(
+            nombre=f"Nombre{rnd.randint(0, 99999):05d}", apellido="Sintético", correo=f"s{i}@ejemplo.com",
+            telefono=None, estado=estado, nota=None,
+            unidad_id=u, puesto_id=p, unidad_original_id=uo, puesto_original_id=po,
+            cv_filename=f"s{i}.pdf", cv_original="cv.pdf", cv_mime="application/pdf", cv_size=1,
+            created_at=creada,
+            decidido_en=creada + timedelta(days=1) if estado != "nueva" else None,
+        ))
+        if len(lote) == 5000:
+            db.execute(insert(Postulacion), lote)
+            lote = []
+    if lote:
+        db.execute(insert(Postulacion), lote)
+    db.commit()
+
+
+def _filter_values(db: Session) -> tuple[Optional[int], Optional[int], list[str]]:
+    # Peor caso realista: la unidad con más postulaciones y su puesto más usado
+    unidad_id = (
+        db.query(Postulacion.unidad_id)
+          .filter(Postulacion.unidad_id.isnot(None))
+          .group_by(Postulacion.unidad_id)
+          .order_by(func.count().desc())
+          .limit(1)
+          .scalar()
+    )
+    puesto_id = None
+    if unidad_id is not None:
+        puesto_id = (
+            db.query(Postulacion.puesto_id)
+              .filter(Postulacion.unidad_id == unidad_id, Postulacion.puesto_id.isnot(None))
+              .group_by(Postulacion.puesto_id)
+              .order_by(func.count().desc())
+              .limit(1)
+              .scalar()
+        )
+    estados = [e for (e,) in db.query(Postulacion.estado).distinct()] or list(ESTADOS_DASHBOARD)
+    return unidad_id, puesto_id, sorted(estados)
+
+
+def _combinations(unidad_id, puesto_id, estados):
+    filtros = [{}]
+    filtros += [{"estado": e} for e in estados]
+    if unidad_id is not None:
+        filtros.append({"unidad_id": unidad_id})
+        filtros.append({"estado": estados[0], "unidad_id": unidad_id})
+        if puesto_id is not None:
+            filtros.append({"unidad_id": unidad_id, "puesto_id": puesto_id})
+    for f in filtros:
+        for sort in _KEYSET_SORTS:
+            for modo in ("offset", "cursor"):
+                yield f, sort, modo
+
+
+def _run(svc: PostulacionesService, f: dict, sort: str, modo: str) -> None:
+    args = (None, f.get("estado"), f.get("puesto_id"), f.get("unidad_id"))
+    if modo == "offset":
+        svc.list(*args, _PAGE, 0, sort)
+    else:
+        svc.list_keyset(*args, _PAGE, None, sort)
+
+
+def check(db: Session, budget_ms: float = QUERY_PLAN_BUDGET_MS, repeticiones: int = 3) -> list[str]:
+    """Devuelve la lista de fallas (vacía = todo bien)."""
+    engine = db.get_bind()
+    dialect = engine.dialect.name
+    if dialect not in _EXPLAIN:
+        raise ValueError(f"Dialecto sin soporte para EXPLAIN: {dialect}")
+    full_scan = _FULL_SCAN[dialect]
+    svc = PostulacionesService(db)
+    unidad_id, puesto_id, estados = _filter_values(db)
+
+    captured: list[tuple[str, object]] = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    fallas = []
+    for f, sort, modo in _combinations(unidad_id, puesto_id, estados):
+        nombre = f"{modo:6} sort={sort:9} {f or 'sin filtros'}"
+
+        captured.clear()
+        event.listen(engine, "before_cursor_execute", _capture)
+        try:
+            _run(svc, f, sort, modo)
+        finally:
+            event.remove(engine, "before_cursor_execute", _capture)
+        statements = list(captured)
+
+        tiempos = []
+        for _ in range(repeticiones):
+            t0 = time.perf_counter()
+            _run(svc, f, sort, modo)
+            tiempos.append((time.perf_counter() - t0) * 1000)
+        ms = statistics.median(tiempos)
+
+        scans = []
+        conn = db.connection()
+        for statement, parameters in statements:
+            for row in conn.exec_driver_sql(_EXPLAIN[dialect] + statement, parameters):
+                detalle = row[-1]
+                if full_scan.search(str(detalle)):
+                    scans.append(str(detalle))
+        # Sin filtros no hay nada que buscar por índice: solo cuenta la latencia
+        if scans and f:
+            fallas.append(f"{nombre}: recorre la tabla entera ({'; '.join(scans)})")
+        if ms > budget_ms:
+            fallas.append(f"{nombre}: {ms:.1f}ms > {budget_ms:.0f}ms")
+        print(f"[QUERY_PLANS] {nombre}: {ms:6.1f}ms{'  SCAN' if scans else ''}")
+    return fallas
+
+
+if __name__ == "__main__":
+    import argparse
+    from config.database import SessionLocal, engine, Base
+    import models.usuarios  # noqa: F401 (mappers de las relaciones)
+
+    parser = argparse.ArgumentParser(description="EXPLAIN y latencia del listado de postulaciones")
+    parser.add_argument("--sembrar", type=int, default=0, help="insertar N postulaciones sintéticas (tabla vacía)")
+    parser.add_argument("--presupuesto-ms", type=float, default=QUERY_PLAN_BUDGET_MS)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--crear-indices", action="store_true", help="crear los índices faltantes y salir")
+    args = parser.parse_args()
+
+    if args.crear_indices:
+        nombres = ensure_indexes(engine)
+        print(f"[QUERY_PLANS] índices verificados: {', '.join(nombres)}")
+        sys.exit(0)
+
+    db = SessionLocal()
+    try:
+        if args.sembrar:
+            Base.metadata.create_all(bind=engine)
+            seed(db, args.sembrar)
+            # estadísticas para el planner (Postgres las toma solo con autovacuum)
+            db.connection().exec_driver_sql("ANALYZE")
+            db.commit()
+            print(f"[QUERY_PLANS] {args.sembrar} postulaciones sintéticas")
+        fallas = check(db, args.presupuesto_ms, args.repeticiones)
+    finally:
+        db.close()
+
+    for falla in fallas:
+        print(f"[QUERY_PLANS] FALLA {falla}")
+    print(f"[QUERY_PLANS] {'OK' if not fallas else f'{len(fallas)} fallas'}")
+    sys.exit(1 if fallas else 0)
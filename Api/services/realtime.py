@@ -0,0 +1,147 @@
+import os
+import json
+import asyncio
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+
+from config.database import SessionLocal
+from services.counters import counters
+from services.catalog import catalog
+from utils.websocket_manager import manager
+
+# Ventana de agrupamiento: los cambios que caen dentro salen en un solo mensaje
+WS_COALESCE_MS = int(os.getenv("WS_COALESCE_MS", "250"))
+# Filas por mensaje y tope del payload en bytes (JSON UTF-8): NOTIFY de Postgres admite
+# ~7880 bytes por mensaje y el sobre del bus suma ~100. Un lote que no entra se parte al medio.
+WS_BATCH_MAX_ROWS = int(os.getenv("WS_BATCH_MAX_ROWS", "20"))
+WS_BATCH_MAX_BYTES = int(os.getenv("WS_BATCH_MAX_BYTES", "7000"))
+
+BATCH_EVENT = "POSTULACIONES_BATCH"
+
+_SUMMARY_FIELDS = ("id", "nombre", "apellido", "correo", "estado", "unidad_id", "puesto_id",
+                   "created_at", "decidido_en")
+
+
+def row_summary(obj) -> dict:
+    """Resumen de una postulación (ORM o PostulacionOut) para parchear la lista sin refetch."""
+    row = {}
+    for f in _SUMMARY_FIELDS:
+        v = getattr(obj, f, None)
+        row[f] = v.isoformat() if hasattr(v, "isoformat") else v
+    return with_nombres(row)
+
+
+def with_nombres(row: dict) -> dict:
+    """Agrega unidad_nombre/puesto_nombre (del catálogo en memoria) si la fila trae esos ids."""
+    if "unidad_id" in row or "puesto_id" in row:
+        unidad, puesto = catalog.nombres(row.get("unidad_id"), row.get("puesto_id"))
+        if "unidad_id" in row:
+            row["unidad_nombre"] = unidad
+        if "puesto_id" in row:
+            row["puesto_nombre"] = puesto
+    return row
+
+
+def _batch_payload(chunk: list, counts: Optional[dict]) -> dict:
+    return {
+        "created": [row for _, (k, row) in chunk if k == "created"],
+        "updated": [row for _, (k, row) in chunk if k == "updated"],
+        "deleted": [pid for pid, (k, _) in chunk if k == "deleted"],
+        "counts": counts,
+    }
+
+
+def payload_bytes(payload: dict) -> int:
+    # mismo JSON que publica el ConnectionManager (ensure_ascii=False: "é" ocupa 2 bytes y no 6)
+    return len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+
+def _reconciled_counts() -> dict:
+    db = SessionLocal()
+    try:
+        counters.ensure_fresh(db)
+    finally:
+        db.close()
+    payload, _ = counters.counts_payload()
+    return payload
+
+
+class PostulacionEvents:
+    """
+    Agrupa created/updated/deleted durante WS_COALESCE_MS (desde el primer
+    cambio, así la demora está acotada) y publica un POSTULACIONES_BATCH con
+    las filas cambiadas, los ids borrados y los contadores actualizados.
+    Por id queda solo el último cambio: alta+edición sale como alta y
+    alta+baja dentro de la misma ventana no sale.
+    """
+
+    def __init__(self):
+        self._pending: dict[int, tuple[str, Optional[dict]]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def publish(self, kind: str, row: dict) -> None:
+        pid = int(row["id"])
+        prev = self._pending.get(pid)
+        if kind == "deleted":
+            if prev and prev[0] == "created":
+                del self._pending[pid]
+            else:
+                self._pending[pid] = ("deleted", None)
+        elif kind == "updated" and prev and prev[0] == "created":
+            self._pending[pid] = ("created", row)
+        else:
+            self._pending[pid] = (kind, row)
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(WS_COALESCE_MS / 1000)
+        await self.flush()
+
+    async def publish_decided(self, ids: list[int], cambios: dict) -> None:
+        """
+        Decisión en lote: un solo mensaje con los ids y los campos que cambiaron
+        (iguales para todos) en vez de una fila por id. Sale enseguida, después
+        de lo pendiente para respetar el orden.
+        """
+        await self.flush()
+        await manager.broadcast_sequenced(BATCH_EVENT, {
+            "created": [], "updated": [], "deleted": [],
+            "decided": {"ids": ids, "cambios": cambios},
+            "counts": await self._counts(),
+        })
+
+    async def _counts(self) -> Optional[dict]:
+        # Contadores incrementales de este worker, sin ir a la DB. Lo que cambie
+        # otro worker lo corrige el reconcile periódico (COUNTERS_RECONCILE_SECONDS).
+        try:
+            if not counters.is_stale():
+                payload, _ = counters.counts_payload()
+                return payload
+            return await run_in_threadpool(_reconciled_counts)
+        except Exception as e:
+            print(f"[WS_BATCH_ERROR] contadores: {e}")
+            return None
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        counts = await self._counts()
+
+        changes = list(pending.items())
+        chunks = [changes[i:i + WS_BATCH_MAX_ROWS] for i in range(0, len(changes), WS_BATCH_MAX_ROWS)]
+        while chunks:
+            chunk = chunks.pop(0)
+            # los contadores van solo en el último mensaje del lote
+            payload = _batch_payload(chunk, None if chunks else counts)
+            if len(chunk) > 1 and payload_bytes(payload) > WS_BATCH_MAX_BYTES:
+                half = len(chunk) // 2
+                chunks[:0] = [chunk[:half], chunk[half:]]
+                continue
+            # una sola fila que igual no entra: el bus lo reemplaza por un RESYNC secuenciado
+            await manager.broadcast_sequenced(BATCH_EVENT, payload)
+
+
+postulacion_events = PostulacionEvents()
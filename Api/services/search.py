@@ -0,0 +1,110 @@
+from typing import Iterable, Optional
+from sqlalchemy import and_, insert, select
+from sqlalchemy.orm import Session
+
+from models.postulaciones import Postulacion
+from models.postulaciones_tokens import PostulacionToken
+from utils.files import tokenize
+
+# Campos indexados y su peso (se guarda en el índice; la búsqueda no rankea:
+# el listado ordena por el sort elegido)
+_CAMPOS = {"nombre": 3, "apellido": 3, "correo": 1}
+# Texto del CV (services.cv_text); se busca aparte con el parámetro "contenido"
+CAMPO_CONTENIDO = "contenido"
+
+
+class SearchService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    # === INDEXAR UNA POSTULACIÓN (no hace commit) ===
+    def index(self, obj: Postulacion, nuevo: bool = False) -> None:
+        if not nuevo:  # una fila recién insertada no tiene tokens que borrar
+            self.remove(obj.id, campos=_CAMPOS)
+        seen: set[tuple[str, str]] = set()
+        for campo, peso in _CAMPOS.items():
+            for tok in tokenize(getattr(obj, campo, None)):
+                if (tok, campo) in seen:
+                    continue
+                seen.add((tok, campo))
+                self.db.add(PostulacionToken(postulacion_id=obj.id, token=tok, campo=campo, peso=peso))
+
+    # === QUITAR DEL ÍNDICE (no hace commit) ===
+    def remove(self, postulacion_id: int, campos: Optional[Iterable[str]] = None) -> None:
+        query = self.db.query(PostulacionToken).filter(PostulacionToken.postulacion_id == postulacion_id)
+        if campos is not None:
+            query = query.filter(PostulacionToken.campo.in_(list(campos)))
+        query.delete(synchronize_session=False)
+
+    # === CONTENIDO DEL CV (no hace commit) ===
+    def index_contenido(self, postulacion_id: int, tokens: Iterable[str]) -> None:
+        self.remove(postulacion_id, campos=(CAMPO_CONTENIDO,))
+        rows = [
+            {"postulacion_id": postulacion_id, "token": tok, "campo": CAMPO_CONTENIDO, "peso": 1}
+            for tok in dict.fromkeys(tokens)
+        ]
+        if rows:
+            self.db.execute(insert(PostulacionToken), rows)
+
+    # === BUSCAR: condición sobre Postulacion.id ===
+    def match(self, q: str, contenido: bool = False):
+        """
+        Cada palabra de la consulta debe coincidir (exacta o por prefijo) con
+        algún token de la postulación: un IN (subquery) por palabra, así la
+        base resuelve todo junto con el resto de los filtros, sin traer ids a
+        Python ni cortar resultados. Con contenido=True busca solo en el texto
+        de los CV; si no, solo en los datos personales. None si no hay palabras.
+        """
+        campos = [CAMPO_CONTENIDO] if contenido else list(_CAMPOS)
+        terms = list(dict.fromkeys(tokenize(q)))
+        if not terms:
+            return None
+        return and_(*(
+            Postulacion.id.in_(
+                select(PostulacionToken.postulacion_id)
+                .where(PostulacionToken.token.like(f"{term}%"), PostulacionToken.campo.in_(campos))
+            )
+            for term in terms
+        ))
+
+    # === RECONSTRUIR TODO EL ÍNDICE (backfill) ===
+    def rebuild(self, batch_size: int = 500) -> int:
+        """
+        Reindexa nombre/apellido/correo por lotes: cada lote borra y vuelve a
+        insertar sus tokens en una sola transacción, así la búsqueda sigue
+        respondiendo completa mientras corre. (Los tokens de postulaciones
+        borradas se van solos por el ON DELETE CASCADE.)
+        """
+        total = 0
+        last_id = 0
+        while True:
+            batch: list[Postulacion] = (
+                self.db.query(Postulacion)
+                       .filter(Postulacion.id > last_id)
+                       .order_by(Postulacion.id.asc())
+                       .limit(batch_size)
+                       .all()
+            )
+            if not batch:
+                break
+            ids = [obj.id for obj in batch]
+            self.db.query(PostulacionToken)\
+                   .filter(PostulacionToken.postulacion_id.in_(ids), PostulacionToken.campo.in_(list(_CAMPOS)))\
+                   .delete(synchronize_session=False)
+            for obj in batch:
+                self.index(obj, nuevo=True)
+            self.db.commit()
+            last_id = ids[-1]
+            total += len(ids)
+        return total
+
+if __name__ == "__main__":
+    # python -m services.search  -> reindexa todas las postulaciones
+    from config.database import SessionLocal
+    import models.puestos, models.unidades_negocio, models.usuarios  # noqa: F401 (mappers de las relaciones)
+    db = SessionLocal()
+    try:
+        n = SearchService(db).rebuild()
+        print(f"[SEARCH_REBUILD] {n} postulaciones indexadas")
+    finally:
+        db.close()
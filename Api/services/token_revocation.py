@@ -0,0 +1,122 @@
+import os
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy.orm import Session
+
+from config.database import SessionLocal
+from models.jwt_revocaciones import JWTRevocacion
+from utils.jwt_manager import ACCESS_TOKEN_EXPIRE_MINUTES
+
+# Cada cuánto se relee la tabla (revocaciones hechas por otros workers)
+JWT_REVOCATION_REFRESH_SECONDS = int(os.getenv("JWT_REVOCATION_REFRESH_SECONDS", "5"))
+
+TIPO_TOKEN = "token"
+TIPO_USUARIO = "usuario"
+
+
+def _aware(dt: datetime) -> datetime:
+    # SQLite devuelve datetimes naive (en UTC)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class TokenRevocationService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def revoke_token(self, token_hash: str, exp: float) -> None:
+        """Logout: ese token deja de valer (se guarda hasta su exp)."""
+        hasta = datetime.fromtimestamp(exp, tz=timezone.utc)
+        self.prune()
+        self.db.add(JWTRevocacion(tipo=TIPO_TOKEN, clave=token_hash, hasta=hasta))
+        self.db.commit()
+
+    def revoke_user(self, user_id: int) -> datetime:
+        """
+        Todos los tokens del usuario emitidos hasta ahora dejan de valer (baja,
+        cambio de rol o de contraseña). Devuelve el corte usado.
+
+        El corte va truncado al segundo, como el iat del JWT: vale iat < corte,
+        así un login en el mismo segundo que el cambio (p. ej. con la contraseña
+        nueva) no queda revocado.
+        """
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        hasta = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        self.prune()
+        self.db.add(JWTRevocacion(tipo=TIPO_USUARIO, clave=str(user_id), desde=now, hasta=hasta))
+        self.db.commit()
+        return now
+
+    def prune(self) -> int:
+        """
+        Borra las vencidas (el token que cubrían ya expiró solo). Corre junto con
+        cada revocación, dentro de su transacción: el camino de lectura no escribe.
+        """
+        now = datetime.now(timezone.utc)
+        return self.db.query(JWTRevocacion).filter(JWTRevocacion.hasta <= now).delete(synchronize_session=False)
+
+    def active(self) -> list[JWTRevocacion]:
+        now = datetime.now(timezone.utc)
+        return self.db.query(JWTRevocacion).filter(JWTRevocacion.hasta > now).all()
+
+
+class RevocationList:
+    """
+    Copia en memoria de jwt_revocaciones para chequear cada request sin ir a
+    la DB. Se relee cada JWT_REVOCATION_REFRESH_SECONDS; lo que revoca este
+    worker se aplica al instante, lo de otros workers con ese retraso máximo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens: dict[str, float] = {}      # sha256 -> exp
+        self._users: dict[int, float] = {}       # uid -> corte (epoch, segundos enteros): iat < corte queda revocado
+        self._loaded_at: Optional[float] = None
+
+    def needs_refresh(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at > JWT_REVOCATION_REFRESH_SECONDS
+
+    def refresh(self) -> None:
+        db = SessionLocal()
+        try:
+            rows = TokenRevocationService(db).active()
+            tokens: dict[str, float] = {}
+            users: dict[int, float] = {}
+            for r in rows:
+                if r.tipo == TIPO_TOKEN:
+                    tokens[r.clave] = _aware(r.hasta).timestamp()
+                elif r.tipo == TIPO_USUARIO:
+                    uid = int(r.clave)
+                    users[uid] = max(users.get(uid, 0.0), _aware(r.desde).timestamp())
+        finally:
+            db.close()
+        with self._lock:
+            self._tokens, self._users = tokens, users
+            self._loaded_at = time.monotonic()
+
+    def is_revoked(self, token_hash: str, payload: dict) -> bool:
+        with self._lock:
+            if token_hash in self._tokens:
+                return True
+            uid = payload.get("uid")
+            corte = self._users.get(int(uid)) if uid is not None else None
+        if corte is None:
+            return False
+        # iat y corte en segundos enteros: lo emitido en el segundo del corte (o después) sigue valiendo
+        return float(payload.get("iat") or 0) < corte
+
+    # --- revocaciones de este worker (DB + memoria) ---
+    def revoke_token(self, db: Session, token_hash: str, exp: float) -> None:
+        TokenRevocationService(db).revoke_token(token_hash, exp)
+        with self._lock:
+            self._tokens[token_hash] = float(exp)
+
+    def revoke_user(self, db: Session, user_id: int) -> None:
+        corte = TokenRevocationService(db).revoke_user(user_id).timestamp()
+        with self._lock:
+            self._users[user_id] = max(self._users.get(user_id, 0.0), corte)
+
+
+revocations = RevocationList()
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session, selectinload
 from models.unidades_negocio import UnidadNegocio
 from schemas.unidades_negocio import UnidadNegocioCreate, UnidadNegocioUpdate
+from services.catalog import catalog
 
 class UnidadesNegocioService:
     def __init__(self, db: Session): self.db = db
@@ -33,16 +34,19 @@ class UnidadesNegocioService:
 
     def create(self, data: UnidadNegocioCreate):
         obj = UnidadNegocio(**data.model_dump())
-        self.db.add(obj); self.db.commit(); self.db.refresh(obj); return obj
+        self.db.add(obj); self.db.commit(); self.db.refresh(obj)
+        catalog.invalidate(); return obj
 
     def update(self, id: int, data: UnidadNegocioUpdate):
         obj = self.get(id)
         if not obj: return None
         for k, v in data.model_dump(exclude_unset=True).items():
             setattr(obj, k, v)
-        self.db.commit(); self.db.refresh(obj); return obj
+        self.db.commit(); self.db.refresh(obj)
+        catalog.invalidate(); return obj
 
     def delete(self, id: int) -> bool:
         obj = self.get(id)
         if not obj: return False
-        self.db.delete(obj); self.db.commit(); return True
+        self.db.delete(obj); self.db.commit()
+        catalog.invalidate(); return True
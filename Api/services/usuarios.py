@@ -38,6 +38,12 @@ class UsuariosService:
         self.db.refresh(obj)
         return obj
 
+    def set_password_hash(self, obj: UsuariosModel, password_hash: str) -> UsuariosModel:
+        obj.password = password_hash
+        self.db.commit()
+        self.db.refresh(obj)
+        return obj
+
     def delete(self, id: int) -> bool:
         obj = self.get(id)
         if not obj:
@@ -0,0 +1,57 @@
+import os
+from typing import Optional
+from sqlalchemy import func as sa_func
+from sqlalchemy.orm import Session
+
+from config.database import SessionLocal
+from models.ws_events import WSEvent
+
+WS_REPLAY_PERSIST = os.getenv("WS_REPLAY_PERSIST", "false").lower() == "true"
+# Cuántos eventos se conservan en la tabla
+WS_REPLAY_KEEP = int(os.getenv("WS_REPLAY_KEEP", "5000"))
+_PRUNE_EVERY = 100
+
+
+class WSEventLogService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def append(self, seq: int, data: str) -> None:
+        self.db.merge(WSEvent(seq=seq, data=data))
+        if seq % _PRUNE_EVERY == 0:
+            self.db.query(WSEvent).filter(WSEvent.seq <= seq - WS_REPLAY_KEEP).delete(synchronize_session=False)
+        self.db.commit()
+
+    def since(self, seq: int, limit: int) -> list[tuple[int, str]]:
+        return [
+            (s, d) for s, d in
+            self.db.query(WSEvent.seq, WSEvent.data)
+                   .filter(WSEvent.seq > seq)
+                   .order_by(WSEvent.seq.asc())
+                   .limit(limit)
+                   .all()
+        ]
+
+    def bounds(self) -> tuple[Optional[int], Optional[int]]:
+        """(primer seq, último seq) guardados."""
+        lo, hi = self.db.query(sa_func.min(WSEvent.seq), sa_func.max(WSEvent.seq)).one()
+        return lo, hi
+
+
+class DBReplayStore:
+    """Adaptador sincrónico para ConnectionManager (se llama desde un thread)."""
+
+    def append(self, seq: int, data: str) -> None:
+        db = SessionLocal()
+        try:
+            WSEventLogService(db).append(seq, data)
+        finally:
+            db.close()
+
+    def load_since(self, seq: int, limit: int) -> tuple[Optional[int], Optional[int], list[tuple[int, str]]]:
+        db = SessionLocal()
+        try:
+            svc = WSEventLogService(db)
+            return (*svc.bounds(), svc.since(seq, limit))
+        finally:
+            db.close()
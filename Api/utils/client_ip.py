@@ -0,0 +1,52 @@
+# utils/client_ip.py
+# IP real del cliente detrás de un proxy (nginx, IIS/ARR, balanceador).
+#
+# TRUSTED_PROXIES: IPs o redes (CIDR) de los proxies propios, separadas por coma,
+# p. ej. "127.0.0.1,10.0.0.0/8". Solo si la conexión viene de uno de ellos se lee
+# X-Forwarded-For, de derecha a izquierda, salteando los proxies de la lista: la
+# primera IP que no es de confianza es el cliente. Vacío (default) = se usa la IP
+# de la conexión y X-Forwarded-For se ignora (un cliente directo podría inventarlo).
+# Alternativa equivalente: uvicorn --proxy-headers --forwarded-allow-ips=<proxies>,
+# que reescribe request.client antes de llegar acá (y entonces TRUSTED_PROXIES queda vacío).
+import os
+import ipaddress
+from typing import Optional
+from starlette.requests import HTTPConnection
+
+
+def _parse_networks(raw: str) -> list:
+    nets = []
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            nets.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            print(f"[CLIENT_IP] TRUSTED_PROXIES: '{item}' no es una IP/red válida, se ignora")
+    return nets
+
+
+TRUSTED_PROXIES = _parse_networks(os.getenv("TRUSTED_PROXIES", ""))
+
+
+def _trusted(ip: Optional[str]) -> bool:
+    if not ip or not TRUSTED_PROXIES:
+        return False
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(addr in net for net in TRUSTED_PROXIES)
+
+
+def client_ip(conn: HTTPConnection) -> str:
+    peer = conn.client.host if conn.client else None
+    if not _trusted(peer):
+        return peer or "-"
+    hops = [h.strip() for h in ",".join(conn.headers.getlist("x-forwarded-for")).split(",") if h.strip()]
+    for hop in reversed(hops):
+        if not _trusted(hop):
+            return hop
+    # toda la cadena es de confianza (o no vino el header): el más lejano conocido
+    return hops[0] if hops else peer
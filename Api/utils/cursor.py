@@ -0,0 +1,28 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+# Cursor opaco para paginación keyset: base64url(JSON {s: sort, k: clave, t: tipo, id})
+
+def encode_cursor(sort: str, key: Any, last_id: int) -> str:
+    if isinstance(key, datetime):
+        k, t = key.isoformat(), "dt"
+    else:
+        k, t = key, None
+    raw = json.dumps({"s": sort, "k": k, "t": t, "id": int(last_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """Devuelve (clave, id). ValueError si el cursor no es válido para ese sort."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if data.get("s") != sort:
+            raise ValueError("sort distinto")
+        key = data.get("k")
+        if key is not None and data.get("t") == "dt":
+            key = datetime.fromisoformat(key)
+        return key, int(data["id"])
+    except Exception:
+        raise ValueError("Cursor inválido")
@@ -0,0 +1,149 @@
+# utils/cv_preview.py
+# Render de vista previa (primera página + cantidad de páginas) de un CV.
+# Se ejecuta en procesos aparte (services.cv_previews): no importar la DB acá.
+# PDF: PyMuPDF (requirements.txt). DOC/DOCX: LibreOffice headless ("soffice" en
+# el PATH), dependencia del sistema y opcional: sin él esos CV quedan sin imagen.
+import os
+import re
+import json
+import uuid
+import shutil
+import zipfile
+import tempfile
+import subprocess
+from typing import Optional
+
+PREVIEW_WIDTH = int(os.getenv("CV_PREVIEW_WIDTH", "480"))
+PREVIEW_QUALITY = int(os.getenv("CV_PREVIEW_QUALITY", "70"))
+SOFFICE_TIMEOUT = int(os.getenv("CV_SOFFICE_TIMEOUT", "60"))
+
+_PDF_MAGIC = b"%PDF"
+_ZIP_MAGIC = b"PK\x03\x04"          # .docx
+_OLE_MAGIC = b"\xd0\xcf\x11\xe0"    # .doc
+_pages_re = re.compile(rb"<Pages>(\d+)</Pages>")
+
+
+def preview_paths(cv_path: str) -> tuple[str, str]:
+    """(imagen, metadata) guardadas al lado del CV."""
+    return f"{cv_path}.preview.jpg", f"{cv_path}.preview.json"
+
+
+def sniff_kind(path: str) -> Optional[str]:
+    with open(path, "rb") as f:
+        head = f.read(8)
+    if head.startswith(_PDF_MAGIC):
+        return "pdf"
+    if head.startswith(_ZIP_MAGIC):
+        return "docx"
+    if head.startswith(_OLE_MAGIC):
+        return "doc"
+    return None
+
+
+def _docx_pages(path: str) -> Optional[int]:
+    # Word guarda la cantidad de páginas (de la última vez que se guardó) en docProps/app.xml
+    try:
+        with zipfile.ZipFile(path) as z:
+            m = _pages_re.search(z.read("docProps/app.xml"))
+            return int(m.group(1)) if m else None
+    except Exception:
+        return None
+
+
+def soffice_convert(path: str, outdir: str, target: str = "pdf") -> Optional[str]:
+    # LibreOffice es opcional: sin él los .doc/.docx quedan sin imagen (y los .doc sin texto)
+    soffice = shutil.which("soffice") or shutil.which("libreoffice")
+    if not soffice:
+        return None
+    try:
+        subprocess.run(
+            [soffice, "--headless", "--convert-to", target, "--outdir", outdir, path],
+            check=True, timeout=SOFFICE_TIMEOUT,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+    except Exception:
+        return None
+    base = os.path.splitext(os.path.basename(path))[0]
+    out = os.path.join(outdir, base + "." + target.split(":")[0])
+    return out if os.path.isfile(out) else None
+
+
+def load_pymupdf():
+    """PyMuPDF (está en requirements.txt); None si falta en el entorno: los PDF quedan sin preview ni texto."""
+    try:
+        import pymupdf
+        return pymupdf
+    except ImportError:
+        try:
+            import fitz  # PyMuPDF < 1.24
+            return fitz
+        except ImportError:
+            return None
+
+
+def _render_pdf(path: str, img_path: str) -> tuple[Optional[int], bool]:
+    fitz = load_pymupdf()
+    if fitz is None:
+        return None, False
+    doc = fitz.open(path)
+    try:
+        pages = doc.page_count
+        if not pages:
+            return 0, False
+        page = doc.load_page(0)
+        zoom = PREVIEW_WIDTH / max(page.rect.width, 1)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        tmp = f"{img_path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(pix.tobytes("jpg", jpg_quality=PREVIEW_QUALITY))
+        os.replace(tmp, img_path)
+        return pages, True
+    finally:
+        doc.close()
+
+
+def render_preview(cv_path: str) -> dict:
+    """
+    Genera <cv>.preview.jpg (primera página, ancho CV_PREVIEW_WIDTH) y
+    <cv>.preview.json ({"pages", "image"}). Devuelve la metadata.
+    """
+    img_path, meta_path = preview_paths(cv_path)
+    kind = sniff_kind(cv_path)
+    pages: Optional[int] = None
+    image = False
+
+    try:
+        if kind == "pdf":
+            pages, image = _render_pdf(cv_path, img_path)
+        elif kind in ("docx", "doc"):
+            if kind == "docx":
+                pages = _docx_pages(cv_path)
+            with tempfile.TemporaryDirectory() as tmpdir:
+                # soffice decide el formato por la extensión
+                src = os.path.join(tmpdir, "cv." + kind)
+                shutil.copyfile(cv_path, src)
+                pdf = soffice_convert(src, tmpdir)
+                if pdf:
+                    pdf_pages, image = _render_pdf(pdf, img_path)
+                    pages = pdf_pages if pdf_pages is not None else pages
+    except Exception as e:
+        # PDF dañado o cifrado: igual se guarda la metadata, si no cada GET de la
+        # vista previa volvería a encolar el mismo render fallido
+        print(f"[CV_PREVIEW_ERROR] {os.path.basename(cv_path)} {e}")
+        pages, image = None, False
+
+    meta = {"pages": pages, "image": image, "kind": kind}
+    tmp = f"{meta_path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, meta_path)
+    return meta
+
+
+def read_preview_meta(cv_path: str) -> Optional[dict]:
+    _, meta_path = preview_paths(cv_path)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,83 @@
+# utils/cv_text.py
+# Extracción de texto plano de un CV (PDF/DOCX/DOC) para el índice de contenido.
+# Se ejecuta en procesos aparte (services.cv_text): no importar la DB acá.
+import os
+import re
+import html
+import shutil
+import zipfile
+import tempfile
+from typing import Optional
+
+from utils.files import tokenize
+from utils.cv_preview import sniff_kind, soffice_convert, load_pymupdf
+
+CV_TEXT_MAX_TOKENS = int(os.getenv("CV_TEXT_MAX_TOKENS", "5000"))
+CV_TEXT_MAX_PAGES = int(os.getenv("CV_TEXT_MAX_PAGES", "20"))
+
+_w_para_re = re.compile(r"</w:p>|<w:br/>|<w:tab/>")
+_tag_re = re.compile(r"<[^>]+>")
+
+
+def _pdf_text(path: str) -> Optional[str]:
+    fitz = load_pymupdf()
+    if fitz is None:
+        return None
+    with fitz.open(path) as doc:
+        return "\n".join(doc.load_page(i).get_text() for i in range(min(doc.page_count, CV_TEXT_MAX_PAGES)))
+
+
+def _docx_text(path: str) -> Optional[str]:
+    # .docx es un zip: el cuerpo está en word/document.xml (sin dependencias externas)
+    try:
+        with zipfile.ZipFile(path) as z:
+            xml = z.read("word/document.xml").decode("utf-8", "ignore")
+    except Exception:
+        return None
+    return html.unescape(_tag_re.sub("", _w_para_re.sub(" \n", xml)))
+
+
+def _doc_text(path: str) -> Optional[str]:
+    # .doc (binario de Word 97): solo con LibreOffice
+    with tempfile.TemporaryDirectory() as tmpdir:
+        src = os.path.join(tmpdir, "cv.doc")
+        shutil.copyfile(path, src)
+        out = soffice_convert(src, tmpdir, "txt:Text")
+        if not out:
+            return None
+        with open(out, encoding="utf-8", errors="ignore") as f:
+            return f.read()
+
+
+def extract_text(cv_path: str) -> Optional[str]:
+    """Texto plano del CV, o None si el formato no se puede leer acá."""
+    kind = sniff_kind(cv_path)
+    if kind == "pdf":
+        return _pdf_text(cv_path)
+    if kind == "docx":
+        return _docx_text(cv_path)
+    if kind == "doc":
+        return _doc_text(cv_path)
+    return None
+
+
+def extract_tokens(cv_path: str) -> Optional[list[str]]:
+    """
+    Tokens únicos (misma normalización que la búsqueda) del texto del CV, en
+    orden de aparición y con tope CV_TEXT_MAX_TOKENS. None si no hay texto.
+    """
+    try:
+        text = extract_text(cv_path)
+    except Exception as e:  # archivo dañado: no corta un reindexado masivo
+        print(f"[CV_TEXT_ERROR] {os.path.basename(cv_path)} {e}")
+        return None
+    if text is None:
+        return None
+    tokens: dict[str, None] = {}
+    for tok in tokenize(text):
+        if len(tok) < 2:
+            continue
+        tokens[tok] = None
+        if len(tokens) >= CV_TEXT_MAX_TOKENS:
+            break
+    return list(tokens)
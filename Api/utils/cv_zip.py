@@ -0,0 +1,94 @@
+# utils/cv_zip.py
+# ZIP de varios CV armado mientras se envía: sin archivo temporal ni seek
+# (zipfile escribe cada entrada con data descriptor cuando el destino no es seekable).
+import os
+import re
+import time
+import zipfile
+import unicodedata
+from typing import Iterable, Iterator, Optional
+
+# Tope de archivos por descarga
+CV_ZIP_MAX_FILES = int(os.getenv("CV_ZIP_MAX_FILES", "500"))
+_CHUNK_BYTES = 256 * 1024
+
+# PDF (streams ya comprimidos) y DOCX (ya es un zip) van sin recomprimir; .doc sí se comprime
+_STORED_EXTS = {".pdf", ".docx"}
+_unsafe_re = re.compile(r'[\x00-\x1f\x7f/\\:*?"<>|]+')
+_NAME_MAX = 120
+
+
+def zip_entry_name(pid: int, cv_original: Optional[str]) -> str:
+    """
+    "<id>_<nombre original>": el id evita choques entre CVs con el mismo nombre.
+    Se quitan rutas y caracteres que Windows/macOS no aceptan; tildes y ñ quedan
+    (zipfile marca la entrada como UTF-8).
+    """
+    name = os.path.basename((cv_original or "").replace("\\", "/"))
+    name = _unsafe_re.sub("_", unicodedata.normalize("NFC", name)).strip(" .") or "cv"
+    if len(name) > _NAME_MAX:
+        stem, ext = os.path.splitext(name)
+        name = stem[:_NAME_MAX - len(ext)] + ext
+    return f"{pid}_{name}"
+
+
+class _Sink:
+    """Destino write-only para ZipFile: junta lo escrito hasta que el generador lo entrega."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0
+
+    def write(self, data) -> int:
+        self._buf += data
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def pending(self) -> int:
+        return len(self._buf)
+
+    def take(self) -> bytes:
+        out = bytes(self._buf)
+        self._buf.clear()
+        return out
+
+
+def zip_chunks(entries: Iterable[tuple[str, str]]) -> Iterator[bytes]:
+    """
+    entries = [(nombre en el zip, ruta en disco), ...]. Cada archivo se lee y se
+    manda por bloques; en memoria nunca hay más que un bloque. Los que faltan en
+    disco se listan en FALTANTES.txt al final en vez de cortar la descarga.
+    """
+    sink = _Sink()
+    missing: list[str] = []
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        for arcname, path in entries:
+            try:
+                src = open(path, "rb")
+            except OSError:
+                missing.append(arcname)
+                continue
+            with src:
+                st = os.fstat(src.fileno())
+                zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime(max(st.st_mtime, 315532800))[:6])
+                ext = os.path.splitext(arcname)[1].lower()
+                zinfo.compress_type = zipfile.ZIP_STORED if ext in _STORED_EXTS else zipfile.ZIP_DEFLATED
+                zinfo.file_size = st.st_size  # para que zipfile decida ZIP64 de antemano
+                with zf.open(zinfo, "w") as dst:
+                    while True:
+                        chunk = src.read(_CHUNK_BYTES)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                        if sink.pending() >= _CHUNK_BYTES:
+                            yield sink.take()
+            yield sink.take()
+        if missing:
+            zf.writestr("FALTANTES.txt", "CVs que no se encontraron en el servidor:\r\n" + "\r\n".join(missing) + "\r\n")
+    yield sink.take()
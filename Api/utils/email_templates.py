@@ -66,3 +66,55 @@ def admin_new_cv(aviso_id: int, nombre: str, apellido: str, correo: str, telefon
     """
     text = f"Nuevo CV recibido (ID {aviso_id}) - {full} - {correo} - {tel_txt} - Unidad: {unidad_txt} - Puesto: {puesto_txt} - {when}"
     return subj, html, text
+
+def admin_new_cv_digest(items: list[dict], desde: datetime, hasta: datetime):
+    """
+    Resumen de varios CVs nuevos en un solo correo.
+    items: [{id, nombre, apellido, correo, telefono, unidad, puesto, created_at}, ...]
+    """
+    n = len(items)
+    subj = f"[RRHH] {n} CV nuevo{'s' if n != 1 else ''} ({_fmt_dt(desde)} - {_fmt_dt(hasta)})"
+
+    rows_html = []
+    rows_text = []
+    for it in items:
+        full = f"{it.get('nombre') or ''} {it.get('apellido') or ''}".strip()
+        when = _fmt_dt(it["created_at"]) if it.get("created_at") else "—"
+        tel_txt = it.get("telefono") or "—"
+        unidad_txt = it.get("unidad") or "—"
+        puesto_txt = it.get("puesto") or "—"
+        dash_link = f"{ADMIN_DASHBOARD_URL}/postulaciones/{it['id']}" if ADMIN_DASHBOARD_URL else None
+        id_html = f'<a href="{dash_link}" style="color:#5170FF">{it["id"]}</a>' if dash_link else str(it["id"])
+        rows_html.append(
+            f'<tr>'
+            f'<td style="padding:4px 8px">{id_html}</td>'
+            f'<td style="padding:4px 8px">{escape(when)}</td>'
+            f'<td style="padding:4px 8px">{escape(full)}</td>'
+            f'<td style="padding:4px 8px">{escape(it.get("correo") or "")}</td>'
+            f'<td style="padding:4px 8px">{escape(tel_txt)}</td>'
+            f'<td style="padding:4px 8px">{escape(unidad_txt)}</td>'
+            f'<td style="padding:4px 8px">{escape(puesto_txt)}</td>'
+            f'</tr>'
+        )
+        rows_text.append(f"- ID {it['id']} - {full} - {it.get('correo') or ''} - {tel_txt} - Unidad: {unidad_txt} - Puesto: {puesto_txt} - {when}")
+
+    link_html = f'<p><a href="{ADMIN_DASHBOARD_URL}/postulaciones" style="color:#5170FF">Abrir en panel</a></p>' if ADMIN_DASHBOARD_URL else ""
+    th = 'style="padding:4px 8px;color:#555;text-align:left"'
+
+    html = f"""
+    <div style="font-family:system-ui,Arial,sans-serif;line-height:1.5">
+      <h2>{n} CV nuevo{'s' if n != 1 else ''} recibido{'s' if n != 1 else ''}</h2>
+      <p style="color:#555">Entre el {escape(_fmt_dt(desde))} y el {escape(_fmt_dt(hasta))}</p>
+
+      <table style="border-collapse:collapse">
+        <tr><th {th}>ID</th><th {th}>Fecha</th><th {th}>Nombre</th><th {th}>Correo</th><th {th}>Teléfono</th><th {th}>Unidad de negocio</th><th {th}>Puesto</th></tr>
+        {''.join(rows_html)}
+      </table>
+
+      {link_html}
+
+      <p style="color:#666;font-size:12px">Mensaje automático • RRHH</p>
+    </div>
+    """
+    text = f"{n} CV(s) nuevo(s) entre {_fmt_dt(desde)} y {_fmt_dt(hasta)}:\n" + "\n".join(rows_text)
+    return subj, html, text
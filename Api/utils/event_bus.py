@@ -0,0 +1,197 @@
+# utils/event_bus.py
+# Pub/sub entre workers para el ConnectionManager de websockets.
+#   WS_BUS=memory   -> un solo proceso (default)
+#   WS_BUS=postgres -> LISTEN/NOTIFY sobre la misma base (varios workers/nodos)
+import os
+import json
+import select
+import asyncio
+import threading
+from typing import Callable, Optional
+
+WS_BUS = os.getenv("WS_BUS", "memory").lower()
+WS_BUS_CHANNEL = os.getenv("WS_BUS_CHANNEL", "ws_events")
+WS_BUS_URL = os.getenv("WS_BUS_URL") or os.getenv("DATABASE_URL")
+
+# NOTIFY de Postgres acepta payloads de hasta 8000 bytes
+PG_NOTIFY_MAX_BYTES = 7900
+
+# Evento que le indica al cliente que recargue todo (no se puede reponer lo que cambió)
+RESYNC_EVENT = "RESYNC"
+
+# handler(data, seq): seq es el número global de los mensajes publicados con sequenced=True
+Handler = Callable[[str, Optional[int]], None]
+
+
+class LocalHub:
+    """Reparte cada mensaje a todos los buses conectados (incluido el que publica)."""
+
+    def __init__(self):
+        self.buses: list["InProcessBus"] = []
+        self.seq = 0
+
+
+class InProcessBus:
+    """
+    Bus dentro del proceso. Varios InProcessBus sobre el mismo LocalHub se
+    comportan como workers distintos: sirve de stand-in del bus de Postgres.
+    """
+
+    def __init__(self, hub: Optional[LocalHub] = None):
+        self.hub = hub or LocalHub()
+        self._handler: Optional[Handler] = None
+
+    async def start(self, handler: Handler) -> None:
+        self._handler = handler
+        if self not in self.hub.buses:
+            self.hub.buses.append(self)
+
+    async def publish(self, data: str, sequenced: bool = False) -> None:
+        seq = None
+        if sequenced:
+            self.hub.seq += 1
+            seq = self.hub.seq
+        for bus in list(self.hub.buses):
+            if bus._handler:
+                bus._handler(data, seq)
+
+    async def stop(self) -> None:
+        if self in self.hub.buses:
+            self.hub.buses.remove(self)
+        self._handler = None
+
+
+class PostgresBus:
+    """
+    LISTEN/NOTIFY: un thread con su propia conexión escucha el canal y pasa
+    cada payload al event loop; publish hace pg_notify desde otra conexión.
+    Se reconecta solo si la base se cae.
+
+    Los mensajes secuenciados toman nextval() y notifican dentro de la misma
+    transacción bajo un advisory lock: Postgres entrega los NOTIFY en orden de
+    commit, así que todos los workers los reciben en orden de seq.
+    Payload: "<seq>|<data>" ("|<data>" si no lleva número).
+    """
+
+    def __init__(self, url: str = WS_BUS_URL, channel: str = WS_BUS_CHANNEL):
+        self.dsn = _libpq_dsn(url)
+        self.channel = channel
+        self.seq_name = f"{channel}_seq"
+        self._seq_ready = False
+        self._handler: Optional[Handler] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._pub_conn = None
+        self._pub_lock = threading.Lock()
+
+    async def start(self, handler: Handler) -> None:
+        self._handler = handler
+        self._loop = asyncio.get_running_loop()
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="ws-bus-listen", daemon=True)
+        self._thread.start()
+
+    async def publish(self, data: str, sequenced: bool = False) -> None:
+        size = len(data.encode("utf-8"))
+        if size > PG_NOTIFY_MAX_BYTES - 20:
+            if not sequenced:
+                print(f"[WS_BUS_ERROR] mensaje de {size} bytes excede el límite de NOTIFY, descartado")
+                return
+            # Descartarlo sin tomar seq dejaría a los clientes sin ver el hueco: sale un
+            # RESYNC con su propio seq y cada cliente recarga la lista y los contadores
+            print(f"[WS_BUS_ERROR] mensaje de {size} bytes excede el límite de NOTIFY, se envía {RESYNC_EVENT}")
+            data = json.dumps({"k": "event", "type": RESYNC_EVENT, "payload": {}})
+        await asyncio.get_running_loop().run_in_executor(None, self._notify, data, sequenced)
+
+    def _notify(self, data: str, sequenced: bool) -> None:
+        import psycopg2
+        with self._pub_lock:
+            for attempt in range(2):
+                try:
+                    if self._pub_conn is None or self._pub_conn.closed:
+                        self._pub_conn = psycopg2.connect(self.dsn)
+                        self._pub_conn.autocommit = True
+                    with self._pub_conn.cursor() as cur:
+                        if not sequenced:
+                            cur.execute("SELECT pg_notify(%s, %s)", (self.channel, "|" + data))
+                            return
+                        if not self._seq_ready:
+                            cur.execute(f'CREATE SEQUENCE IF NOT EXISTS "{self.seq_name}"')
+                            self._seq_ready = True
+                        cur.execute("BEGIN")
+                        try:
+                            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (self.channel,))
+                            cur.execute("SELECT nextval(%s)", (self.seq_name,))
+                            seq = cur.fetchone()[0]
+                            cur.execute("SELECT pg_notify(%s, %s)", (self.channel, f"{seq}|{data}"))
+                            cur.execute("COMMIT")
+                        except Exception:
+                            cur.execute("ROLLBACK")
+                            raise
+                    return
+                except psycopg2.Error as e:
+                    if self._pub_conn is not None:
+                        self._pub_conn.close()
+                    self._pub_conn = None
+                    if attempt:
+                        print(f"[WS_BUS_ERROR] notify: {e}")
+
+    def _listen(self) -> None:
+        import psycopg2
+        backoff = 1.0
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN "{self.channel}"')
+                backoff = 1.0
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        payload = conn.notifies.pop(0).payload
+                        self._loop.call_soon_threadsafe(self._dispatch, payload)
+            except Exception as e:
+                print(f"[WS_BUS_ERROR] listen: {e} (reintento en {backoff:.0f}s)")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _dispatch(self, payload: str) -> None:
+        if self._handler:
+            seq, _, data = payload.partition("|")
+            self._handler(data, int(seq) if seq else None)
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            await asyncio.get_running_loop().run_in_executor(None, self._thread.join, 5)
+            self._thread = None
+        with self._pub_lock:
+            if self._pub_conn is not None:
+                self._pub_conn.close()
+                self._pub_conn = None
+
+
+def _libpq_dsn(url: Optional[str]) -> str:
+    # postgresql+psycopg2://... (SQLAlchemy) -> postgresql://... (libpq)
+    from sqlalchemy.engine import make_url
+    if not url:
+        raise RuntimeError("WS_BUS=postgres requiere WS_BUS_URL o DATABASE_URL")
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def create_bus():
+    if WS_BUS == "postgres":
+        return PostgresBus()
+    if WS_BUS != "memory":
+        print(f"[WS_BUS] backend '{WS_BUS}' desconocido, usando memory")
+    return InProcessBus()
@@ -0,0 +1,129 @@
+# utils/export.py
+# Exportación de postulaciones a CSV / XLSX fila por fila (memoria constante).
+import io
+import os
+import re
+import csv
+import tempfile
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+from zoneinfo import ZoneInfo
+
+from utils.email_templates import TIMEZONE
+
+# Filas por bloque enviado (CSV) y por lote leído del cursor
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+_FILE_CHUNK_BYTES = 256 * 1024
+
+# (encabezado, key de la fila)
+EXPORT_COLUMNS = (
+    ("ID", "id"),
+    ("Nombre", "nombre"),
+    ("Apellido", "apellido"),
+    ("Correo", "correo"),
+    ("Teléfono", "telefono"),
+    ("DNI", "dni"),
+    ("Fecha de nacimiento", "fecha_nacimiento"),
+    ("Estado civil", "estado_civil"),
+    ("Hijos", "hijos"),
+    ("Domicilio", "domicilio_residencia"),
+    ("Localidad", "localidad"),
+    ("Unidad", "unidad_nombre"),
+    ("Puesto", "puesto_nombre"),
+    ("Unidad original", "unidad_original_nombre"),
+    ("Puesto original", "puesto_original_nombre"),
+    ("Estado", "estado"),
+    ("Nota", "nota"),
+    ("Motivo decisión", "decidido_motivo"),
+    ("Decidido", "decidido_en"),
+    ("Recibido", "created_at"),
+    ("Archivo CV", "cv_original"),
+)
+
+try:
+    _TZ = ZoneInfo(TIMEZONE)
+except Exception:
+    _TZ = timezone.utc
+
+
+# Los datos vienen del formulario público: un valor tipo "=HYPERLINK(...)" no debe
+# llegar a Excel como fórmula. Teléfonos como "+54 9 ..." se dejan tal cual.
+_FORMULA_RE = re.compile(r"^(?:[=@\t\r]|[+-](?![\d\s().-]*$))")
+_XLSX_ILLEGAL_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _safe_text(v):
+    if isinstance(v, str) and _FORMULA_RE.match(v):
+        return "'" + v
+    return v
+
+
+def _local(dt: datetime) -> datetime:
+    # Hora local sin tz (Excel no admite tz); las naive vienen en UTC (SQLite)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(_TZ).replace(tzinfo=None)
+
+
+def _values(row) -> list:
+    out = []
+    for _, key in EXPORT_COLUMNS:
+        v = getattr(row, key)
+        if isinstance(v, datetime):
+            v = _local(v)
+        elif isinstance(v, bool):
+            v = "Sí" if v else "No"
+        out.append(v)
+    return out
+
+
+def csv_chunks(rows: Iterable) -> Iterator[bytes]:
+    """CSV UTF-8 con BOM (Excel lo abre con acentos bien) en bloques de EXPORT_CHUNK_ROWS filas."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write("\ufeff")
+    writer.writerow([h for h, _ in EXPORT_COLUMNS])
+    n = 0
+    for row in rows:
+        writer.writerow([
+            v.strftime("%Y-%m-%d %H:%M:%S") if isinstance(v, datetime) else _safe_text(v)
+            for v in _values(row)
+        ])
+        n += 1
+        if n % EXPORT_CHUNK_ROWS == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+def xlsx_chunks(rows: Iterable) -> Iterator[bytes]:
+    """
+    XLSX con openpyxl en modo write-only: las filas van a un XML temporal en
+    disco, no a memoria. El zip recién existe al final, así que el primer
+    byte sale cuando terminó la lectura; después se manda el archivo por partes.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Postulaciones")
+    ws.append([h for h, _ in EXPORT_COLUMNS])
+    for row in rows:
+        cells = []
+        for v in _values(row):
+            if isinstance(v, str):
+                # tipo texto explícito: openpyxl tomaría "=..." como fórmula
+                v = WriteOnlyCell(ws, value=_XLSX_ILLEGAL_RE.sub("", v))
+                v.data_type = "s"
+            cells.append(v)
+        ws.append(cells)
+
+    with tempfile.TemporaryFile(suffix=".xlsx") as tmp:
+        wb.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(_FILE_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
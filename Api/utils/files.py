@@ -1,10 +1,10 @@
 import os
 import re
 import uuid
+import hashlib
 import unicodedata
-from typing import Tuple
-from datetime import datetime, timezone
-from zoneinfo import ZoneInfo
+from typing import Tuple, Optional
+import anyio
 from dotenv import load_dotenv
 from fastapi import UploadFile, HTTPException
 
@@ -13,7 +13,9 @@ load_dotenv()
 STORAGE_DIR = os.getenv("STORAGE_DIR", "storage").strip()
 MAX_CV_MB = int(os.getenv("MAX_CV_MB", "10"))
 ALLOWED_EXTS = {e.strip().lower() for e in os.getenv("CV_ALLOWED_EXTS", ".pdf,.doc,.docx").split(",")}
-TIMEZONE = os.getenv("TIMEZONE")  # ej: America/Argentina/Cordoba
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Margen para los campos de texto del form multipart además del CV
+CV_FORM_OVERHEAD_BYTES = 64 * 1024
 
 def ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
@@ -28,67 +30,96 @@ def validate_ext(filename: str) -> str:
     return ext
 
 _slug_re = re.compile(r"[^a-z0-9]+")
-def slugify(text: str) -> str:
+def fold_ascii(text: str) -> str:
+    # quitar acentos → ascii, minúsculas, todo lo no alfanumérico → "-"
     text = (text or "").strip()
-    # quitar acentos → ascii
     text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
     text = text.lower()
-    text = _slug_re.sub("-", text).strip("-")
-    return text or "x"
-
-def build_cv_filename(nombre: str, apellido: str, ext: str) -> str:
-    now = datetime.now(timezone.utc)
-    if TIMEZONE:
-        try:
-            now = now.astimezone(ZoneInfo(TIMEZONE))
-        except Exception:
-            pass  # si falla, queda en UTC
-    stamp = now.strftime("%Y%m%d_%H%M%S")
-    base = f"{slugify(nombre)}_{slugify(apellido)}_{stamp}{ext}"
-    return base
-
-def unique_path(dirpath: str, filename: str) -> str:
-    # Evita colisión: agrega -2, -3, ...
-    name, ext = os.path.splitext(filename)
-    candidate = os.path.join(dirpath, filename)
-    i = 2
-    while os.path.exists(candidate):
-        candidate = os.path.join(dirpath, f"{name}-{i}{ext}")
-        i += 1
-    return candidate
-
-def save_upload_file_cv(file: UploadFile, nombre: str, apellido: str) -> Tuple[str, int, str]:
+    return _slug_re.sub("-", text).strip("-")
+
+def slugify(text: str) -> str:
+    return fold_ascii(text) or "x"
+
+TOKEN_MAX = 60
+def tokenize(text: Optional[str]) -> list[str]:
+    """
+    Misma normalización que slugify (sin acentos, minúsculas, solo [a-z0-9]),
+    partida en palabras. "José Pérez" -> ["jose", "perez"].
+    """
+    return [t[:TOKEN_MAX] for t in fold_ascii(text or "").split("-") if t]
+
+# --- Almacenamiento por contenido (CAS) ---
+# Cada CV se guarda una sola vez en STORAGE_DIR/cas/ab/cd/<sha256>; en la DB
+# cv_filename = "cas/<sha256>". Los nombres viejos (sin prefijo) siguen en STORAGE_DIR/cv.
+CAS_PREFIX = "cas/"
+_sha_re = re.compile(r"^[0-9a-f]{64}$")
+
+def blob_sha(stored_name: str | None) -> str | None:
+    """sha256 de un cv_filename CAS, o None si es un nombre del layout viejo."""
+    if stored_name and stored_name.startswith(CAS_PREFIX):
+        sha = stored_name[len(CAS_PREFIX):]
+        if _sha_re.match(sha):
+            return sha
+    return None
+
+def blob_disk_path(sha: str) -> str:
+    return os.path.join(STORAGE_DIR, "cas", sha[:2], sha[2:4], sha)
+
+def cv_disk_path(stored_name: str) -> str:
+    sha = blob_sha(stored_name)
+    if sha:
+        return blob_disk_path(sha)
+    return os.path.join(STORAGE_DIR, "cv", stored_name)
+
+async def save_upload_file_cv_async(file: UploadFile) -> Tuple[str, int, str, str]:
     """
-    Guarda el archivo en STORAGE_DIR/cv/ como 'nombre_apellido_YYYYMMDD_HHMMSS.ext'
-    Retorna (stored_name, size_bytes, mime_type).
+    Copia el upload por chunks a un temporal en STORAGE_DIR/cas/.tmp sin bloquear
+    el event loop, calculando el sha256 mientras llega y cortando apenas se pasa
+    de MAX_CV_MB.
+    Retorna (stored_name, size_bytes, mime_type, tmp_path). El archivo queda en
+    tmp_path: llamar a place_cv_blob después de registrar la referencia en la DB
+    (o discard_tmp si falla).
     """
-    ensure_dir(os.path.join(STORAGE_DIR, "cv"))
+    tmp_dir = os.path.join(STORAGE_DIR, "cas", ".tmp")
+    ensure_dir(tmp_dir)
     original = secure_basename(file.filename)
-    ext = validate_ext(original)
+    validate_ext(original)
 
-    filename = build_cv_filename(nombre, apellido, ext)
-    dest_path = unique_path(os.path.join(STORAGE_DIR, "cv"), filename)
+    tmp_path = os.path.join(tmp_dir, f"{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
 
     max_bytes = MAX_CV_MB * 1024 * 1024
     size = 0
-    with open(dest_path, "wb") as out:
-        while True:
-            chunk = file.file.read(1024 * 1024)
-            if not chunk:
-                break
-            size += len(chunk)
-            if size > max_bytes:
-                try:
-                    out.close()
-                    os.remove(dest_path)
-                except Exception:
-                    pass
-                raise HTTPException(status_code=413, detail=f"El archivo supera el límite de {MAX_CV_MB}MB")
-            out.write(chunk)
+    try:
+        async with await anyio.open_file(tmp_path, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"El archivo supera el límite de {MAX_CV_MB}MB")
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        discard_tmp(tmp_path)
+        raise
 
     mime = file.content_type or "application/octet-stream"
-    stored_name = os.path.basename(dest_path)
-    return stored_name, size, mime
+    return CAS_PREFIX + digest.hexdigest(), size, mime, tmp_path
 
-def cv_disk_path(stored_name: str) -> str:
-    return os.path.join(STORAGE_DIR, "cv", stored_name)
+def place_cv_blob(tmp_path: str, stored_name: str) -> None:
+    """
+    Mueve el temporal a su ruta CAS con un rename atómico. Si el blob ya existía
+    (mismo contenido) se reemplaza igual: es idéntico y así se repara un borrado
+    concurrente del último dueño anterior.
+    """
+    dest = cv_disk_path(stored_name)
+    ensure_dir(os.path.dirname(dest))
+    os.replace(tmp_path, dest)
+
+def discard_tmp(tmp_path: str) -> None:
+    try:
+        os.remove(tmp_path)
+    except OSError:
+        pass
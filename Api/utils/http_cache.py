@@ -0,0 +1,44 @@
+from typing import Optional
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import Request, Response
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Compara If-None-Match con nuestro ETag (comparación débil, RFC 9110 §13.1.2):
+    acepta listas separadas por coma, '*' y prefijos W/.
+    """
+    if not if_none_match:
+        return False
+    target = etag[2:] if etag.startswith("W/") else etag
+    for cand in if_none_match.split(","):
+        cand = cand.strip()
+        if cand == "*":
+            return True
+        if cand.startswith("W/"):
+            cand = cand[2:]
+        if cand == target:
+            return True
+    return False
+
+def not_modified_since(if_modified_since: Optional[str], mtime: float) -> bool:
+    """True si el recurso (mtime en epoch) no cambió desde la fecha If-Modified-Since."""
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since is None:
+        return False
+    # HTTP-date tiene resolución de segundos
+    return int(mtime) <= int(since.timestamp())
+
+def http_date(ts: float) -> str:
+    return formatdate(ts, usegmt=True)
+
+def cached_json_response(request: Request, body: bytes, etag: str, cache_control: str) -> Response:
+    """Body JSON ya serializado, con ETag; 304 sin body si If-None-Match coincide."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
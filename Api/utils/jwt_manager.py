@@ -1,4 +1,8 @@
 import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from jwt import encode, decode, InvalidTokenError
 from dotenv import load_dotenv
@@ -8,6 +12,8 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "change_me")
 ALGO = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "120"))
+# Tokens ya verificados que se guardan (LRU); 0 desactiva el cache
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "1024"))
 
 def create_token(sub: str, extra: dict | None = None) -> str:
     now = datetime.now(timezone.utc)
@@ -16,8 +22,62 @@ def create_token(sub: str, extra: dict | None = None) -> str:
         payload.update(extra)
     return encode(payload, key=SECRET_KEY, algorithm=ALGO)
 
+def token_hash(token: str) -> str:
+    """Clave del token para cache y revocación (nunca se guarda el token en claro)."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class _TokenCache:
+    """LRU acotado de payloads ya verificados; cada entrada vence con el exp del token."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._items: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            exp, payload = item
+            if exp <= time.time():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return payload
+
+    def put(self, key: str, payload: dict) -> None:
+        exp = payload.get("exp")
+        if self.size <= 0 or not isinstance(exp, (int, float)):
+            return
+        with self._lock:
+            self._items[key] = (float(exp), payload)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_token_cache = _TokenCache(JWT_CACHE_SIZE)
+
+
 def validate_token(token: str) -> dict:
+    """
+    Verifica firma y exp. Los tokens válidos quedan en un LRU hasta su exp: las
+    ráfagas de requests del panel con el mismo token no repiten el decode.
+    (La revocación se chequea aparte, en JWTBearer.)
+    """
+    key = token_hash(token)
+    payload = _token_cache.get(key)
+    if payload is not None:
+        return dict(payload)
     try:
-        return decode(token, key=SECRET_KEY, algorithms=[ALGO])
+        payload = decode(token, key=SECRET_KEY, algorithms=[ALGO])
     except InvalidTokenError as e:
         raise ValueError(str(e))
+    _token_cache.put(key, payload)
+    return dict(payload)
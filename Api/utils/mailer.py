@@ -1,8 +1,8 @@
 # utils/mailer.py
-import os, ssl, smtplib
+import os, ssl, time, smtplib
 from typing import Iterable, Optional
 from email.message import EmailMessage
-from email.utils import formataddr
+from email.utils import formataddr, getaddresses, parseaddr
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,7 +12,9 @@ SMTP_HOST       = os.getenv("SMTP_HOST", "smtp.office365.com")
 SMTP_PORT       = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USERNAME   = os.getenv("SMTP_USERNAME", "")
 SMTP_PASSWORD   = os.getenv("SMTP_PASSWORD", "")
-SMTP_SECURITY   = os.getenv("SMTP_SECURITY", "starttls").lower().strip()  # "starttls" | "ssl"
+SMTP_SECURITY   = os.getenv("SMTP_SECURITY", "starttls").lower().strip()  # "starttls" | "ssl" | "none"
+SMTP_TIMEOUT    = int(os.getenv("SMTP_TIMEOUT", "60"))
+SMTP_MAX_IDLE   = int(os.getenv("SMTP_MAX_IDLE", "30"))  # seg. sin uso antes de verificar con NOOP
 
 MAIL_FROM_NAME  = os.getenv("MAIL_FROM_NAME", "Notificaciones")
 MAIL_FROM_EMAIL = os.getenv("MAIL_FROM_EMAIL", SMTP_USERNAME or "no-reply@example.com")
@@ -31,7 +33,7 @@ def _tls_context() -> ssl.SSLContext:
         ctx.minimum_version = ssl.TLSVersion.TLSv1_2
     return ctx
 
-def _build_message(subject: str, to: Iterable[str], html: str, text: Optional[str] = None) -> EmailMessage:
+def build_message(subject: str, to: Iterable[str], html: str, text: Optional[str] = None) -> EmailMessage:
     msg = EmailMessage()
     msg["Subject"] = subject
     msg["From"] = formataddr((MAIL_FROM_NAME, MAIL_FROM_EMAIL))
@@ -43,51 +45,131 @@ def _build_message(subject: str, to: Iterable[str], html: str, text: Optional[st
     msg.add_alternative(html, subtype="html")
     return msg
 
-def _send_starttls(msg: EmailMessage):
+def _open_starttls() -> smtplib.SMTP:
     ctx = _tls_context()
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=60) as s:
+    s = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    try:
         # s.set_debuglevel(1)  # <- descomentar para ver diálogo SMTP
         s.ehlo()
         s.starttls(context=ctx)
         s.ehlo()
         s.login(SMTP_USERNAME, SMTP_PASSWORD)
-        s.send_message(msg)
+    except Exception:
+        s.close()
+        raise
+    return s
 
-def _send_ssl(msg: EmailMessage):
+def _open_ssl() -> smtplib.SMTP:
     ctx = _tls_context()
-    with smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=ctx, timeout=60) as s:
+    s = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=ctx, timeout=SMTP_TIMEOUT)
+    try:
         # s.set_debuglevel(1)  # <- descomentar para ver diálogo SMTP
         s.login(SMTP_USERNAME, SMTP_PASSWORD)
-        s.send_message(msg)
+    except Exception:
+        s.close()
+        raise
+    return s
 
-def send_mail(subject: str, to: Iterable[str], html: str, text: Optional[str] = None) -> None:
-    if not MAIL_ENABLED:
-        print(f"[MAIL_DISABLED] {subject} -> {', '.join(to)}")
-        return
-    if not SMTP_USERNAME or not SMTP_PASSWORD:
-        print("[MAIL_ERROR] SMTP_USERNAME/SMTP_PASSWORD no configurados")
-        return
+def _open_plain() -> smtplib.SMTP:
+    # Sin TLS: solo para relays locales / servidores SMTP de prueba
+    s = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    if SMTP_USERNAME:
+        try:
+            s.login(SMTP_USERNAME, SMTP_PASSWORD)
+        except Exception:
+            s.close()
+            raise
+    return s
 
-    msg = _build_message(subject, to, html, text)
 
-    try:
-        if SMTP_SECURITY == "ssl":
-            _send_ssl(msg)
-        else:
-            _send_starttls(msg)
-        return
-    except smtplib.SMTPException as e:
-        err = str(e).lower()
-        # Fallback cruzado si hay error típico de modo/tls
+class SMTPConnection:
+    """
+    Sesión SMTP autenticada y reutilizable entre mensajes (connect + TLS + login
+    una sola vez). No es thread-safe: usar una por worker.
+    """
+
+    def __init__(self):
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    def _connect(self) -> None:
+        if SMTP_SECURITY == "none":
+            self._smtp = _open_plain()
+            return
+        try:
+            self._smtp = _open_ssl() if SMTP_SECURITY == "ssl" else _open_starttls()
+        except smtplib.SMTPException:
+            # Fallback cruzado si hay error típico de modo/tls
+            self._smtp = _open_starttls() if SMTP_SECURITY == "ssl" else _open_ssl()
+            print("[MAIL_INFO] Conectado usando fallback de seguridad")
+
+    def _alive(self) -> bool:
+        if self._smtp is None:
+            return False
+        if time.monotonic() - self._last_used < SMTP_MAX_IDLE:
+            return True
+        # sesión ociosa: el servidor pudo haberla cerrado
         try:
-            if SMTP_SECURITY == "ssl":
-                _send_starttls(msg)
-            else:
-                _send_ssl(msg)
-            print("[MAIL_INFO] Enviado usando fallback de seguridad")
+            return self._smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def send(self, msg: EmailMessage) -> None:
+        """
+        MAIL FROM / RCPT TO / DATA sobre la sesión abierta. Reintenta con una
+        conexión nueva solo si la sesión estaba muerta antes de que el servidor
+        aceptara el MAIL FROM: ahí seguro no recibió nada. Una falla después
+        (RCPT/DATA, corte o 4xx) se propaga sin reintentar: el mensaje pudo
+        haberse entregado y el reintento queda a cargo del backoff de mail_outbox.
+        """
+        from_addr = parseaddr(msg["From"])[1]
+        to_addrs = [a for _, a in getaddresses(msg.get_all("To", []) + msg.get_all("Cc", [])) if a]
+        data = msg.as_bytes(policy=msg.policy.clone(linesep="\r\n"))
+
+        if not self._alive():
+            self.close()
+            self._connect()
+        for attempt in range(2):
+            started = False
+            try:
+                smtp = self._smtp
+                smtp.ehlo_or_helo_if_needed()
+                code, resp = smtp.mail(from_addr)
+                if code != 250:
+                    raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+                started = True
+                refused = {}
+                for addr in to_addrs:
+                    code, resp = smtp.rcpt(addr)
+                    if code not in (250, 251):
+                        refused[addr] = (code, resp)
+                if len(refused) == len(to_addrs):
+                    raise smtplib.SMTPRecipientsRefused(refused)
+                code, resp = smtp.data(data)
+                if code != 250:
+                    raise smtplib.SMTPDataError(code, resp)
+                break
+            except Exception as e:
+                # transacción a medias: la sesión no se reutiliza
+                self.close()
+                # el servidor respondió (SMTPResponseException): la conexión estaba viva, no se reintenta
+                dead = isinstance(e, (smtplib.SMTPServerDisconnected, OSError)) \
+                    and not isinstance(e, smtplib.SMTPResponseException)
+                if started or attempt or not dead:
+                    raise
+                # la conexión se cayó entre mensajes: reconectar una vez
+                self._connect()
+        self._last_used = time.monotonic()
+
+    def close(self) -> None:
+        if self._smtp is None:
             return
-        except Exception as e2:
-            print(f"[MAIL_ERROR_FALLBACK] {e2}")
-        print(f"[MAIL_ERROR] {e}")
-    except Exception as e:
-        print(f"[MAIL_ERROR] {e}")
+        try:
+            self._smtp.quit()
+        except Exception:
+            try:
+                self._smtp.close()
+            except Exception:
+                pass
+        self._smtp = None
+
@@ -0,0 +1,26 @@
+# utils/passwords.py
+# Hash y verificación bcrypt. Corre en procesos aparte (services.passwords): no importar la DB acá.
+import os
+from passlib.context import CryptContext
+from passlib.exc import UnknownHashError
+
+# Costo de bcrypt para los hashes nuevos; al cambiarlo, cada usuario se re-hashea en su próximo login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain: str, hashed: str) -> bool:
+    return verify_and_update(plain, hashed)[0]
+
+
+def verify_and_update(plain: str, hashed: str) -> tuple[bool, str | None]:
+    """(ok, hash nuevo): el hash nuevo viene solo si el guardado usa otro costo o esquema."""
+    try:
+        return pwd_context.verify_and_update(plain, hashed)
+    except (UnknownHashError, ValueError):
+        return False, None
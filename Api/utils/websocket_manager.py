@@ -1,82 +1,407 @@
 from fastapi import WebSocket
-from typing import List
+from typing import Iterable, Optional, Union
+import os
 import json
+import time
+import uuid
+import asyncio
+from collections import deque
+
+from utils.event_bus import create_bus, RESYNC_EVENT
+
+# Mensajes pendientes por conexión; si se llena, el cliente es demasiado lento y se desconecta
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "100"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+WS_CLOSE_TIMEOUT = float(os.getenv("WS_CLOSE_TIMEOUT", "5"))
+# Heartbeat: PING cada WS_PING_SECONDS; se corta a quien respondió PONG alguna vez y dejó de hacerlo
+WS_PING_SECONDS = float(os.getenv("WS_PING_SECONDS", "25"))
+WS_PING_TIMEOUT = float(os.getenv("WS_PING_TIMEOUT", "75"))
+# Eventos secuenciados que se guardan para reponer con /ws?since=<seq> (como mucho media cola)
+WS_REPLAY_SIZE = min(int(os.getenv("WS_REPLAY_SIZE", "50")), WS_QUEUE_SIZE // 2)
+# Presencia de otros workers: se refresca en cada heartbeat y vence si el worker deja de publicar
+WS_PRESENCE_TTL = float(os.getenv("WS_PRESENCE_TTL", str(WS_PING_SECONDS * 3)))
+
+# Códigos de cierre (RFC 6455 §7.4)
+WS_CLOSE_TRY_AGAIN = 1013   # cola llena / envío trabado
+WS_CLOSE_POLICY = 1008      # sin heartbeat
+
+_PING_MESSAGE = json.dumps({"type": "PING", "payload": {}})
+
+# Tema "lista": recibe VIEWERS_UPDATE de todos los CV (p.ej. la grilla de postulaciones)
+TOPIC_LIST = "list"
+Topic = Union[int, str]
+
+
+class _Client:
+    """Una conexión: su usuario, su cola de salida y la tarea que la vacía."""
+    __slots__ = ("websocket", "user", "queue", "writer", "last_seen", "heartbeat", "closed",
+                 "viewing", "topics")
+
+    def __init__(self, websocket: WebSocket, user: dict):
+        self.websocket = websocket
+        self.user = user
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=WS_QUEUE_SIZE)
+        self.writer: Optional[asyncio.Task] = None
+        self.last_seen = time.monotonic()
+        self.heartbeat = False   # True cuando el cliente respondió un PONG
+        self.closed = False
+        self.viewing: set[int] = set()      # CV que esta conexión tiene abiertos
+        self.topics: set[Topic] = set()     # suscripciones explícitas
+
 
 class ConnectionManager:
+    """
+    Conexiones de este worker. Eventos y presencia pasan por un bus
+    (utils.event_bus) para llegar a los clientes conectados a otros workers.
+    """
 
-    def __init__(self):
-        # WebSocket -> { "id": int, "nombre": str }
-        self.active_connections: dict[WebSocket, dict] = {}
-        # cv_id -> set(user_id)
-        # Esto es simple. Para enviar nombres, necesitamos mapear user_id -> nombre o guardar estructuras más completas.
-        # Guardaremos: cv_id -> { user_id: "Nombre" }
-        self.viewers: dict[int, dict[int, str]] = {}
+    def __init__(self, bus=None):
+        # WebSocket -> _Client (user = { "id": int, "nombre": str })
+        self.active_connections: dict[WebSocket, _Client] = {}
+        # Índices inversos de _Client.viewing / _Client.topics (sin entradas vacías):
+        # cv_id -> conexiones que lo están viendo; tema -> conexiones suscriptas
+        self.viewers: dict[int, set[_Client]] = {}
+        self.subscribers: dict[Topic, set[_Client]] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        # Bus entre workers y presencia publicada por los demás: cv_id -> nodo -> (visto, viewers)
+        self.bus = bus or create_bus()
+        self.node = uuid.uuid4().hex[:12]
+        self.remote_viewers: dict[int, dict[str, tuple[float, list[dict]]]] = {}
+        self._bus_started = False
+        # último seq recibido (eventos de broadcast_sequenced) y los últimos mensajes para reponer
+        self.last_seq: Optional[int] = None
+        self.replay: deque[tuple[int, str]] = deque(maxlen=WS_REPLAY_SIZE)
+        # Copia persistente opcional (services.ws_replay.DBReplayStore): append / load_since
+        self.replay_store = None
 
-    async def connect(self, websocket: WebSocket, user_info: dict):
+    async def start(self):
+        if not self._bus_started:
+            self._bus_started = True
+            await self.bus.start(self._on_bus_message)
+
+    async def stop(self):
+        if not self._bus_started:
+            return
+        # avisar a los demás workers que estos viewers se fueron
+        for cv_id in list(self.viewers):
+            await self._publish({"k": "presence", "node": self.node, "cvId": cv_id, "viewers": []})
+        await self.bus.stop()
+        self._bus_started = False
+
+    async def connect(self, websocket: WebSocket, user_info: dict, since: Optional[int] = None):
+        """
+        since = último seq que el cliente llegó a ver (reconexión): se le reponen
+        los eventos posteriores o, si el hueco es demasiado grande, recibe RESYNC.
+        Sin since recibe HELLO con el seq actual.
+        """
+        await self.start()
         await websocket.accept()
-        self.active_connections[websocket] = user_info
+        stored = None
+        if since is not None and self.replay_store is not None and self._replay_from_memory(since) is None:
+            try:
+                stored = await asyncio.get_running_loop().run_in_executor(
+                    None, self.replay_store.load_since, since, WS_REPLAY_SIZE + 1)
+            except Exception as e:
+                print(f"[WS_REPLAY_ERROR] {e}")
+        # registrar y encolar la reposición sin awaits en el medio: ningún evento nuevo se cuela antes
+        client = _Client(websocket, user_info)
+        client.writer = asyncio.create_task(self._writer(client))
+        self.active_connections[websocket] = client
+        if since is None:
+            client.queue.put_nowait(json.dumps({"type": "HELLO", "payload": {"seq": self.last_seq}}))
+        else:
+            missed = self._replay_from_memory(since)
+            if missed is None and stored is not None:
+                missed = self._replay_from_store(since, stored)
+            if missed is None:
+                client.queue.put_nowait(json.dumps({"type": RESYNC_EVENT, "payload": {"seq": self.last_seq}}))
+            else:
+                for message in missed:
+                    client.queue.put_nowait(message)
+        self._ensure_heartbeat()
+
+    def _replay_from_memory(self, since: int) -> Optional[list[str]]:
+        """Mensajes con seq > since si el buffer los tiene todos; None si no alcanza."""
+        if self.last_seq is None or since > self.last_seq:
+            return None   # worker reiniciado o seq de otra instancia
+        if since == self.last_seq:
+            return []
+        if not self.replay or self.replay[0][0] > since + 1:
+            return None
+        return [m for s, m in self.replay if s > since]
+
+    def _replay_from_store(self, since: int, stored: tuple) -> Optional[list[str]]:
+        first, last, rows = stored
+        if first is None or first > since + 1 or since > last or len(rows) > WS_REPLAY_SIZE:
+            return None
+        top = rows[-1][0] if rows else since
+        tail = [(s, m) for s, m in self.replay if s > top]
+        if tail and tail[0][0] != top + 1:
+            return None
+        if not tail and self.last_seq is not None and self.last_seq > top:
+            return None
+        return [d for _, d in rows] + [m for _, m in tail]
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            # Limpiar presencia
-            user = self.active_connections[websocket]
-            user_id = user.get("id")
-            
-            # Remover de todos los viewers
-            to_notify_cvs = []
-            for cv_id, viewers_map in self.viewers.items():
-                if user_id in viewers_map:
-                    del viewers_map[user_id]
-                    to_notify_cvs.append(cv_id)
-            
-            del self.active_connections[websocket]
-
-            return to_notify_cvs
+        client = self.active_connections.pop(websocket, None)
+        if client is None:
+            return []
+        client.closed = True
+        if client.writer and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+        # Limpiar presencia: solo los CV de esta conexión
+        to_notify_cvs = list(client.viewing)
+        for cv_id in to_notify_cvs:
+            self._leave(client, cv_id)
+        for topic in list(client.topics):
+            self._unsubscribe(client, topic)
+        return to_notify_cvs
+
+    # === ÍNDICE DE PRESENCIA (O(1) por alta/baja, sin entradas vacías) ===
+    @staticmethod
+    def _index_add(index: dict, key, client: _Client) -> None:
+        index.setdefault(key, set()).add(client)
+
+    @staticmethod
+    def _index_remove(index: dict, key, client: _Client) -> None:
+        members = index.get(key)
+        if members is not None:
+            members.discard(client)
+            if not members:
+                del index[key]
+
+    def _join(self, client: _Client, cv_id: int) -> bool:
+        if cv_id in client.viewing:
+            return False
+        client.viewing.add(cv_id)
+        self._index_add(self.viewers, cv_id, client)
+        return True
+
+    def _leave(self, client: _Client, cv_id: int) -> bool:
+        if cv_id not in client.viewing:
+            return False
+        client.viewing.discard(cv_id)
+        self._index_remove(self.viewers, cv_id, client)
+        return True
+
+    def _subscribe(self, client: _Client, topic: Topic) -> None:
+        client.topics.add(topic)
+        self._index_add(self.subscribers, topic, client)
+
+    def _unsubscribe(self, client: _Client, topic: Topic) -> None:
+        client.topics.discard(topic)
+        self._index_remove(self.subscribers, topic, client)
+
+    def _local_viewers(self, cv_id: int) -> list[dict]:
+        # Un usuario con el CV abierto en varias pestañas aparece una vez
+        users = {c.user["id"]: c.user["nombre"] for c in self.viewers.get(cv_id, ())}
+        return [{"id": uid, "nombre": name} for uid, name in users.items()]
+
+    def viewers_of(self, cv_id: int) -> list[dict]:
+        """Viewers de todos los workers (los de este + los publicados por el bus)."""
+        users = {v["id"]: v["nombre"] for v in self._local_viewers(cv_id)}
+        limit = time.monotonic() - WS_PRESENCE_TTL
+        for seen, viewers in self.remote_viewers.get(cv_id, {}).values():
+            if seen >= limit:
+                for v in viewers:
+                    users.setdefault(v["id"], v["nombre"])
+        return [{"id": uid, "nombre": name} for uid, name in users.items()]
 
     async def broadcast(self, event_type: str, data: dict):
         """
-        Envía un mensaje JSON a todos los clientes conectados.
+        Publica un evento para todos los clientes de todos los workers. El JSON
+        se arma una sola vez y en cada worker se encola sin esperar a nadie:
+        cada conexión tiene su propia tarea de envío, así un navegador trabado
+        no demora al resto.
+        """
+        await self._publish({"k": "event", "type": event_type, "payload": data})
+
+    async def broadcast_sequenced(self, event_type: str, data: dict):
+        """
+        Como broadcast, pero el bus le asigna un número global creciente ("seq"
+        en el mensaje) para que los clientes detecten huecos y se resincronicen.
         """
-        message = json.dumps({"type": event_type, "payload": data})
-        # Iterar sobre una copia
-        for connection in list(self.active_connections.keys()):
+        await self._publish({"k": "event", "type": event_type, "payload": data, "node": self.node},
+                            sequenced=True)
+
+    async def _publish(self, envelope: dict, sequenced: bool = False) -> None:
+        await self.start()
+        try:
+            await self.bus.publish(json.dumps(envelope, ensure_ascii=False), sequenced=sequenced)
+        except Exception as e:
+            print(f"[WS_BUS_ERROR] publish: {e}")
+
+    def _on_bus_message(self, data: str, seq: Optional[int] = None) -> None:
+        try:
+            env = json.loads(data)
+            if env.get("k") == "event":
+                message = {"type": env["type"], "payload": env["payload"]}
+                if seq is not None and env["type"] == RESYNC_EVENT:
+                    # RESYNC del bus (mensaje que no entraba): el cliente retoma desde este seq
+                    message["payload"] = {**message["payload"], "seq": seq}
+                if seq is not None:
+                    message["seq"] = seq
+                text = json.dumps(message)
+                if seq is not None:
+                    self.last_seq = seq
+                    self.replay.append((seq, text))
+                    if self.replay_store is not None and env.get("node") == self.node:
+                        # lo persiste solo el worker que lo publicó
+                        asyncio.get_running_loop().run_in_executor(None, self._persist, seq, text)
+                self._fan_out(text)
+            elif env.get("k") == "presence":
+                self._on_presence(env["node"], int(env["cvId"]), env["viewers"], env.get("notify", False))
+        except Exception as e:
+            print(f"[WS_BUS_ERROR] mensaje inválido: {e}")
+
+    def _persist(self, seq: int, text: str) -> None:
+        try:
+            self.replay_store.append(seq, text)
+        except Exception as e:
+            print(f"[WS_REPLAY_ERROR] seq={seq} {e}")
+
+    def _on_presence(self, node: str, cv_id: int, viewers: list[dict], notify: bool) -> None:
+        if node == self.node:
+            changed = notify   # lo local ya está en self.viewers
+        else:
+            nodes = self.remote_viewers.setdefault(cv_id, {})
+            prev = nodes.get(node)
+            changed = prev is None or prev[1] != viewers
+            if viewers:
+                nodes[node] = (time.monotonic(), viewers)
+            else:
+                nodes.pop(node, None)
+                if not nodes:
+                    del self.remote_viewers[cv_id]
+        if changed:
+            self._deliver_viewers(cv_id)
+
+    def _prune_remote(self) -> list[int]:
+        """Quita la presencia de workers que dejaron de publicar (caídos). Devuelve los CV afectados."""
+        limit = time.monotonic() - WS_PRESENCE_TTL
+        expired = []
+        for cv_id, nodes in list(self.remote_viewers.items()):
+            for node, (seen, _) in list(nodes.items()):
+                if seen < limit:
+                    del nodes[node]
+                    expired.append(cv_id)
+            if not nodes:
+                del self.remote_viewers[cv_id]
+        return expired
+
+    def _fan_out(self, message: str, clients: Optional[Iterable[_Client]] = None) -> None:
+        targets = self.active_connections.values() if clients is None else clients
+        for client in list(targets):
             try:
-                await connection.send_text(message)
-            except Exception:
-                # La desconexión se maneja en el router o aquí
-                pass
+                client.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._evict(client, WS_CLOSE_TRY_AGAIN, "cola llena")
+
+    async def _writer(self, client: _Client) -> None:
+        ws = client.websocket
+        try:
+            while True:
+                message = await client.queue.get()
+                await asyncio.wait_for(ws.send_text(message), WS_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self._evict(client, WS_CLOSE_TRY_AGAIN, "envío trabado")
+        except Exception:
+            # socket cerrado del otro lado: el router recibe el disconnect, igual se limpia acá
+            self._evict(client, WS_CLOSE_TRY_AGAIN, "error de envío")
+
+    def _evict(self, client: _Client, code: int, reason: str) -> None:
+        if client.closed:
+            return
+        print(f"[WS] desconectando user={client.user.get('id')}: {reason}")
+        affected = self.disconnect(client.websocket)
+        asyncio.create_task(self._close(client, code, affected))
+
+    async def _close(self, client: _Client, code: int, affected_cvs: list[int]) -> None:
+        try:
+            await asyncio.wait_for(client.websocket.close(code=code), WS_CLOSE_TIMEOUT)
+        except Exception:
+            pass
+        for cv_id in affected_cvs:
+            await self.broadcast_viewers(cv_id)
+
+    # === HEARTBEAT ===
+    def _ensure_heartbeat(self) -> None:
+        task = self._heartbeat_task
+        loop = asyncio.get_running_loop()
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._heartbeat_task = loop.create_task(self._heartbeat())
+
+    async def _heartbeat(self) -> None:
+        while self.active_connections:
+            await asyncio.sleep(WS_PING_SECONDS)
+            now = time.monotonic()
+            for client in list(self.active_connections.values()):
+                if client.heartbeat and now - client.last_seen > WS_PING_TIMEOUT:
+                    self._evict(client, WS_CLOSE_POLICY, "sin heartbeat")
+            self._fan_out(_PING_MESSAGE)
+            # refrescar nuestra presencia en los otros workers y vencer la de los caídos
+            for cv_id in list(self.viewers):
+                await self._publish({"k": "presence", "node": self.node, "cvId": cv_id,
+                                     "viewers": self._local_viewers(cv_id)})
+            for cv_id in set(self._prune_remote()):
+                self._deliver_viewers(cv_id)
 
     async def handle_message(self, websocket: WebSocket, data: dict):
         """
-        Maneja mensajes del cliente: ENTER_VIEW, EXIT_VIEW
+        Maneja mensajes del cliente: ENTER_VIEW, EXIT_VIEW, SUBSCRIBE, UNSUBSCRIBE, PONG.
+        ENTER_VIEW ya suscribe a los cambios de ese CV; SUBSCRIBE acepta
+        {"cvIds": [...]} y/o {"topic": "list"} para seguir CV sin abrirlos.
         """
         msg_type = data.get("type")
-        payload = data.get("payload", {})
-        user = self.active_connections.get(websocket)
-        
-        if not user: return
+        payload = data.get("payload") or {}
+        client = self.active_connections.get(websocket)
+
+        if not client: return
+        client.last_seen = time.monotonic()
 
-        if msg_type == "ENTER_VIEW":
+        if msg_type == "PONG":
+            client.heartbeat = True
+
+        elif msg_type == "ENTER_VIEW":
             cv_id = int(payload.get("cvId", 0))
-            if cv_id:
-                if cv_id not in self.viewers:
-                    self.viewers[cv_id] = {}
-                self.viewers[cv_id][user["id"]] = user["nombre"]
+            if cv_id and self._join(client, cv_id):
                 await self.broadcast_viewers(cv_id)
 
         elif msg_type == "EXIT_VIEW":
             cv_id = int(payload.get("cvId", 0))
-            if cv_id and cv_id in self.viewers:
-                if user["id"] in self.viewers[cv_id]:
-                    del self.viewers[cv_id][user["id"]]
-                    await self.broadcast_viewers(cv_id)
+            if cv_id and self._leave(client, cv_id):
+                await self.broadcast_viewers(cv_id)
+
+        elif msg_type in ("SUBSCRIBE", "UNSUBSCRIBE"):
+            topics: list[Topic] = [int(x) for x in payload.get("cvIds") or [] if int(x)]
+            if payload.get("topic") == TOPIC_LIST:
+                topics.append(TOPIC_LIST)
+            for topic in topics:
+                if msg_type == "SUBSCRIBE":
+                    self._subscribe(client, topic)
+                    if topic != TOPIC_LIST:
+                        # estado actual solo para quien se suscribe
+                        self._fan_out(self._viewers_message(topic), (client,))
+                else:
+                    self._unsubscribe(client, topic)
+
+    def _viewers_message(self, cv_id: int) -> str:
+        return json.dumps({"type": "VIEWERS_UPDATE", "payload": {"cvId": cv_id, "viewers": self.viewers_of(cv_id)}})
 
     async def broadcast_viewers(self, cv_id: int):
-        # Enviar lista de nombres
-        current_viewers = []
-        if cv_id in self.viewers:
-            current_viewers = [{"id": uid, "nombre": name} for uid, name in self.viewers[cv_id].items()]
-        
-        await self.broadcast("VIEWERS_UPDATE", {"cvId": cv_id, "viewers": current_viewers})
+        """Publica la presencia local de ese CV; cada worker avisa a sus clientes interesados."""
+        await self._publish({"k": "presence", "node": self.node, "cvId": cv_id,
+                             "viewers": self._local_viewers(cv_id), "notify": True})
+
+    def _deliver_viewers(self, cv_id: int) -> None:
+        """VIEWERS_UPDATE solo a quienes ven ese CV o están suscriptos a él o a la lista."""
+        targets = set(self.viewers.get(cv_id, ()))
+        targets.update(self.subscribers.get(cv_id, ()))
+        targets.update(self.subscribers.get(TOPIC_LIST, ()))
+        if targets:
+            self._fan_out(self._viewers_message(cv_id), targets)
 
 manager = ConnectionManager()
@@ -42,7 +42,10 @@ export default function Dashboard() {
 
   const { lastMessage } = useWebSocket();
   useEffect(() => {
-    if (lastMessage && ["POSTULACION_CREATED", "POSTULACION_UPDATED", "POSTULACION_DELETED"].includes(lastMessage.type)) {
+    if (!lastMessage) return;
+    if (lastMessage.type === "POSTULACIONES_BATCH" && lastMessage.payload.counts) {
+      setCounts(lastMessage.payload.counts);
+    } else if (["POSTULACIONES_BATCH", "RESYNC"].includes(lastMessage.type)) {
       // Reload simple
       (async () => {
         try {
@@ -51,8 +51,10 @@ export default function PostulacionView() {
 
   // Handle Updates Realtime
   useEffect(() => {
-    if (lastMessage?.type === "POSTULACION_UPDATED" && lastMessage.payload?.id === Number(id)) {
-      setPostulacion((prev) => ({ ...(prev || {}), ...lastMessage.payload }));
+    if (lastMessage?.type !== "POSTULACIONES_BATCH") return;
+    const row = lastMessage.payload.updated.find((r) => r.id === Number(id));
+    if (row) {
+      setPostulacion((prev) => ({ ...(prev || {}), ...row }));
       setMsg("La postulación fue actualizada externamente.");
     }
   }, [lastMessage, id]);
@@ -146,23 +146,31 @@ export default function Postulaciones() {
   useEffect(() => {
     if (!lastMessage) return;
 
-    if (lastMessage.type === "POSTULACION_CREATED") {
-      // Si estamos en página 1 y sin filtros complejos (o si querés ser más smart, solo reload)
-      // Estrategia simple: reload
+    if (lastMessage.type === "RESYNC") {
       load();
-    } else if (lastMessage.type === "POSTULACION_DELETED") {
-      // Quitar de la lista local si existe
-      const { id } = lastMessage.payload;
+      return;
+    }
+    if (lastMessage.type !== "POSTULACIONES_BATCH") return;
+    const { created, updated, deleted } = lastMessage.payload;
+
+    if (created.length) {
+      // Dónde caen las nuevas depende de filtros/orden/página: una sola recarga por lote
+      load();
+      return;
+    }
+    if (deleted.length) {
+      // Quitar de la lista local las que estén
+      const gone = new Set(deleted);
       setItems(prev => {
-        const exists = prev.find(i => i.id === id);
-        if (!exists) return prev;
-        setTotal(t => Math.max(0, t - 1));
-        return prev.filter(i => i.id !== id);
+        const next = prev.filter(i => !gone.has(i.id));
+        if (next.length !== prev.length) setTotal(t => Math.max(0, t - (prev.length - next.length)));
+        return next;
       });
-    } else if (lastMessage.type === "POSTULACION_UPDATED") {
-      // Actualizar local
-      const { id, estado } = lastMessage.payload;
-      setItems(prev => prev.map(i => i.id === id ? { ...i, estado } : i));
+    }
+    if (updated.length) {
+      // Parchear local con el resumen de cada fila
+      const byId = new Map(updated.map(r => [r.id, r]));
+      setItems(prev => prev.map(i => byId.has(i.id) ? { ...i, ...byId.get(i.id) } : i));
     }
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [lastMessage]);
@@ -195,6 +203,53 @@ export default function Postulaciones() {
     navigate(`/postulaciones/${p.id}`);
   };
 
+  // Exportar todo lo filtrado (el servidor lo arma en streaming, sin paginar)
+  const [exporting, setExporting] = useState(false);
+  const onExport = async (formato) => {
+    setExporting(true);
+    try {
+      const blob = await PostulacionesAPI.exportBlob({
+        q: filters.q || undefined,
+        estado: filters.estado || undefined,
+        unidad_id: filters.unidadId || undefined,
+        puesto_id: filters.puestoId || undefined,
+        sort: filters.sort || "reciente",
+      }, formato);
+      const url = URL.createObjectURL(blob);
+      const a = document.createElement("a");
+      a.href = url;
+      a.download = `postulaciones.${formato}`;
+      a.click();
+      URL.revokeObjectURL(url);
+    } catch (err) {
+      toast.fire({ icon: "error", title: err.message || "No se pudo exportar" });
+    } finally {
+      setExporting(false);
+    }
+  };
+
+  const onDownloadCvs = async () => {
+    setExporting(true);
+    try {
+      const blob = await PostulacionesAPI.cvZipBlob({
+        q: filters.q || undefined,
+        estado: filters.estado || undefined,
+        unidad_id: filters.unidadId || undefined,
+        puesto_id: filters.puestoId || undefined,
+      });
+      const url = URL.createObjectURL(blob);
+      const a = document.createElement("a");
+      a.href = url;
+      a.download = "cvs.zip";
+      a.click();
+      URL.revokeObjectURL(url);
+    } catch (err) {
+      toast.fire({ icon: "error", title: err.message || "No se pudieron descargar los CVs" });
+    } finally {
+      setExporting(false);
+    }
+  };
+
   const onDecidido = (upd) => {
     setItems((arr) => arr.map((x) => (x.id === upd.id ? { ...x, ...upd } : x)));
   };
@@ -213,6 +268,29 @@ export default function Postulaciones() {
         estados={estadosDisplay}
       />
 
+      {/* Exportar */}
+      <div className="flex justify-end gap-2 mt-4">
+        {["xlsx", "csv"].map((formato) => (
+          <button
+            key={formato}
+            className="px-3 py-1.5 rounded-lg bg-gray-900 border border-white/10 text-sm text-gray-300 hover:bg-gray-800 transition-colors disabled:opacity-50 disabled:cursor-not-allowed"
+            disabled={exporting}
+            onClick={() => onExport(formato)}
+          >
+            <i className={`fa-solid ${formato === "xlsx" ? "fa-file-excel" : "fa-file-csv"} mr-2`} />
+            Exportar {formato.toUpperCase()}
+          </button>
+        ))}
+        <button
+          className="px-3 py-1.5 rounded-lg bg-gray-900 border border-white/10 text-sm text-gray-300 hover:bg-gray-800 transition-colors disabled:opacity-50 disabled:cursor-not-allowed"
+          disabled={exporting}
+          onClick={onDownloadCvs}
+        >
+          <i className="fa-solid fa-file-zipper mr-2" />
+          Descargar CVs
+        </button>
+      </div>
+
       {/* Grilla (now List) */}
       <div className="flex flex-col gap-4 mt-6">
         {loading ? (
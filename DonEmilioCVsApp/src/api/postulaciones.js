@@ -15,6 +15,28 @@ export const PostulacionesAPI = {
     return apiFetch(`/postulaciones${suf}`, { method: "GET" });
   },
 
+  // exportar todas las que cumplen los filtros (sin paginar); formato: "csv" | "xlsx"
+  exportBlob: (params = {}, formato = "csv") => {
+    const qs = new URLSearchParams({ formato });
+    if (params.q) qs.set("q", params.q);
+    if (params.estado) qs.set("estado", params.estado);
+    if (params.unidad_id) qs.set("unidad_id", params.unidad_id);
+    if (params.puesto_id) qs.set("puesto_id", params.puesto_id);
+    if (params.sort) qs.set("sort", params.sort);
+    return apiFetchBlob(`/postulaciones/export?${qs.toString()}`, { method: "GET" });
+  },
+
+  // ZIP con los CV de lo filtrado (o de params.ids)
+  cvZipBlob: (params = {}) => {
+    const qs = new URLSearchParams();
+    if (params.q) qs.set("q", params.q);
+    if (params.estado) qs.set("estado", params.estado);
+    if (params.unidad_id) qs.set("unidad_id", params.unidad_id);
+    if (params.puesto_id) qs.set("puesto_id", params.puesto_id);
+    (params.ids || []).forEach((id) => qs.append("ids", id));
+    return apiFetchBlob(`/postulaciones/cvs/zip?${qs.toString()}`, { method: "GET" });
+  },
+
   get: (id) => apiFetch(`/postulaciones/${id}`, { method: "GET" }),
 
   // actualizar metadatos (NO estado)
@@ -29,6 +51,12 @@ export const PostulacionesAPI = {
     body: JSON.stringify(data), // { estado: 'destacada'|'posible'|'descartada', motivo?: string }
   }),
 
+  // misma decisión para varias postulaciones; devuelve { actualizadas, resultados: [{ id, ok, error }] }
+  decidirLote: (ids, data) => apiFetch(`/postulaciones/decidir`, {
+    method: "POST",
+    body: JSON.stringify({ ...data, ids }), // { ids, estado, motivo, unidad_id?, puesto_id? }
+  }),
+
   // eliminar postulación
   remove: (id) => apiFetch(`/postulaciones/${id}`, { method: "DELETE" }),
 
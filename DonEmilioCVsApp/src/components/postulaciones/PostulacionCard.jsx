@@ -35,11 +35,13 @@ export default function PostulacionCard({
   // Resolver Unidad / Puesto Original (cast a Number por si vienen como string)
   const unidadOriginalNombre =
     item?.unidad_original?.nombre ??
+    item?.unidad_original_nombre ??
     unidadById?.get?.(Number(item.unidad_original_id))?.nombre ??
     "-";
 
   const puestoOriginalNombre =
     item?.puesto_original?.nombre ??
+    item?.puesto_original_nombre ??
     puestoById?.get?.(Number(item.puesto_original_id))?.nombre ??
     "-";
 
@@ -101,7 +101,11 @@ export default function Topbar() {
   // Escuchar por WebSockets para actualizar el contador automáticamente
   useEffect(() => {
     if (!lastMessage) return;
-    if (["POSTULACION_CREATED", "POSTULACION_DELETED", "POSTULACION_UPDATED"].includes(lastMessage.type)) {
+    // El lote trae los contadores actualizados: no hace falta pedir /counts
+    const counts = lastMessage.type === "POSTULACIONES_BATCH" ? lastMessage.payload.counts : null;
+    if (counts && typeof counts.nueva === "number") {
+      setNewCount(counts.nueva);
+    } else if (["POSTULACIONES_BATCH", "RESYNC"].includes(lastMessage.type)) {
       handleManualRefresh();
     }
     // eslint-disable-next-line react-hooks/exhaustive-deps
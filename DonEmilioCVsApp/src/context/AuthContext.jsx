@@ -133,6 +133,10 @@ export function AuthProvider({ children }) {
   }, [persist, scheduleExpiryWatcher, setToken, unpersist]);
 
   const logout = useCallback((notify = true) => {
+    // Logout manual: invalidar el token en el servidor (si ya expiró no hace falta)
+    if (notify) {
+      apiFetch("/usuarios/logout", { method: "POST" }).catch(() => {});
+    }
     clearTimer();
     setUser(null);
     setToken(null);
@@ -16,6 +16,9 @@ export function WebSocketProvider({ children }) {
     // Usamos useRef para el socket y para el timer de reconexión
     const socketRef = useRef(null);
     const retryTimeoutRef = useRef(null);
+    // Último seq de POSTULACIONES_BATCH recibido (para detectar mensajes perdidos)
+    const lastSeqRef = useRef(null);
+    const connectedOnceRef = useRef(false);
 
     const connect = React.useCallback(() => {
         // Si no hay usuario o todavía carga, no conectamos (o podríamos conectar como anónimo si quisiéramos)
@@ -28,7 +31,9 @@ export function WebSocketProvider({ children }) {
 
         // URL con params: id y nombre
         const wsBase = API_BASE.replace(/^http/, "ws") + "/ws";
-        const url = `${wsBase}?id=${user.id}&nombre=${encodeURIComponent(user.nombre || "User")}`;
+        let url = `${wsBase}?id=${user.id}&nombre=${encodeURIComponent(user.nombre || "User")}`;
+        // Reconexión: pedir los eventos que nos perdimos desde el último seq visto
+        if (lastSeqRef.current !== null) url += `&since=${lastSeqRef.current}`;
 
         console.log("[WS] Connecting...", url);
         const ws = new WebSocket(url);
@@ -37,12 +42,40 @@ export function WebSocketProvider({ children }) {
         ws.onopen = () => {
             console.log("[WS] Connected");
             setIsConnected(true);
+            // Reconexión sin seq conocido: no hay forma de reponer, recargar todo
+            if (connectedOnceRef.current && lastSeqRef.current === null) {
+                setLastMessage({ type: "RESYNC" });
+            }
+            connectedOnceRef.current = true;
         };
 
         ws.onmessage = (event) => {
             try {
                 const data = JSON.parse(event.data);
-                if (data.type === "VIEWERS_UPDATE") {
+                if (data.type === "PING") {
+                    // Heartbeat del servidor: si no respondemos, nos desconecta
+                    ws.send(JSON.stringify({ type: "PONG" }));
+                } else if (data.type === "HELLO") {
+                    // Seq actual del servidor: punto de partida para detectar huecos
+                    if (lastSeqRef.current === null) lastSeqRef.current = data.payload.seq ?? null;
+                } else if (data.type === "RESYNC") {
+                    // El servidor no pudo reponer lo perdido
+                    lastSeqRef.current = data.payload?.seq ?? null;
+                    setLastMessage({ type: "RESYNC" });
+                } else if (data.type === "POSTULACIONES_BATCH") {
+                    // Si falta algún seq, el parche no alcanza: los consumidores recargan todo
+                    const gap = lastSeqRef.current !== null && data.seq !== lastSeqRef.current + 1;
+                    lastSeqRef.current = data.seq;
+                    // Decisión en lote: viene como ids + cambios comunes; se expande a filas de "updated"
+                    const decided = data.payload.decided;
+                    if (decided) {
+                        data.payload.updated = [
+                            ...data.payload.updated,
+                            ...decided.ids.map((id) => ({ id, ...decided.cambios })),
+                        ];
+                    }
+                    setLastMessage(gap ? { type: "RESYNC" } : data);
+                } else if (data.type === "VIEWERS_UPDATE") {
                     // payload: { cvId: 1, viewers: [...] }
                     const { cvId, viewers } = data.payload;
                     setActiveViewers(prev => ({ ...prev, [cvId]: viewers }));
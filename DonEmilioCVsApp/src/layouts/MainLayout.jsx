@@ -19,10 +19,11 @@ export default function MainLayout() {
   const { lastMessage } = useWebSocket();
 
   useEffect(() => {
-    if (lastMessage?.type === "POSTULACION_CREATED") {
+    const nuevas = lastMessage?.type === "POSTULACIONES_BATCH" ? lastMessage.payload.created.length : 0;
+    if (nuevas) {
       Toast.fire({
         icon: "info",
-        title: "Nueva postulación recibida"
+        title: nuevas === 1 ? "Nueva postulación recibida" : `${nuevas} nuevas postulaciones recibidas`
       });
     }
   }, [lastMessage]);